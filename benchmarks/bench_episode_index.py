@@ -0,0 +1,52 @@
+"""
+Compares looking up crawled episodes in the list of EpisodeItems of a show, comparing season and episode number of
+every item, with looking them up in its EpisodeIndex, for a show with 1,200 library episodes.
+
+    $ python -m benchmarks.bench_episode_index
+"""
+import timeit
+
+from seriesscraper.episode_index import EpisodeIndex, EpisodeKey
+from seriesscraper.items import EpisodeItem
+
+SEASONS = 40
+EPISODES_PER_SEASON = 30
+LOOKUPS = 200  # crawled episodes per measurement, roughly the releases of a handful of season pages
+
+
+def main():
+    library_episodes = [(season_number, episode_number)
+                        for season_number in range(1, SEASONS + 1)
+                        for episode_number in range(1, EPISODES_PER_SEASON + 1)]
+    crawled_episodes = [(season_number, episode_number)
+                        for season_number in range(SEASONS - 4, SEASONS + 2)
+                        for episode_number in range(1, EPISODES_PER_SEASON + 1)][:LOOKUPS]
+
+    def as_episode_item(season_number, episode_number):
+        return EpisodeItem(tv_show_name='Show', season_number=season_number, episode_number=episode_number,
+                           release_downloadlink_tuples=[])
+
+    existing_episode_items = [as_episode_item(*episode) for episode in library_episodes]
+    crawled_episode_items = [as_episode_item(*episode) for episode in crawled_episodes]
+    episode_index = EpisodeIndex(library_episodes)
+
+    def list_scan():
+        return [not any(episode_item['season_number'] == existing_episode_item['season_number'] and
+                        episode_item['episode_number'] == existing_episode_item['episode_number']
+                        for existing_episode_item in existing_episode_items)
+                for episode_item in crawled_episode_items]
+
+    def index_lookup():
+        return [EpisodeKey.of(episode_item['season_number'], episode_item['episode_number']) not in episode_index
+                for episode_item in crawled_episode_items]
+
+    assert list_scan() == index_lookup()
+    print('{} library episodes, {} lookups'.format(len(library_episodes), LOOKUPS))
+    for name, function in (('list scan', list_scan), ('episode index', index_lookup)):
+        number = 5 if function is list_scan else 500
+        seconds = min(timeit.repeat(function, number=number, repeat=3)) / number
+        print('{:<14} {:>12.1f} us per lookup'.format(name, seconds / LOOKUPS * 1e6))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,48 @@
+"""
+Compares the memory needed to hold the episodes of a library of 50,000 episodes as EpisodeItems, as a set of
+EpisodeKeys and as an EpisodeIndex.
+
+    $ python -m benchmarks.bench_episode_memory
+"""
+import tracemalloc
+
+from seriesscraper.episode_index import EpisodeIndex, EpisodeKey
+from seriesscraper.items import EpisodeItem
+
+TV_SHOW_COUNT = 250
+SEASONS = 10
+EPISODES_PER_SEASON = 20  # 250 shows * 10 seasons * 20 episodes = 50,000 episodes
+
+
+def main():
+    library_episodes = [(season_number, episode_number)
+                        for season_number in range(1, SEASONS + 1)
+                        for episode_number in range(1, EPISODES_PER_SEASON + 1)]
+
+    def as_episode_items():
+        return [EpisodeItem(tv_show_name='Show {}'.format(tv_show), season_number=season_number,
+                            episode_number=episode_number, release_downloadlink_tuples=[])
+                for tv_show in range(TV_SHOW_COUNT)
+                for season_number, episode_number in library_episodes]
+
+    def as_episode_keys():
+        return [{EpisodeKey.of(season_number, episode_number) for season_number, episode_number in library_episodes}
+                for _ in range(TV_SHOW_COUNT)]
+
+    def as_episode_indexes():
+        return [EpisodeIndex(library_episodes) for _ in range(TV_SHOW_COUNT)]
+
+    print('{} episodes'.format(TV_SHOW_COUNT * len(library_episodes)))
+    for name, build in (('episode items', as_episode_items),
+                        ('episode keys', as_episode_keys),
+                        ('episode indexes', as_episode_indexes)):
+        tracemalloc.start()
+        episodes = build()
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        del episodes
+        print('{:<16} {:>8.2f} MiB {:>8.2f} MiB peak'.format(name, current / 2 ** 20, peak / 2 ** 20))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,106 @@
+"""
+Compares sending every scraped episode to JDownloader with a blocking API call in the reactor thread against the
+batched JDownloaderPipeline, against a local MyJDownloader stand-in with a round trip time of 50 ms. Items arrive
+every 10 ms, like from a running crawl; a heartbeat measures how long the reactor is blocked in total.
+
+    $ python -m benchmarks.bench_jd_pipeline
+"""
+import time
+
+from scrapy.utils.test import get_crawler
+from twisted.internet import defer, reactor, task
+
+from benchmarks.config import use_config
+from benchmarks.stubs import FakeMyJdServer
+
+ITEMS = 100
+ITEM_INTERVAL = 0.01
+HEARTBEAT_INTERVAL = 0.005
+LATENCY = 0.05
+
+
+def episode_item(number: int):
+    from seriesscraper.items import EpisodeItem
+
+    return EpisodeItem(tv_show_name='Show', season_number=1, episode_number=number,
+                       release_downloadlink_tuples=[('Show.S01E{:02}.720p.WEB-DL'.format(number),
+                                                     'http://dl/{}'.format(number))])
+
+
+class BlockingPipeline:
+    """
+    Former JDownloaderPipeline, one blocking API call per item.
+    """
+
+    def __init__(self) -> None:
+        from jdownloader.jd import Jd
+
+        self.__jd = Jd()
+
+    def open_spider(self, spider):
+        pass
+
+    def process_item(self, item, spider):
+        from jdownloader.jdlink import JdLink
+
+        release_title, download_link = item['release_downloadlink_tuples'][0]
+        self.__jd.add_link(JdLink(autostart=False, links=download_link, packageName=release_title,
+                                  destinationFolder='/tmp/{}'.format(item['tv_show_name'])))
+
+    def close_spider(self, spider):
+        pass
+
+
+@defer.inlineCallbacks
+def measure(pipeline) -> dict:
+    stalls = []
+    last_beat = [time.perf_counter()]
+
+    def beat():
+        now = time.perf_counter()
+        stalls.append(now - last_beat[0] - HEARTBEAT_INTERVAL)
+        last_beat[0] = now
+
+    heartbeat = task.LoopingCall(beat)
+    heartbeat.start(HEARTBEAT_INTERVAL)
+
+    start = time.perf_counter()
+    pipeline.open_spider(None)
+    for number in range(1, ITEMS + 1):
+        pipeline.process_item(episode_item(number), None)
+        yield task.deferLater(reactor, ITEM_INTERVAL, lambda: None)
+    crawl_seconds = time.perf_counter() - start
+    yield pipeline.close_spider(None)
+    total_seconds = time.perf_counter() - start
+
+    heartbeat.stop()
+    return {'crawl_seconds': crawl_seconds, 'total_seconds': total_seconds, 'blocked_seconds': sum(stalls)}
+
+
+@defer.inlineCallbacks
+def run(_):
+    with FakeMyJdServer('user@example.org', 'secret', latency=LATENCY) as my_jd:
+        use_config(item_pipelines={'myjdownloader': {
+            'email': 'user@example.org', 'password': 'secret', 'device_name': my_jd.device_name,
+            'api_url': my_jd.url, 'tv_shows_dir': '/tmp', 'autostart_downloads': False}})
+        from jdownloader.myjdapi_client import MyJdApi
+        from seriesscraper.pipelines import JDownloaderPipeline
+
+        # the configured API URL must be used, the links are not added to the stand-in otherwise
+        assert MyJdApi(my_jd.url).api_url == my_jd.url.rstrip('/')
+        for name, create_pipeline in (
+                ('blocking', BlockingPipeline),
+                ('batched', lambda: JDownloaderPipeline.from_crawler(get_crawler(settings_dict={
+                    'JD_BATCH_SIZE': 20, 'JD_FLUSH_INTERVAL': 10})))):
+            pipeline = create_pipeline()
+            requests_before, links_before = my_jd.request_count, len(my_jd.added_links)
+            result = yield measure(pipeline)
+            assert len(my_jd.added_links) - links_before == ITEMS, 'links were not added to the stand-in'
+            print('{:<9} {:>4} link grabber requests, crawl {:>5.2f}s, all links sent after {:>5.2f}s, '
+                  'reactor blocked {:>5.2f}s'.format(name, my_jd.request_count - requests_before,
+                                                             result['crawl_seconds'], result['total_seconds'],
+                                                             result['blocked_seconds']))
+
+
+if __name__ == '__main__':
+    task.react(run)
@@ -0,0 +1,100 @@
+"""
+Measures the LinkLivenessPipeline against a local stand-in hoster with a round trip time of 100 ms. Every episode has
+CANDIDATES links; the best one of every third episode is dead, the two best ones of every tenth. Compares checking one
+link after the other against checking LINK_CHECK_CANDIDATES links of an episode concurrently, and a second run with the
+cached results. Also counts the dead links that would have been sent without the check, and checks that the links of
+an unreachable hoster are kept.
+
+    $ python -m benchmarks.bench_link_check
+"""
+import socket
+import tempfile
+import time
+from pathlib import Path
+
+from scrapy.utils.test import get_crawler
+from twisted.internet import defer, task
+
+from benchmarks.config import use_config
+from benchmarks.stubs import FakeHosterServer
+
+ITEMS = 100
+CANDIDATES = 4
+LATENCY = 0.1
+
+
+def dead_paths_of(number: int) -> [str]:
+    dead_count = 2 if number % 10 == 0 else 1 if number % 3 == 0 else 0
+    return ['/{}/{}'.format(number, rank) for rank in range(dead_count)]
+
+
+def episode_item(hoster: FakeHosterServer, number: int):
+    from seriesscraper.items import EpisodeItem
+
+    return EpisodeItem(tv_show_name='Show', season_number=1, episode_number=number,
+                       release_downloadlink_tuples=[('Show.S01E{:02}.720p.WEB-DL'.format(number),
+                                                     hoster.link('/{}/{}'.format(number, rank)))
+                                                    for rank in range(CANDIDATES)])
+
+
+@defer.inlineCallbacks
+def measure(hoster: FakeHosterServer, settings: dict) -> dict:
+    from seriesscraper.pipelines import LinkLivenessPipeline
+
+    crawler = get_crawler(settings_dict=dict({'LINK_CHECK_ENABLED': True}, **settings))
+    pipeline = LinkLivenessPipeline.from_crawler(crawler)
+    requests_before = hoster.request_count
+    start = time.perf_counter()
+    pipeline.open_spider(None)
+    items = yield defer.gatherResults([pipeline.process_item(episode_item(hoster, number), None)
+                                       for number in range(1, ITEMS + 1)])
+    seconds = time.perf_counter() - start
+    yield pipeline.close_spider(None)
+
+    dead_links = {hoster.link(path) for path in hoster.dead_paths}
+    assert not any(item['release_downloadlink_tuples'][0][1] in dead_links for item in items)
+    return {'seconds': seconds, 'hoster_requests': hoster.request_count - requests_before}
+
+
+@defer.inlineCallbacks
+def check_unreachable_hoster() -> None:
+    from seriesscraper.items import EpisodeItem
+    from seriesscraper.pipelines import LinkLivenessPipeline
+
+    with socket.socket() as unused:
+        unused.bind(('127.0.0.1', 0))
+        url = 'http://127.0.0.1:{}'.format(unused.getsockname()[1])
+    release_downloadlink_tuples = [('Show.S01E01.720p.WEB-DL', '{}/{}'.format(url, rank)) for rank in range(CANDIDATES)]
+
+    pipeline = LinkLivenessPipeline.from_crawler(get_crawler(settings_dict={'LINK_CHECK_ENABLED': True}))
+    pipeline.open_spider(None)
+    item = yield pipeline.process_item(EpisodeItem(tv_show_name='Show', season_number=1, episode_number=1,
+                                                   release_downloadlink_tuples=list(release_downloadlink_tuples)), None)
+    yield pipeline.close_spider(None)
+    assert item['release_downloadlink_tuples'] == release_downloadlink_tuples
+
+
+@defer.inlineCallbacks
+def run(_):
+    dead_paths = [path for number in range(1, ITEMS + 1) for path in dead_paths_of(number)]
+    print('{} episodes, {} of them would have been sent with a dead link'.format(
+        ITEMS, sum(1 for number in range(1, ITEMS + 1) if dead_paths_of(number))))
+
+    config_dir = tempfile.mkdtemp(prefix='seriesscraper-benchmark-')
+    use_config(config_dir=config_dir)
+    from seriesscraper.liveness import LINK_LIVENESS_CACHE_FILE_NAME
+
+    with FakeHosterServer(dead_paths, latency=LATENCY) as hoster:
+        for name, settings, cached in (
+                ('one link after the other', {'LINK_CHECK_CONCURRENCY': 1, 'LINK_CHECK_CANDIDATES': 1}, False),
+                ('concurrent', {}, False),
+                ('concurrent, cached', {}, True)):
+            cache_file = Path(config_dir) / LINK_LIVENESS_CACHE_FILE_NAME
+            if not cached and cache_file.exists():
+                cache_file.unlink()
+            result = yield measure(hoster, settings)
+            print('{:<25} {:>6.2f}s {:>4} hoster requests'.format(name, result['seconds'], result['hoster_requests']))
+    yield check_unreachable_hoster()
+
+if __name__ == '__main__':
+    task.react(run)
@@ -0,0 +1,38 @@
+"""
+Measures fetching the Plex episode index on a cold run, a warm run served from the on-disk cache and a run that only
+refreshes recently added episodes, using a fake Plex server.
+
+    $ python -m benchmarks.bench_plex_cache
+"""
+import time
+
+from benchmarks.config import use_config
+from benchmarks.stubs import FakePlexServer, synthetic_library
+
+TV_SHOW_COUNT = 150
+
+
+def main():
+    library = synthetic_library(TV_SHOW_COUNT, seasons=5, episodes_per_season=20)
+    with FakePlexServer(library) as plex_server:
+        use_config(plex_server_url=plex_server.url)
+        from plex.plex import Plex
+
+        measure('cold', plex_server, Plex())
+        measure('warm', plex_server, Plex())
+
+        plex_server.add_episode('Show 0', 6, 1)
+        plex = Plex()
+        plex.episodes_ttl = 0  # cached index is outdated, refresh it
+        measure('incremental', plex_server, plex)
+
+
+def measure(name: str, plex_server: FakePlexServer, plex):
+    requests_before, start = plex_server.request_count, time.perf_counter()
+    episode_index = plex.get_episode_index()
+    print('{:<12} {:>5} requests {:>8.3f}s {:>7} episodes'.format(
+        name, plex_server.request_count - requests_before, time.perf_counter() - start, len(episode_index)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,46 @@
+"""
+Compares fetching the existing episodes show by show against the bulk episode index, using a fake Plex server.
+
+    $ python -m benchmarks.bench_plex_index
+"""
+import time
+
+from benchmarks.config import use_config
+from benchmarks.stubs import FakePlexServer, synthetic_library
+
+TV_SHOW_COUNT = 150
+
+
+def legacy_existing_episodes_of(plex, tv_show_name: str) -> list:
+    """
+    Episodes of a tv show as the spider fetched them before the bulk episode index, one search per tv show.
+    """
+    tv_library = plex.plex.library.section(plex.tv_library_name)
+    tv_show = tv_library.search(title=tv_show_name, libtype='show').pop()
+    return tv_show.episodes()
+
+
+def main():
+    library = synthetic_library(TV_SHOW_COUNT, seasons=5, episodes_per_season=20)
+    with FakePlexServer(library) as plex_server:
+        use_config(plex_server_url=plex_server.url)
+        from plex.plex import Plex
+        plex = Plex()
+
+        requests_before, start = plex_server.request_count, time.perf_counter()
+        per_show = {title: legacy_existing_episodes_of(plex, title) for title in library}
+        report('per show', plex_server.request_count - requests_before, time.perf_counter() - start,
+               sum(len(episodes) for episodes in per_show.values()))
+
+        requests_before, start = plex_server.request_count, time.perf_counter()
+        episode_index = plex.get_episode_index()
+        report('bulk index', plex_server.request_count - requests_before, time.perf_counter() - start,
+               len(episode_index))
+
+
+def report(name: str, requests: int, seconds: float, episodes: int):
+    print('{:<12} {:>5} requests {:>8.3f}s {:>7} episodes'.format(name, requests, seconds, episodes))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,87 @@
+"""
+Compares how soon the first season page of an airing tv show is downloaded, while the back catalogues of ended tv
+shows are crawled as well, with request priorities and adaptive concurrency against the Scrapy defaults the crawler
+used before: equal priorities and 8 concurrent requests per domain. The local copy of serienjunkies answers every season
+page after LATENCY seconds and rate limits more than RATE_LIMIT concurrent requests with 429 Too Many Requests.
+The airing tv show is the first one of the configuration, the ended ones have PAGES season pages each.
+
+    $ python -m benchmarks.bench_priority
+"""
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.config import use_config
+from benchmarks.stubs import FakePlexServer, FakeSerienjunkiesSite
+
+ENDED_TV_SHOWS = 20
+PAGES = 10
+LATENCY = 0.2
+RATE_LIMIT = 6
+AIRING_TV_SHOW = 'Airing Show'
+
+VARIANTS = {
+    'scrapy defaults': {'REQUEST_PRIORITY_ENABLED': False, 'ADAPTIVE_CONCURRENCY_ENABLED': False,
+                        'CONCURRENT_REQUESTS_PER_DOMAIN': 8},
+    'priorities': {'ADAPTIVE_CONCURRENCY_ENABLED': False, 'CONCURRENT_REQUESTS_PER_DOMAIN': 8},
+    'priorities, adaptive concurrency': {},
+}
+
+
+def run(name: str, settings: dict) -> dict:
+    ended_tv_shows = {'Ended Show {}'.format(show): PAGES for show in range(ENDED_TV_SHOWS)}
+    tv_shows = dict({AIRING_TV_SHOW: 1}, **ended_tv_shows)
+    config_dir = tempfile.mkdtemp(prefix='seriesscraper-benchmark-')
+    # the scheduler remembers when the tv shows had their last new release
+    now = time.time()
+    with open(os.path.join(config_dir, 'show_schedule.json'), 'w') as file_handle:
+        json.dump(dict({title: {'last_new_release_at': now - 200 * 24 * 3600} for title in ended_tv_shows},
+                       **{AIRING_TV_SHOW: {'last_new_release_at': now - 3600}}), file_handle)
+
+    with FakeSerienjunkiesSite(tv_shows, latency=LATENCY, rate_limit=RATE_LIMIT) as site, FakePlexServer({}) as plex:
+        use_config(plex_server_url=plex.url, config_dir=config_dir, tv_shows=list(tv_shows),
+                   general={'language': 'english', 'only_latest_episodes': False})
+        environment = dict(os.environ, BENCHMARK_SHOW_DIRECTORY_URL=site.show_directory_url)
+        start = time.time()
+        subprocess.check_call([sys.executable, '-m', 'benchmarks.bench_priority', '--crawl', json.dumps(settings)],
+                              env=environment)
+        # None if the rate limit made the crawl give up on the page
+        served_at = site.served_at.get(AIRING_TV_SHOW)
+        return {
+            'variant': name,
+            'airing_first_page_seconds': round(served_at - start, 2) if served_at else None,
+            'crawl_seconds': round(time.time() - start, 2),
+            'season_pages': site.season_page_count,
+            'rate_limited': site.rate_limited_count,
+            'max_concurrent': site.max_concurrent_count,
+        }
+
+
+def crawl(settings: dict) -> None:
+    os.environ.setdefault('SCRAPY_SETTINGS_MODULE', 'seriesscraper.settings')
+    from scrapy.crawler import CrawlerProcess
+    from scrapy.utils.project import get_project_settings
+    from benchmarks.spider import BenchmarkSpider
+
+    project_settings = get_project_settings()
+    project_settings.setdict(dict({'HTTPCACHE_ENABLED': False, 'LOG_LEVEL': 'WARNING', 'ROBOTSTXT_OBEY': False,
+                                   'DRY_RUN': True, 'RETRY_TIMES': 100}, **settings), priority='cmdline')
+    process = CrawlerProcess(project_settings)
+    process.crawl(BenchmarkSpider)
+    process.start()
+
+
+def main():
+    if '--crawl' in sys.argv:
+        crawl(json.loads(sys.argv[sys.argv.index('--crawl') + 1]))
+        return
+
+    for name, settings in VARIANTS.items():
+        print(json.dumps(run(name, settings)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,94 @@
+"""
+Validates the ReleaseExtractor against the former per-anchor XPath extraction on the saved season page fixture, for
+both languages and every hoster, checks that a single extraction for all languages and hosters finds the links of all
+separate extractions, and compares their speed on a season page with several hundred release paragraphs.
+
+    $ python -m benchmarks.bench_release_extraction
+"""
+import re
+import timeit
+from pathlib import Path
+
+from scrapy.http import HtmlResponse
+
+from seriesscraper.config.model import LanguageConfig
+from seriesscraper.extraction import ReleaseExtractor
+
+FIXTURE = Path(__file__).parent / 'fixtures' / 'season_page.html'
+HOSTERS = ('share-online', 'uploaded', 'rapidgator')
+BLOW_UP_FACTOR = 10
+
+
+def legacy_extract(response: HtmlResponse, language: LanguageConfig, hoster: str) -> [(str, str)]:
+    """
+    Extraction of the spider before the ReleaseExtractor.
+    """
+    episode_p_tag_xpath_query = '''
+    //p[position()>2 and not(@class) and not(contains(., \'Dauer\')) and
+    (
+     ./strong/text()[contains(., \'1080p\') and contains(., \'WEB-DL\')] or
+     ./strong/text()[contains(., \'1080p\')] or
+     ./strong/text()[contains(., \'720p\') and contains(., \'WEB-DL\')] or
+     ./strong/text()[contains(., \'720p\')]
+    )] ''' \
+        if language == LanguageConfig.ENGLISH else \
+        '''
+    //p[position()>2 and not(@class) and not(contains(., \'Dauer\')) and
+    (
+     ./strong/text()[contains(., \'1080p\') and contains(., \'WEB-DL\') and contains(translate(., 'GERMAN', 'german'), 'german')] or
+     ./strong/text()[contains(., \'1080p\') and contains(translate(., 'GERMAN', 'german'), 'german')] or
+     ./strong/text()[contains(., \'720p\') and contains(., \'WEB-DL\') and contains(translate(., 'GERMAN', 'german'), 'german')] or
+     ./strong/text()[contains(., \'720p\') and contains(translate(., 'GERMAN', 'german'), 'german')]
+    )]'''
+    episode_p_tags = response.xpath(episode_p_tag_xpath_query)
+
+    a_tags = episode_p_tags.xpath('child::a[./following-sibling::text()[1][contains(., \'{0}\')]]'.format(hoster))
+    release_titles_and_download_links = [
+        (a_tag.xpath('preceding-sibling::strong[not(text()=\'Download:\')]/text()').get(),
+         a_tag.css('::attr(href)').get())
+        for a_tag in a_tags]
+    release_titles_and_download_links.reverse()
+    return release_titles_and_download_links
+
+
+def extract(response: HtmlResponse, language: LanguageConfig, hoster: str) -> [(str, str)]:
+    return [(release_title, download_link)
+            for release_title, _, download_link in ReleaseExtractor([language], [hoster]).extract(response.selector.root)]
+
+
+def blown_up(html: str) -> str:
+    release_p_tags = re.findall(r'<p><strong>[^<]*S\d\d.*?</p>', html, re.DOTALL)
+    return html.replace('\n'.join(release_p_tags), '\n'.join(release_p_tags * BLOW_UP_FACTOR))
+
+
+def main():
+    html = FIXTURE.read_text(encoding='utf-8')
+
+    for language in LanguageConfig:
+        for hoster in HOSTERS:
+            response = HtmlResponse(FIXTURE.as_uri(), body=html.encode('utf-8'), encoding='utf-8')
+            expected = legacy_extract(response, language, hoster)
+            actual = extract(response, language, hoster)
+            assert actual == expected, 'extraction differs for {} / {}'.format(language, hoster)
+            print('valid {:<22} {:<13} {:>4} links'.format(str(language), hoster, len(actual)))
+
+    response = HtmlResponse(FIXTURE.as_uri(), body=html.encode('utf-8'), encoding='utf-8')
+    all_links = {download_link for _, _, download_link
+                 in ReleaseExtractor(list(LanguageConfig), HOSTERS).extract(response.selector.root)}
+    separate_links = {download_link for language in LanguageConfig for hoster in HOSTERS
+                      for _, download_link in extract(response, language, hoster)}
+    assert all_links == separate_links, 'single extraction differs from separate extractions'
+    print('valid all languages and hosters {:>4} links'.format(len(all_links)))
+
+    page = blown_up(html)
+    print('{} release paragraphs'.format(page.count('<p><strong>') - 1))
+    response = HtmlResponse(FIXTURE.as_uri(), body=page.encode('utf-8'), encoding='utf-8')
+    response.selector.root  # parse the page up front, only the extraction is measured
+    for name, function in (('legacy xpath', legacy_extract), ('extractor', extract)):
+        seconds = min(timeit.repeat(lambda: function(response, LanguageConfig.ENGLISH, 'share-online'),
+                                    number=5, repeat=3)) / 5
+        print('{:<13} {:>8.2f} ms per page'.format(name, seconds * 1e3))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,94 @@
+"""
+Compares the throughput of matching release titles with the former SxxExx search against the ReleaseTitleMatcher,
+uncached and memoized. The corpus are the release titles of the saved season page plus multi-episode, 1x02 and
+complete season variants of them, as often as CRAWLS crawls of PAGES season pages see them. Also counts the titles
+every approach understands, after checking the episodes the matcher finds in KNOWN_TITLES.
+
+    $ python -m benchmarks.bench_release_titles
+"""
+import re
+import time
+
+from lxml import html
+
+from benchmarks.stubs import FIXTURES
+from seriesscraper.config.model import LanguageConfig
+from seriesscraper.episode_index import EpisodeKey
+from seriesscraper.extraction import ReleaseExtractor
+from seriesscraper.release_title import ReleaseTitleMatcher, episode_keys_of
+
+PAGES = 40
+CRAWLS = 3
+SEASON_EPISODE = re.compile(r'S(\d{2})E(\d{2})')
+KNOWN_TITLES = {
+    'Show.S01E02.720p.WEB-DL.x264-GRP': (EpisodeKey.of(1, 2),),
+    'Show.S01E00.Pilot.720p.WEB-DL.x264-GRP': (EpisodeKey.of(1, 0),),
+    'Show.S01E01E02.720p.WEB-DL.x264-GRP': (EpisodeKey.of(1, 1), EpisodeKey.of(1, 2)),
+    'Show.S01E01-03.720p.WEB-DL.x264-GRP': (EpisodeKey.of(1, 1), EpisodeKey.of(1, 2), EpisodeKey.of(1, 3)),
+    'Show.S01E01-720p.WEB-DL.x264-GRP': (EpisodeKey.of(1, 1),),
+    'Show.1x02.720p.WEB-DL.x264-GRP': (EpisodeKey.of(1, 2),),
+    'Show.1920x1080.WEB-DL.x264-GRP': (),
+    'Show.S01.720p.WEB-DL.x264-GRP': (EpisodeKey.season_pack_of(1),),
+    'Show.S01.E02.720p.WEB-DL.x264-GRP': (EpisodeKey.of(1, 2),),
+    'Show S01 E02 720p WEB-DL x264-GRP': (EpisodeKey.of(1, 2),),
+    'Show.720p.WEB-DL.2x264-GRP': (),
+    'Show.1x02.720p.WEB-DL.2x265-GRP': (EpisodeKey.of(1, 2),),
+}
+
+
+def corpus() -> [str]:
+    root = html.fromstring((FIXTURES / 'season_page.html').read_text(encoding='utf-8'))
+    extractor = ReleaseExtractor([LanguageConfig.ENGLISH, LanguageConfig.GERMAN], ['share-online', 'uploaded'])
+    titles = [release_title for release_title, _, _ in extractor.extract(root)]
+
+    variants = []
+    for title in dict.fromkeys(titles):
+        match = SEASON_EPISODE.search(title)
+        if match is None:
+            continue
+        season, episode = int(match.group(1)), int(match.group(2))
+        variants += [SEASON_EPISODE.sub('S{:02d}E{:02d}E{:02d}'.format(season, episode, episode + 1), title),
+                     SEASON_EPISODE.sub('S{:02d}E{:02d}-E{:02d}'.format(season, episode, episode + 2), title),
+                     SEASON_EPISODE.sub('{}x{:02d}'.format(season, episode), title),
+                     SEASON_EPISODE.sub('S{:02d}'.format(season), title)]
+
+    # every page of a tv show lists other episodes, so the titles of the pages differ by their season
+    return [re.sub(r'S0(\d)', lambda season: 'S{:02d}'.format(int(season.group(1)) + 2 * page), title)
+            for _ in range(CRAWLS) for page in range(PAGES) for title in titles + variants]
+
+
+def legacy_episodes_of(release_title: str) -> tuple:
+    match = re.search('S(\\d{2})E(\\d{2})', release_title)
+    return ((int(match.group(1)), int(match.group(2))),) if match else ()
+
+
+def measure(name: str, episodes_of, titles: [str]) -> None:
+    start = time.perf_counter()
+    matched = sum(1 for title in titles if episodes_of(title))
+    seconds = time.perf_counter() - start
+    print('{:<22} {:>9.0f} titles/s {:>6} of {} titles matched'.format(name, len(titles) / seconds, matched,
+                                                                        len(titles)))
+
+
+def check_known_titles() -> None:
+    for title, expected in KNOWN_TITLES.items():
+        actual = episode_keys_of(title)
+        assert actual == expected, '{} is matched as {}, not {}'.format(title, actual, expected)
+        assert [episode_key.is_season_pack for episode_key in actual] == \
+               [episode_key.is_season_pack for episode_key in expected], title
+
+
+def main():
+    check_known_titles()
+    titles = corpus()
+    print('{} titles, {} distinct'.format(len(titles), len(set(titles))))
+    measure('SxxExx search', legacy_episodes_of, titles)
+    measure('matcher', episode_keys_of, titles)
+    matcher = ReleaseTitleMatcher()
+    measure('memoized matcher, cold', matcher.episode_keys_of, titles)
+    measure('memoized matcher, warm', matcher.episode_keys_of, titles)
+    print(matcher.cache_info())
+
+
+if __name__ == '__main__':
+    main()
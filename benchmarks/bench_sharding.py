@@ -0,0 +1,63 @@
+"""
+Crawls a local copy of serienjunkies with 1, 2 and 4 worker processes (seriesscraper.sharding) and compares the wall
+clock time. Every tv show has several season pages replayed from the saved season page fixture
+(benchmarks.stubs.FakeSerienjunkiesSite); Plex and MyJDownloader are local stand-ins. Every run happens in a fresh
+interpreter with fresh caches. The speed-up is bounded by the number of cores of the machine.
+
+    $ python -m benchmarks.bench_sharding
+"""
+import json
+import os
+import subprocess
+import sys
+import time
+
+from benchmarks.stubs import FakeSerienjunkiesSite
+
+TV_SHOWS = 24
+PAGES_PER_TV_SHOW = 5
+WORKER_COUNTS = (1, 2, 4)
+
+
+def run(worker_count: int) -> dict:
+    from benchmarks.config import use_config
+    from benchmarks.stubs import FakeMyJdServer, FakePlexServer
+
+    tv_shows = {'Show {}'.format(show): PAGES_PER_TV_SHOW for show in range(TV_SHOWS)}
+    with FakeSerienjunkiesSite(tv_shows) as site, FakePlexServer({}) as plex, \
+            FakeMyJdServer('user@example.org', 'secret') as my_jd:
+        os.environ['BENCHMARK_SHOW_DIRECTORY_URL'] = site.show_directory_url
+        use_config(plex_server_url=plex.url,
+                   tv_shows=list(tv_shows),
+                   general={'language': 'english', 'only_latest_episodes': False},
+                   item_pipelines={'myjdownloader': {
+                       'email': 'user@example.org', 'password': 'secret', 'device_name': my_jd.device_name,
+                       'api_url': my_jd.url, 'tv_shows_dir': '/tmp', 'autostart_downloads': False}})
+        # imported after the configuration is written, as the Config singleton looks the file up on import
+        from benchmarks.spider import BenchmarkSpider
+        from seriesscraper.sharding import crawl_sharded
+
+        start = time.perf_counter()
+        counts = crawl_sharded(worker_count, spider_class=BenchmarkSpider,
+                               settings={'HTTPCACHE_ENABLED': False, 'LOG_LEVEL': 'WARNING'})
+        seconds = time.perf_counter() - start
+        return dict(counts, workers=worker_count, seconds=seconds, season_pages=site.season_page_count,
+                    links_added=len(my_jd.added_links))
+
+
+def main():
+    if len(sys.argv) > 2 and sys.argv[1] == '--workers':
+        print(json.dumps(run(int(sys.argv[2]))))
+        return
+
+    print('{} tv shows with {} season pages each, {} cores'.format(TV_SHOWS, PAGES_PER_TV_SHOW, os.cpu_count()))
+    for worker_count in WORKER_COUNTS:
+        output = subprocess.check_output([sys.executable, '-m', 'benchmarks.bench_sharding',
+                                          '--workers', str(worker_count)])
+        result = json.loads(output.decode('utf-8').strip().splitlines()[-1])
+        print('{workers} workers {seconds:>7.2f}s {season_pages:>4} season pages {received:>5} items '
+              '{duplicates:>3} duplicates {links_added:>5} links added'.format(**result))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+"""
+Compares peak memory and time of extracting the tv shows of the show directory page with response.xpath against the
+streaming parser. The saved fixture is blown up to the size of the real page (about 8 MB) by repeating its entries.
+Every mode runs in a fresh interpreter, so the peak resident set sizes do not influence each other.
+
+    $ python -m benchmarks.bench_show_directory
+"""
+import json
+import re
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+FIXTURE = Path(__file__).parent / 'fixtures' / 'showall.html'
+TARGET_SIZE = 8 * 2 ** 20
+MODES = ('xpath', 'streaming')
+
+
+def load_blown_up_fixture() -> bytes:
+    html = FIXTURE.read_text(encoding='utf-8')
+    items = re.findall(r'\t<li class="cat-item.*?</li>', html, re.DOTALL)
+    copies = TARGET_SIZE // len(''.join(items).encode('utf-8')) + 1
+    blown_up_items = '\n'.join(item.replace('</a>', ' {}</a>'.format(copy))
+                               for copy in range(copies) for item in items)
+    return html.replace('\n'.join(items), blown_up_items).encode('utf-8')
+
+
+def run(mode: str, page_file: str) -> dict:
+    from scrapy.http import HtmlResponse
+    from seriesscraper.directory import stream_title_link_tuples
+
+    body = Path(page_file).read_bytes()
+    response = HtmlResponse('http://serienjunkies.org/serien/?cat=0&showall', body=body, encoding='utf-8')
+    baseline_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    start = time.perf_counter()
+    if mode == 'xpath':
+        title_link_tuples = [(a_tag.xpath('string()').get(), a_tag.xpath('@href').get())
+                             for a_tag in response.xpath('//li[contains(@class, "cat-item")]//a')]
+    else:
+        title_link_tuples = list(stream_title_link_tuples(response.body, response.encoding))
+    seconds = time.perf_counter() - start
+
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return {'mode': mode, 'page_bytes': len(body), 'tv_shows': len(title_link_tuples), 'seconds': seconds,
+            'peak_rss_increase_kib': peak_rss - baseline_rss}
+
+
+def main():
+    if len(sys.argv) > 3 and sys.argv[1] == '--mode':
+        print(json.dumps(run(sys.argv[2], sys.argv[3])))
+        return
+
+    with tempfile.NamedTemporaryFile(suffix='.html') as page_file:
+        page_file.write(load_blown_up_fixture())
+        page_file.flush()
+        results = [json.loads(subprocess.check_output(
+            [sys.executable, '-m', 'benchmarks.bench_show_directory', '--mode', mode, page_file.name]))
+            for mode in MODES]
+
+    for result in results:
+        print('{mode:<10} {page_bytes:>9} bytes {tv_shows:>7} shows {seconds:>7.3f}s '
+              '{peak_rss_increase_kib:>8} KiB peak RSS increase'.format(**result))
+
+
+if __name__ == '__main__':
+    main()
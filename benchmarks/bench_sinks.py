@@ -0,0 +1,69 @@
+"""
+Measures the throughput of the sink pipelines in items/s, writing every item on its own (SINK_BATCH_SIZE 1) against
+batches of 500. The webhook sink POSTs to a local endpoint. Items are fed as fast as the pipeline takes them, waiting
+whenever it holds back the crawl.
+
+    $ python -m benchmarks.bench_sinks
+"""
+import json
+import sqlite3
+import tempfile
+import time
+from pathlib import Path
+
+from scrapy.utils.test import get_crawler
+from twisted.internet import defer, task
+
+from benchmarks.config import use_config
+from benchmarks.stubs import FakeWebhookServer
+
+ITEMS = 5000
+BATCH_SIZES = (1, 500)
+
+
+def episode_item(number: int):
+    from seriesscraper.items import EpisodeItem
+
+    return EpisodeItem(tv_show_name='Show {}'.format(number // 100), season_number=1, episode_number=number % 100 + 1,
+                       release_downloadlink_tuples=[('Show.S01E{:02}.720p.WEB-DL'.format(number % 100 + 1),
+                                                     'http://dl/{}/{}'.format(number, rank)) for rank in range(3)])
+
+
+@defer.inlineCallbacks
+def measure(pipeline_class, settings: dict) -> float:
+    pipeline = pipeline_class.from_crawler(get_crawler(settings_dict=settings))
+    start = time.perf_counter()
+    pipeline.open_spider(None)
+    for number in range(ITEMS):
+        result = pipeline.process_item(episode_item(number), None)
+        if isinstance(result, defer.Deferred):
+            yield result
+    yield pipeline.close_spider(None)
+    return ITEMS / (time.perf_counter() - start)
+
+
+@defer.inlineCallbacks
+def run(_):
+    use_config()
+    from seriesscraper.pipelines import NdjsonSinkPipeline, SqliteSinkPipeline, WebhookSinkPipeline
+
+    with FakeWebhookServer() as webhook:
+        for batch_size in BATCH_SIZES:
+            directory = Path(tempfile.mkdtemp(prefix='seriesscraper-benchmark-'))
+            for name, pipeline_class, target_setting, target, written in (
+                    ('ndjson', NdjsonSinkPipeline, 'NDJSON_SINK_FILE', directory / 'episodes.ndjson',
+                     lambda: sum(1 for _ in open(str(directory / 'episodes.ndjson')))),
+                    ('sqlite', SqliteSinkPipeline, 'SQLITE_SINK_FILE', directory / 'episodes.sqlite',
+                     lambda: sqlite3.connect(str(directory / 'episodes.sqlite')).execute(
+                         'SELECT COUNT(*) FROM episode').fetchone()[0]),
+                    ('webhook', WebhookSinkPipeline, 'WEBHOOK_SINK_URL', webhook.url + '/episodes',
+                     lambda: len(webhook.records))):
+                webhook.records.clear()
+                items_per_second = yield measure(pipeline_class, {target_setting: str(target),
+                                                                  'SINK_BATCH_SIZE': batch_size})
+                print(json.dumps({'sink': name, 'batch_size': batch_size, 'items_per_second': round(items_per_second),
+                                  'written': written()}))
+
+
+if __name__ == '__main__':
+    task.react(run)
@@ -0,0 +1,94 @@
+"""
+Compares the startup of a crawl with the clients of Plex and MyJDownloader imported and connected lazily, as the
+crawler does, against importing and connecting them eagerly, as the crawler did before. Measures
+- the time to import the spider and the item pipelines in a fresh interpreter,
+- the time from starting a crawl process until its first request reaches the local copy of serienjunkies, with a
+  MyJDownloader stand-in with a round trip time of 200 ms, and whether the crawl contacted MyJDownloader at all. The
+  Plex library already contains every listed episode, so nothing new is found.
+
+    $ python -m benchmarks.bench_startup
+"""
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.stubs import FIXTURES
+
+RUNS = 5
+TV_SHOWS = 5
+LATENCY = 0.2
+EAGER_IMPORTS = 'import plexapi.myplex, plexapi.server, myjdapi; '
+IMPORT_STATEMENT = 'import seriesscraper.spiders.serienjunkies_spider, seriesscraper.pipelines'
+
+
+def import_seconds(eager: bool) -> float:
+    code = 'import time; start = time.perf_counter(); {}{}; print(time.perf_counter() - start)'.format(
+        EAGER_IMPORTS if eager else '', IMPORT_STATEMENT)
+    return float(subprocess.check_output([sys.executable, '-c', code]).decode('utf-8'))
+
+
+def first_request_seconds(eager: bool) -> (float, int):
+    from benchmarks.config import use_config
+    from benchmarks.stubs import FakeMyJdServer, FakePlexServer, FakeSerienjunkiesSite
+
+    season_page = (FIXTURES / 'season_page.html').read_text(encoding='utf-8')
+    episodes = {(int(season), int(episode)) for season, episode in re.findall(r'S(\d{2})E(\d{2})', season_page)}
+    tv_shows = {'Show {}'.format(show): 1 for show in range(TV_SHOWS)}
+
+    with FakeSerienjunkiesSite(tv_shows) as site, FakePlexServer({title: episodes for title in tv_shows}) as plex, \
+            FakeMyJdServer('user@example.org', 'secret', latency=LATENCY) as my_jd:
+        use_config(plex_server_url=plex.url, config_dir=tempfile.mkdtemp(prefix='seriesscraper-benchmark-'),
+                   tv_shows=list(tv_shows),
+                   item_pipelines={'myjdownloader': {
+                       'email': 'user@example.org', 'password': 'secret', 'device_name': my_jd.device_name,
+                       'api_url': my_jd.url, 'tv_shows_dir': '/tmp', 'autostart_downloads': False}})
+        environment = dict(os.environ, BENCHMARK_SHOW_DIRECTORY_URL=site.show_directory_url)
+        start = time.time()
+        subprocess.check_call([sys.executable, '-m', 'benchmarks.bench_startup', '--crawl'] +
+                              (['--eager'] if eager else []), env=environment)
+        return site.first_request_at - start, my_jd.request_count
+
+
+def crawl(eager: bool) -> None:
+    os.environ.setdefault('SCRAPY_SETTINGS_MODULE', 'seriesscraper.settings')
+    if eager:
+        # what the modules did on import and the pipeline on construction before: import the clients, connect to the
+        # device
+        import myjdapi, plexapi.myplex, plexapi.server  # noqa: F401
+        from jdownloader.jd import Jd
+        Jd().jd_device
+
+    from scrapy.crawler import CrawlerProcess
+    from scrapy.utils.project import get_project_settings
+    from benchmarks.spider import BenchmarkSpider
+
+    settings = get_project_settings()
+    settings.setdict({'HTTPCACHE_ENABLED': False, 'LOG_LEVEL': 'WARNING', 'ROBOTSTXT_OBEY': False}, priority='cmdline')
+    process = CrawlerProcess(settings)
+    process.crawl(BenchmarkSpider)
+    process.start()
+
+
+def main():
+    if '--crawl' in sys.argv:
+        crawl('--eager' in sys.argv)
+        return
+
+    for eager in (True, False):
+        imports = statistics.median(import_seconds(eager) for _ in range(RUNS))
+        first_requests = [first_request_seconds(eager) for _ in range(RUNS)]
+        print(json.dumps({
+            'clients': 'eager' if eager else 'lazy',
+            'import_seconds': round(imports, 3),
+            'first_request_seconds': round(statistics.median(seconds for seconds, _ in first_requests), 3),
+            'jd_requests': first_requests[0][1],
+        }))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,36 @@
+import os
+import tempfile
+
+import yaml
+
+
+def use_config(plex_server_url: str = None, tv_shows: [str] = (), config_dir: str = None, **overrides) -> str:
+    """
+    Write a configuration file for a benchmark run into a temporary directory and point the crawler to it. Must be
+    called before the Config singleton is instantiated.
+    :param plex_server_url: URL of the (fake) Plex server.
+    :param tv_shows: Names of the tv shows to crawl.
+    :param config_dir: Directory of the configuration file and the caches, a new temporary directory by default.
+    :param overrides: Top level configuration sections that replace the defaults.
+    :return: Path to the configuration file.
+    """
+    config = {
+        'general': {'language': 'english', 'only_latest_episodes': True},
+        'tv_shows': [{'name': name} for name in tv_shows],
+        # benchmarks without a Plex server never contact Plex, the server name only makes the configuration valid
+        'plex': {'username': 'benchmark', 'password': 'benchmark',
+                 'server_name': None if plex_server_url else 'benchmark',
+                 'tv_library_name': 'TV Shows',
+                 'server_url': plex_server_url, 'server_token': 'benchmark'},
+        'serienjunkies': {'hoster': 'share-online'},
+        # benchmarks that send links to JDownloader replace this section with the credentials of their stand-in
+        'item_pipelines': {'myjdownloader': {'enabled': False,
+                                             'tv_shows_dir': '/tmp', 'autostart_downloads': False}},
+    }
+    config.update(overrides)
+
+    config_file = os.path.join(config_dir or tempfile.mkdtemp(prefix='seriesscraper-benchmark-'), 'config.yaml')
+    with open(config_file, 'w') as file_handle:
+        yaml.safe_dump(config, file_handle)
+    os.environ['SERIESSCRAPER_CONFIG'] = config_file
+    return config_file
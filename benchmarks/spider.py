@@ -0,0 +1,12 @@
+import os
+
+from seriesscraper.spiders.serienjunkies_spider import SerienjunkiesSpider
+
+
+class BenchmarkSpider(SerienjunkiesSpider):
+    """
+    Spider that crawls the local copy of serienjunkies (benchmarks.stubs.FakeSerienjunkiesSite). Crawls run in fresh
+    processes that import this module again, so the URL of the show directory is passed by the environment.
+    """
+    start_urls = [os.environ.get('BENCHMARK_SHOW_DIRECTORY_URL')]
+    allowed_domains = []
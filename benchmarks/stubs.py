@@ -0,0 +1,363 @@
+"""
+Local stand-ins for the remote services the crawler talks to. Every stand-in is a small HTTP server that runs in a
+background thread on a random local port and counts the requests it served.
+"""
+import base64
+import hashlib
+import json
+import re
+import threading
+import time
+from html import escape
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import urlparse, parse_qs
+from xml.sax.saxutils import quoteattr
+
+from Crypto.Cipher import AES
+
+FIXTURES = Path(__file__).parent / 'fixtures'
+
+
+class LocalHttpServer:
+    """
+    Base class of the stand-ins. Subclasses implement `handle(handler, path, query)` and return
+    (status, headers, body).
+    """
+
+    def __init__(self) -> None:
+        self.request_count = 0
+        self.first_request_at = None  # time.time() of the first request
+        self._lock = threading.Lock()
+        self.__server = ThreadingHTTPServer(('127.0.0.1', 0), self.__handler_class())
+        self.__thread = threading.Thread(target=self.__server.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        host, port = self.__server.server_address
+        return 'http://{}:{}'.format(host, port)
+
+    def __enter__(self):
+        self.__thread.start()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.__server.shutdown()
+        self.__server.server_close()
+
+    def handle(self, handler: BaseHTTPRequestHandler, path: str, query: dict) -> (int, dict, bytes):
+        raise NotImplementedError
+
+    def __handler_class(self):
+        stand_in = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(self):
+                self.__respond()
+
+            def do_POST(self):
+                self.__respond()
+
+            def do_HEAD(self):
+                self.__respond(send_body=False)
+
+            def __respond(self, send_body: bool = True):
+                with stand_in._lock:
+                    stand_in.request_count += 1
+                    if stand_in.first_request_at is None:
+                        stand_in.first_request_at = time.time()
+                url = urlparse(self.path)
+                status, headers, body = stand_in.handle(self, url.path, parse_qs(url.query))
+                self.send_response(status)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                if send_body:
+                    self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+
+class FakePlexServer(LocalHttpServer):
+    """
+    Minimal Plex Media Server with a single TV library section. Serves the endpoints used by plexapi to connect to a
+    server, to search a show and list its episodes, and the paged listing of all episodes of a section.
+    :param tv_shows: Show title -> list of (season number, episode number).
+    """
+    SECTION_KEY = '1'
+
+    def __init__(self, tv_shows: {str: [(int, int)]}, tv_library_name: str = 'TV Shows') -> None:
+        super().__init__()
+        self.tv_library_name = tv_library_name
+        self.__titles = list(tv_shows)
+        self.__episodes = [(title, season_number, episode_number, 0)
+                           for title in self.__titles
+                           for season_number, episode_number in tv_shows[title]]
+        self.__episodes_by_rating_key = {str(rating_key): tv_shows[title]
+                                         for rating_key, title in enumerate(self.__titles, start=1)}
+
+    def add_episode(self, title: str, season_number: int, episode_number: int) -> None:
+        """
+        Add an episode to an existing show, as if it was just added to the library.
+        """
+        self.__episodes.append((title, season_number, episode_number, int(time.time())))
+
+    def handle(self, handler, path, query):
+        path = path.rstrip('/')
+        if path == '':
+            return self.__xml('<MediaContainer friendlyName="fake-plex" machineIdentifier="fake-plex" '
+                              'version="1.13.0"/>')
+        if path == '/library':
+            return self.__xml('<MediaContainer identifier="com.plexapp.plugins.library" title1="Plex Library"/>')
+        if path == '/library/sections':
+            return self.__xml('<MediaContainer size="1"><Directory key="{}" type="show" title={} '
+                              'agent="com.plexapp.agents.thetvdb" scanner="Plex Series Scanner"/></MediaContainer>'
+                              .format(self.SECTION_KEY, quoteattr(self.tv_library_name)))
+        if path == '/library/sections/{}/all'.format(self.SECTION_KEY):
+            start, size = self.__container_range_of(handler, query)
+            if query.get('type') == ['2']:
+                return self.__shows_titled(query.get('title', [''])[0], start, size)
+            episodes = self.__episodes_since(int(query['addedAt>>'][0])) if 'addedAt>>' in query else \
+                self.__episodes_since(int(query['updatedAt>>'][0])) if 'updatedAt>>' in query else \
+                self.__episodes
+            return self.__episode_page(episodes[start:start + size], len(episodes))
+        if path.startswith('/library/metadata/') and path.endswith('/allLeaves'):
+            rating_key = path.split('/')[3]
+            title = self.__titles[int(rating_key) - 1]
+            episodes = [(title, season_number, episode_number, 0)
+                        for season_number, episode_number in self.__episodes_by_rating_key[rating_key]]
+            return self.__episode_page(episodes, len(episodes))
+        return 404, {}, b''
+
+    @staticmethod
+    def __container_range_of(handler, query) -> (int, int):
+        # plexapi passes the paging parameters either as headers or as query arguments
+        def parameter(name, default):
+            return int(handler.headers.get(name) or query.get(name, [default])[0])
+
+        return parameter('X-Plex-Container-Start', 0), parameter('X-Plex-Container-Size', 10 ** 9)
+
+    def __shows_titled(self, title: str, start: int, size: int):
+        shows = [(rating_key, show_title)
+                 for rating_key, show_title in enumerate(self.__titles, start=1)
+                 if title.lower() in show_title.lower()]
+        directories = ''.join(
+            '<Directory ratingKey="{0}" key="/library/metadata/{0}/children" type="show" title={1}/>'.format(
+                rating_key, quoteattr(show_title))
+            for rating_key, show_title in shows[start:start + size])
+        return self.__xml('<MediaContainer>{}</MediaContainer>'.format(directories))
+
+    def __episodes_since(self, timestamp: int):
+        return [episode for episode in self.__episodes if episode[3] >= timestamp]
+
+    def __episode_page(self, episodes, total_size: int):
+        videos = ''.join(
+            '<Video type="episode" grandparentTitle={} parentIndex="{}" index="{}" addedAt="{}" updatedAt="{}"/>'
+            .format(quoteattr(title), season_number, episode_number, added_at, added_at)
+            for title, season_number, episode_number, added_at in episodes)
+        return self.__xml('<MediaContainer size="{}" totalSize="{}">{}</MediaContainer>'.format(
+            len(episodes), total_size, videos))
+
+    @staticmethod
+    def __xml(content: str):
+        return 200, {'Content-Type': 'text/xml;charset=utf-8'}, content.encode('utf-8')
+
+
+class FakeMyJdServer(LocalHttpServer):
+    """
+    Minimal MyJDownloader API with a single device. Implements the encrypted protocol spoken by myjdapi for connecting,
+    listing the devices and adding links to the link grabber.
+    :param email: Email the client connects with.
+    :param password: Password the client connects with.
+    :param device_name: Name of the device.
+    :param latency: Seconds every request takes, like a round trip to api.jdownloader.org and the device.
+    """
+    SESSION_TOKEN = '5e5510e7' * 8
+    DEVICE_ID = 'fake-device'
+
+    def __init__(self, email: str, password: str, device_name: str = 'fake-jd', latency: float = 0) -> None:
+        super().__init__()
+        self.device_name = device_name
+        self.latency = latency
+        self.added_links = []  # query of every link grabber call, in call order
+        session_token = bytes.fromhex(self.SESSION_TOKEN)
+        self.__login_secret = self.__secret_of(email, password, 'server')
+        self.__server_encryption_token = hashlib.sha256(self.__login_secret + session_token).digest()
+        self.__device_encryption_token = hashlib.sha256(
+            self.__secret_of(email, password, 'device') + session_token).digest()
+
+    def handle(self, handler, path, query):
+        time.sleep(self.latency)
+        if path == '/my/connect':
+            return self.__encrypted(self.__login_secret, {
+                'sessiontoken': self.SESSION_TOKEN, 'regaintoken': self.SESSION_TOKEN, 'rid': int(query['rid'][0])})
+        if path == '/my/listdevices':
+            return self.__encrypted(self.__server_encryption_token, {
+                'list': [{'name': self.device_name, 'id': self.DEVICE_ID, 'type': 'jd'}], 'rid': int(query['rid'][0])})
+        if path == '/t_{}_{}/linkgrabberv2/addLinks'.format(self.SESSION_TOKEN, self.DEVICE_ID):
+            body = handler.rfile.read(int(handler.headers['Content-Length']))
+            request = json.loads(self.__crypt(self.__device_encryption_token, base64.b64decode(body), decrypt=True))
+            with self._lock:
+                self.added_links.extend(json.loads(query) for query in request['params'])
+                link_collecting_job_id = len(self.added_links)
+            return self.__encrypted(self.__device_encryption_token,
+                                    {'data': {'id': link_collecting_job_id}, 'rid': request['rid']})
+        return 404, {}, json.dumps({'src': 'DEVICE', 'type': 'API_COMMAND_NOT_FOUND'}).encode('utf-8')
+
+    @staticmethod
+    def __secret_of(email: str, password: str, domain: str) -> bytes:
+        return hashlib.sha256(email.lower().encode('utf-8') + password.encode('utf-8') + domain.encode('utf-8')).digest()
+
+    @classmethod
+    def __encrypted(cls, token: bytes, content: dict):
+        return 200, {'Content-Type': 'application/json'}, base64.b64encode(
+            cls.__crypt(token, json.dumps(content).encode('utf-8')))
+
+    @staticmethod
+    def __crypt(token: bytes, data: bytes, decrypt: bool = False) -> bytes:
+        # AES-CBC with the first half of the token as initialization vector and the second half as key, PKCS#7 padded
+        cipher = AES.new(token[len(token) // 2:], AES.MODE_CBC, token[:len(token) // 2])
+        if decrypt:
+            data = cipher.decrypt(data)
+            return data[:-data[-1]]
+        padding = AES.block_size - len(data) % AES.block_size
+        return cipher.encrypt(data + bytes([padding]) * padding)
+
+
+class FakeSerienjunkiesSite(LocalHttpServer):
+    """
+    Replays the recorded show directory and season page fixtures. The show directory lists the given tv shows instead
+    of the recorded ones. Every season page of a tv show is the recorded season page, whose seasons are shifted by two
+    per page, so that every page lists EPISODES_PER_PAGE other episodes. Pages carry an ETag and are answered with
+    304 Not Modified when revalidated.
+    :param tv_shows: Tv show title -> number of season pages, at most MAX_PAGES.
+    :param latency: Seconds every season page takes.
+    :param rate_limit: Season pages served at the same time, further requests are answered with 429 Too Many Requests
+                       and a Retry-After of one second. Unlimited by default.
+    """
+    SHOW_DIRECTORY_PATH = '/serien/'
+    EPISODES_PER_PAGE = 20
+    MAX_PAGES = 49  # the shifted seasons must stay two-digit
+
+    def __init__(self, tv_shows: {str: int}, latency: float = 0, rate_limit: int = None) -> None:
+        super().__init__()
+        self.latency = latency
+        self.rate_limit = rate_limit
+        self.season_page_count = 0
+        self.not_modified_count = 0
+        self.rate_limited_count = 0
+        self.max_concurrent_count = 0  # most season pages served at the same time
+        self.served_at = {}  # tv show title -> time.time() its first season page was served
+        self.__concurrent_count = 0
+        self.__titles = list(tv_shows)
+        self.__page_counts = [min(page_count, self.MAX_PAGES) for page_count in tv_shows.values()]
+        self.__show_directory = (FIXTURES / 'showall.html').read_text(encoding='utf-8')
+        self.__season_page = (FIXTURES / 'season_page.html').read_text(encoding='utf-8')
+
+    @property
+    def show_directory_url(self) -> str:
+        return '{}{}?cat=0&showall'.format(self.url, self.SHOW_DIRECTORY_PATH)
+
+    def handle(self, handler, path, query):
+        if path == self.SHOW_DIRECTORY_PATH:
+            return self.__conditional(handler, self.__show_directory_page())
+
+        match = re.fullmatch(r'/show/(\d+)/(\d+)/', path)
+        if match is None:
+            return 404, {}, b''
+        show, page = int(match.group(1)), int(match.group(2))
+        if show >= len(self.__titles) or not 1 <= page <= self.__page_counts[show]:
+            return 404, {}, b''
+        with self._lock:
+            if self.rate_limit is not None and self.__concurrent_count >= self.rate_limit:
+                self.rate_limited_count += 1
+                return 429, {'Retry-After': '1'}, b''
+            self.season_page_count += 1
+            self.__concurrent_count += 1
+            self.max_concurrent_count = max(self.max_concurrent_count, self.__concurrent_count)
+        try:
+            time.sleep(self.latency)
+        finally:
+            with self._lock:
+                self.__concurrent_count -= 1
+                if page == 1:
+                    self.served_at.setdefault(self.__titles[show], time.time())
+        return self.__conditional(handler, self.__season_page_of(show, page))
+
+    def __show_directory_page(self) -> str:
+        recorded_items = re.findall(r'\t<li class="cat-item.*?</li>', self.__show_directory, re.DOTALL)
+        items = '\n'.join('\t<li class="cat-item cat-item-{0}"><a href="{1}/show/{0}/1/">{2}</a>\n</li>'.format(
+            show, self.url, escape(title)) for show, title in enumerate(self.__titles))
+        return self.__show_directory.replace('\n'.join(recorded_items), items)
+
+    def __season_page_of(self, show: int, page: int) -> str:
+        next_page_link = '<a class="next" href="{}/show/{}/{}/">'.format(self.url, show, page + 1) \
+            if page < self.__page_counts[show] \
+            else '<a>'
+        season_page = re.sub(r'<a class="next" href="[^"]*">', next_page_link, self.__season_page)
+        season_page = re.sub(r'S0(\d)E', lambda season: 'S{:02}E'.format(int(season.group(1)) + 2 * (page - 1)),
+                             season_page)
+        return season_page.replace('The.Expanse', re.sub(r'\W+', '.', self.__titles[show]))
+
+    def __conditional(self, handler, page: str):
+        body = page.encode('utf-8')
+        etag = '"{}"'.format(hashlib.sha1(body).hexdigest())
+        if handler.headers.get('If-None-Match') == etag:
+            with self._lock:
+                self.not_modified_count += 1
+            return 304, {'ETag': etag}, b''
+        return 200, {'Content-Type': 'text/html; charset=utf-8', 'ETag': etag}, body
+
+
+class FakeHosterServer(LocalHttpServer):
+    """
+    Hoster of download links, answers every link with 200 OK, or with 404 Not Found if the link is dead.
+    :param dead_paths: Paths of the dead links.
+    :param latency: Seconds every request takes.
+    """
+
+    def __init__(self, dead_paths: {str} = (), latency: float = 0) -> None:
+        super().__init__()
+        self.dead_paths = set(dead_paths)
+        self.latency = latency
+
+    def link(self, path: str) -> str:
+        return self.url + path
+
+    def handle(self, handler, path, query):
+        time.sleep(self.latency)
+        if path in self.dead_paths:
+            return 404, {}, b''
+        return 200, {'Content-Type': 'text/html; charset=utf-8'}, b'<html><body>download</body></html>'
+
+
+class FakeWebhookServer(LocalHttpServer):
+    """
+    Endpoint that accepts POSTed JSON arrays of records and keeps them.
+    :param latency: Seconds every request takes.
+    """
+
+    def __init__(self, latency: float = 0) -> None:
+        super().__init__()
+        self.latency = latency
+        self.records = []
+
+    def handle(self, handler, path, query):
+        time.sleep(self.latency)
+        records = json.loads(handler.rfile.read(int(handler.headers['Content-Length'])))
+        with self._lock:
+            self.records.extend(records)
+        return 204, {}, b''
+
+
+def synthetic_library(tv_show_count: int, seasons: int, episodes_per_season: int) -> {str: [(int, int)]}:
+    return {'Show {}'.format(show): [(season_number, episode_number)
+                                     for season_number in range(1, seasons + 1)
+                                     for episode_number in range(1, episodes_per_season + 1)]
+            for show in range(tv_show_count)}
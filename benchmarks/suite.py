@@ -0,0 +1,161 @@
+"""
+Offline benchmark suite of the whole crawl. Every scenario crawls a local copy of serienjunkies
+(benchmarks.stubs.FakeSerienjunkiesSite) with the project settings and the JDownloaderPipeline; Plex and MyJDownloader
+are local stand-ins. Every crawl runs in a fresh interpreter, so CPU time and peak RSS are those of the crawl alone.
+
+Scenarios:
+    cold        50 tv shows with 3 season pages each, empty caches
+    warm        the same site again with the caches of the cold run, every season page is revalidated
+    500_shows   500 tv shows with a single season page each
+    huge_show   a single tv show with 49 season pages, 980 episodes
+
+Prints one JSON object per scenario with the wall clock time, the requests, pages/s, items/s, the CPU time, the peak
+RSS and the time spent per stage of the crawl, e.g. to be compared against a baseline in CI:
+
+    $ python -m benchmarks.suite [scenario ...] [--output results.json]
+"""
+import argparse
+import contextlib
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.config import use_config
+from benchmarks.stubs import FakeMyJdServer, FakePlexServer, FakeSerienjunkiesSite
+
+EMAIL = 'user@example.org'
+PASSWORD = 'secret'
+
+
+def tv_shows_of(tv_show_count: int, page_count: int) -> {str: int}:
+    return {'Show {}'.format(show): page_count for show in range(tv_show_count)}
+
+
+# scenario name -> (tv show title -> number of season pages, name of the scenario whose caches are reused)
+SCENARIOS = {
+    'cold': (tv_shows_of(50, 3), None),
+    'warm': (tv_shows_of(50, 3), 'cold'),
+    '500_shows': (tv_shows_of(500, 1), None),
+    'huge_show': (tv_shows_of(1, FakeSerienjunkiesSite.MAX_PAGES), None),
+}
+
+
+def run_scenario(name: str, site: FakeSerienjunkiesSite, config_dir: str) -> dict:
+    """
+    Crawl the site of a scenario in a child process.
+    :param site: Running site of the scenario.
+    :param config_dir: Directory of the configuration and the caches of the run.
+    """
+    tv_shows = SCENARIOS[name][0]
+    site_requests, season_pages, not_modified = site.request_count, site.season_page_count, site.not_modified_count
+
+    with FakePlexServer({}) as plex, FakeMyJdServer(EMAIL, PASSWORD) as my_jd:
+        use_config(plex_server_url=plex.url, config_dir=config_dir, tv_shows=list(tv_shows),
+                   general={'language': 'english', 'only_latest_episodes': False},
+                   item_pipelines={'myjdownloader': {
+                       'email': EMAIL, 'password': PASSWORD, 'device_name': my_jd.device_name,
+                       'api_url': my_jd.url, 'tv_shows_dir': '/tmp', 'autostart_downloads': False}})
+        environment = dict(os.environ, BENCHMARK_SHOW_DIRECTORY_URL=site.show_directory_url)
+        output = subprocess.check_output([sys.executable, '-m', 'benchmarks.suite', '--crawl', config_dir],
+                                         env=environment)
+        result = json.loads(output.decode('utf-8').strip().splitlines()[-1])
+
+        return dict(scenario=name, tv_shows=len(tv_shows), **result,
+                    site_requests=site.request_count - site_requests,
+                    season_pages_served=site.season_page_count - season_pages,
+                    not_modified=site.not_modified_count - not_modified,
+                    plex_requests=plex.request_count, jd_requests=my_jd.request_count,
+                    links_added=len(my_jd.added_links))
+
+
+def crawl(config_dir: str) -> dict:
+    """
+    Entry point of the child process, crawls the site and measures the crawl.
+    """
+    os.environ.setdefault('SCRAPY_SETTINGS_MODULE', 'seriesscraper.settings')
+    from scrapy.crawler import CrawlerProcess
+    from scrapy.utils.project import get_project_settings
+    from benchmarks.spider import BenchmarkSpider
+    from seriesscraper.instrumentation import STAGE_STATS_KEY_PREFIX
+
+    settings = get_project_settings()
+    settings.setdict({'HTTPCACHE_DIR': os.path.join(config_dir, 'httpcache'), 'LOG_LEVEL': 'WARNING',
+                      'ROBOTSTXT_OBEY': False}, priority='cmdline')
+    process = CrawlerProcess(settings)
+    crawler = process.create_crawler(BenchmarkSpider)
+    process.crawl(crawler)
+
+    usage_before = resource.getrusage(resource.RUSAGE_SELF)
+    start = time.perf_counter()
+    process.start()
+    seconds = time.perf_counter() - start
+    usage_after = resource.getrusage(resource.RUSAGE_SELF)
+
+    stats = crawler.stats.get_stats()
+    responses = stats.get('downloader/response_count', 0)
+    items = stats.get('item_scraped_count', 0)
+    return {
+        'seconds': round(seconds, 3),
+        'cpu_seconds': round(usage_after.ru_utime + usage_after.ru_stime
+                             - usage_before.ru_utime - usage_before.ru_stime, 3),
+        'peak_rss_kib': usage_after.ru_maxrss,
+        'requests': stats.get('downloader/request_count', 0),
+        'responses': responses,
+        'items': items,
+        'pages_per_second': round(responses / seconds, 2),
+        'items_per_second': round(items / seconds, 2),
+        'httpcache_revalidations': stats.get('httpcache/revalidate', 0),
+        'extraction_cache_hits': stats.get('seriesscraper/extraction_cache/hit', 0),
+        'stage_seconds': {key.split('/')[-2]: round(value, 3) for key, value in stats.items()
+                          if key.startswith(STAGE_STATS_KEY_PREFIX) and key.endswith('/seconds')},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run the offline benchmark scenarios of the crawl.')
+    parser.add_argument('scenarios', nargs='*', metavar='scenario',
+                        help='scenarios to run, all by default: {}'.format(', '.join(SCENARIOS)))
+    parser.add_argument('--output', help='also write the results as a JSON list to this file')
+    parser.add_argument('--crawl', metavar='CONFIG_DIR', help=argparse.SUPPRESS)
+    arguments = parser.parse_args()
+
+    if arguments.crawl:
+        print(json.dumps(crawl(arguments.crawl)))
+        return
+
+    unknown_scenarios = set(arguments.scenarios) - set(SCENARIOS)
+    if unknown_scenarios:
+        parser.error('unknown scenarios: {}'.format(', '.join(sorted(unknown_scenarios))))
+
+    names = []
+    for name in arguments.scenarios or list(SCENARIOS):
+        reused_scenario = SCENARIOS[name][1]
+        if reused_scenario and reused_scenario not in names:
+            names.append(reused_scenario)
+        if name not in names:
+            names.append(name)
+
+    results = []
+    with contextlib.ExitStack() as stack:
+        sites, config_dirs = {}, {}  # scenario name -> site / directory of the caches, shared with the reusing scenario
+        for name in names:
+            tv_shows, reused_scenario = SCENARIOS[name]
+            if reused_scenario:
+                sites[name], config_dirs[name] = sites[reused_scenario], config_dirs[reused_scenario]
+            else:
+                sites[name] = stack.enter_context(FakeSerienjunkiesSite(tv_shows))
+                config_dirs[name] = tempfile.mkdtemp(prefix='seriesscraper-suite-')
+            results.append(run_scenario(name, sites[name], config_dirs[name]))
+            print(json.dumps(results[-1]), flush=True)
+
+    if arguments.output:
+        with open(arguments.output, 'w') as file_handle:
+            json.dump(results, file_handle, indent=2)
+
+
+if __name__ == '__main__':
+    main()
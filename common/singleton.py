@@ -1,6 +1,9 @@
+import threading
+
+
 class Singleton:
     """
-    A non-thread-safe helper class to ease implementing singletons.
+    A thread-safe helper class to ease implementing singletons.
     This should be used as a decorator -- not a metaclass -- to the
     class that should be a singleton.
 
@@ -16,19 +19,25 @@ class Singleton:
 
     def __init__(self, decorated):
         self._decorated = decorated
+        self._lock = threading.Lock()
 
     def instance(self):
         """
         Returns the singleton instance. Upon its first call, it creates a
         new instance of the decorated class and calls its `__init__` method.
         On all subsequent calls, the already created instance is returned.
+        Threads calling it concurrently for the first time get the same
+        instance.
 
         """
         try:
             return self._instance
         except AttributeError:
-            self._instance = self._decorated()
-            return self._instance
+            with self._lock:
+                # another thread may have created the instance while this one waited for the lock
+                if not hasattr(self, '_instance'):
+                    self._instance = self._decorated()
+                return self._instance
 
     def __call__(self):
         raise TypeError('Singletons must be accessed through `instance()`.')
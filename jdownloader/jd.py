@@ -1,22 +1,68 @@
-from dataclasses import asdict
-
-from myjdapi import myjdapi
+import threading
+from dataclasses import asdict, astuple, replace
 
 from jdownloader.jdlink import JdLink
 from seriesscraper.config.config import Config
 
 
 class Jd:
+    """
+    Client of the JDownloader device. Connects to MyJDownloader when the first links are added, so runs that find
+    nothing new never connect.
+    """
+
     def __init__(self) -> None:
         super().__init__()
-        config = Config.instance()
-        self.__connect_to_jd(config)
+        # myjdapi keeps the request id of the session in the client, so calls must not overlap
+        self.__lock = threading.Lock()
+        self.__jd_device = None
+
+    @property
+    def jd_device(self):
+        with self.__lock:
+            return self.__connected_jd_device()
+
+    def __connected_jd_device(self):
+        if self.__jd_device is None:
+            self.__jd_device = self.__connect_to_jd(Config.instance())
+        return self.__jd_device
+
+    @staticmethod
+    def __connect_to_jd(config):
+        # myjdapi and its crypto dependencies are imported on first use
+        from jdownloader.myjdapi_client import MyJdApi
 
-    def __connect_to_jd(self, config):
         email, password, device = config.get_jd_credentials()
-        jd = myjdapi.Myjdapi()
+        jd = MyJdApi(config.get_jd_api_url() or None)
         jd.connect(email, password)
-        self.jd_device = jd.get_device(device)
+        return jd.get_device(device)
 
     def add_link(self, jd_link: JdLink):
-        self.jd_device.linkgrabber.add_links([asdict(jd_link)])
+        self.add_links([jd_link])
+
+    def add_links(self, jd_links: [JdLink]) -> int:
+        """
+        Add links to the link grabber. Links that only differ in their URLs are added with a single API call, as the
+        link grabber accepts one package configuration per call.
+        :param jd_links: Links to add. Safe to call from any thread.
+        :return: Number of API calls.
+        """
+        merged_jd_links = merge_jd_links(jd_links)
+        with self.__lock:
+            jd_device = self.__connected_jd_device()
+            for jd_link in merged_jd_links:
+                jd_device.linkgrabber.add_links([asdict(jd_link)])
+        return len(merged_jd_links)
+
+
+def merge_jd_links(jd_links: [JdLink]) -> [JdLink]:
+    """
+    Merge links with equal package configuration into one link with newline separated URLs, keeping the order of
+    their first occurrence. The release of several episodes is scraped once per episode, its URL is added once.
+    """
+    packages = {}  # package configuration -> (first link of the package, urls)
+    for jd_link in jd_links:
+        package = astuple(replace(jd_link, links=None))  # JdLink is not hashable
+        packages.setdefault(package, (jd_link, {}))[1][jd_link.links] = None
+
+    return [replace(jd_link, links='\n'.join(links)) for jd_link, links in packages.values()]
@@ -0,0 +1,25 @@
+from myjdapi import myjdapi
+
+# private attribute of Myjdapi that holds the API URL, as of myjdapi 1.0.2
+API_URL_ATTRIBUTE = '_Myjdapi__api_url'
+
+
+class MyJdApi(myjdapi.Myjdapi):
+    """
+    Myjdapi client of the API at api_url, e.g. a self-hosted or local stand-in of MyJDownloader, or of the official API
+    if api_url is None. Myjdapi has no parameter for the API URL, so the URL it was created with is replaced; a myjdapi
+    version that keeps its URL elsewhere is refused instead of silently connecting to the official API.
+    """
+
+    def __init__(self, api_url: str = None) -> None:
+        super().__init__()
+        if api_url is None:
+            return
+        if API_URL_ATTRIBUTE not in vars(self):
+            raise RuntimeError('The installed myjdapi does not support a custom API URL, remove '
+                               'item_pipelines.myjdownloader.api_url from the configuration or install myjdapi 1.0.2')
+        setattr(self, API_URL_ATTRIBUTE, api_url.rstrip('/'))
+
+    @property
+    def api_url(self) -> str:
+        return getattr(self, API_URL_ATTRIBUTE)
@@ -0,0 +1,108 @@
+import sqlite3
+import time
+from pathlib import Path
+
+from plex.model import PlexEpisodeIndex
+
+
+class PlexCache:
+    """
+    SQLite backed cache of the resolved Plex server connection and of the episode index of the TV library, so that
+    consecutive runs neither have to ask plex.tv for the server nor download every episode of the library again.
+    """
+
+    def __init__(self, cache_file: Path) -> None:
+        super().__init__()
+        # used by one thread at a time, but not always the same one, e.g. by the daemon (seriesscraper.daemon)
+        self.__db = sqlite3.connect(str(cache_file), check_same_thread=False)
+        self.__create_tables()
+
+    def __create_tables(self) -> None:
+        with self.__db:
+            self.__db.executescript('''
+                CREATE TABLE IF NOT EXISTS connection (
+                    server_name TEXT PRIMARY KEY,
+                    baseurl TEXT NOT NULL,
+                    token TEXT,
+                    resolved_at REAL NOT NULL
+                );
+                CREATE TABLE IF NOT EXISTS snapshot (
+                    library TEXT PRIMARY KEY,
+                    section_key TEXT NOT NULL,
+                    full_refresh_at REAL NOT NULL,
+                    refreshed_at REAL NOT NULL
+                );
+                CREATE TABLE IF NOT EXISTS episode (
+                    library TEXT NOT NULL,
+                    show_title TEXT NOT NULL,
+                    season_number INTEGER NOT NULL,
+                    episode_number INTEGER NOT NULL,
+                    PRIMARY KEY (library, show_title, season_number, episode_number)
+                ) WITHOUT ROWID;
+            ''')
+
+    # region server connection
+    def get_connection(self, server_name: str, ttl: float) -> (str, str):
+        """
+        Get the cached connection to a Plex server.
+        :param server_name: Name of the Plex server.
+        :param ttl: Maximum age of the cached connection in seconds.
+        :return: (base url, token) of the server or None if there is no connection younger than ttl.
+        """
+        row = self.__db.execute('SELECT baseurl, token FROM connection WHERE server_name = ? AND resolved_at >= ?',
+                                (server_name, time.time() - ttl)).fetchone()
+        return row if row else None
+
+    def put_connection(self, server_name: str, baseurl: str, token: str) -> None:
+        with self.__db:
+            self.__db.execute('INSERT OR REPLACE INTO connection VALUES (?, ?, ?, ?)',
+                              (server_name, baseurl, token, time.time()))
+
+    def delete_connection(self, server_name: str) -> None:
+        with self.__db:
+            self.__db.execute('DELETE FROM connection WHERE server_name = ?', (server_name,))
+
+    # endregion
+
+    # region episode index
+    def get_snapshot_info(self, library: str) -> (str, float, float):
+        """
+        Get the meta data of the cached episode index of a library.
+        :param library: Name of the TV library.
+        :return: (section key, time of last full refresh, time of last refresh) or None if nothing is cached.
+        """
+        return self.__db.execute('SELECT section_key, full_refresh_at, refreshed_at FROM snapshot WHERE library = ?',
+                                 (library,)).fetchone()
+
+    def get_episode_index(self, library: str) -> PlexEpisodeIndex:
+        episode_index = PlexEpisodeIndex()
+        for show_title, season_number, episode_number in self.__db.execute(
+                'SELECT show_title, season_number, episode_number FROM episode WHERE library = ?', (library,)):
+            episode_index.add(show_title, season_number, episode_number)
+        return episode_index
+
+    def put_episode_index(self, library: str, section_key: str, episode_index: PlexEpisodeIndex,
+                          refreshed_at: float) -> None:
+        """
+        Replace the cached episode index of a library with a full snapshot.
+        """
+        with self.__db:
+            self.__db.execute('DELETE FROM episode WHERE library = ?', (library,))
+            self.__insert_episodes(library, episode_index)
+            self.__db.execute('INSERT OR REPLACE INTO snapshot VALUES (?, ?, ?, ?)',
+                              (library, section_key, refreshed_at, refreshed_at))
+
+    def add_episodes(self, library: str, episode_index: PlexEpisodeIndex, refreshed_at: float) -> None:
+        """
+        Add the episodes of an incremental refresh to the cached episode index of a library.
+        """
+        with self.__db:
+            self.__insert_episodes(library, episode_index)
+            self.__db.execute('UPDATE snapshot SET refreshed_at = ? WHERE library = ?', (refreshed_at, library))
+
+    def __insert_episodes(self, library: str, episode_index: PlexEpisodeIndex) -> None:
+        self.__db.executemany('INSERT OR IGNORE INTO episode VALUES (?, ?, ?, ?)',
+                              ((library, show_title, season_number, episode_number)
+                               for show_title in episode_index.titles()
+                               for season_number, episode_number in episode_index.episodes_of(show_title)))
+    # endregion
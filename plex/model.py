@@ -1,8 +1,41 @@
-from dataclasses import dataclass
+from typing import Dict, Set, Tuple
 
 
-@dataclass
-class PlexEpisode:
-    TYPE: str
-    grandparentTitle: str
-    seasonEpisode: str
+class PlexEpisodeIndex:
+    """
+    In-memory index of the episodes of a Plex TV library: show title -> set of (season number, episode number).
+    """
+
+    def __init__(self) -> None:
+        self.__episodes_by_title: Dict[str, Set[Tuple[int, int]]] = {}
+        self.__titles_by_folded_title: Dict[str, str] = {}
+
+    def add(self, show_title: str, season_number: int, episode_number: int) -> None:
+        if show_title not in self.__episodes_by_title:
+            self.__episodes_by_title[show_title] = set()
+            self.__titles_by_folded_title.setdefault(show_title.casefold(), show_title)
+        self.__episodes_by_title[show_title].add((season_number, episode_number))
+
+    def update(self, other: 'PlexEpisodeIndex') -> None:
+        for show_title in other.titles():
+            for season_number, episode_number in other.episodes_of(show_title):
+                self.add(show_title, season_number, episode_number)
+
+    def episodes_of(self, tv_show_name: str) -> Set[Tuple[int, int]]:
+        """
+        Get existing episodes of a tv show. Falls back to a case insensitive match of the show title, like the
+        Plex search does.
+        :param tv_show_name: Name of the tv show.
+        :return: Set of (season number, episode number), empty if the tv show is not in the library.
+        """
+        episodes = self.__episodes_by_title.get(tv_show_name)
+        if episodes is None:
+            title = self.__titles_by_folded_title.get(tv_show_name.casefold())
+            episodes = self.__episodes_by_title.get(title, set())
+        return episodes
+
+    def titles(self) -> [str]:
+        return list(self.__episodes_by_title)
+
+    def __len__(self) -> int:
+        return sum(len(episodes) for episodes in self.__episodes_by_title.values())
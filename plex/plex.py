@@ -1,31 +1,126 @@
-from plexapi.myplex import MyPlexAccount
-from plexapi.server import PlexServer
+import logging
+import time
 
-from plex.model import PlexEpisode
+from plex.cache import PlexCache
+from plex.model import PlexEpisodeIndex
 from seriesscraper.config.config import Config
 
+EPISODE_TYPE = 4  # plex metadata type of episodes
+EPISODE_PAGE_SIZE = 2000  # number of episodes fetched per request when building the episode index
+REFRESH_OVERLAP = 300  # seconds an incremental refresh reaches back, covers clock skew between crawler and server
+PLEX_CACHE_FILE_NAME = 'plex_cache.sqlite'
+
 
 class Plex:
     def __init__(self) -> None:
         super().__init__()
         config = Config.instance()
-        self.__connect_to_plex(config)
+        self.__plex = None
         self.__load_variables_from(config)
 
-    def __connect_to_plex(self, config) -> None:
+    @property
+    def plex(self) -> 'PlexServer':
+        # connect on first use, warm runs might be served from the cached episode index entirely
+        if self.__plex is None:
+            self.__plex = self.__connect_to_plex(Config.instance())
+        return self.__plex
+
+    def __connect_to_plex(self, config) -> 'PlexServer':
+        # plexapi is imported on first use, runs served from the cached episode index do not need it
+        from plexapi.exceptions import PlexApiException
+        from plexapi.myplex import MyPlexAccount
+        from plexapi.server import PlexServer
+        from requests.exceptions import RequestException
+
+        server_url, server_token = config.get_plex_server_url_and_token()
+        if server_url:
+            # direct connection, e.g. to a server in the local network, skips the plex.tv resource discovery
+            return PlexServer(server_url, server_token)
+
         plex_username, plex_password, plex_server = config.get_plex_credentials()
+        cached_connection = self.__cache.get_connection(plex_server, self.connection_ttl)
+        if cached_connection:
+            try:
+                return PlexServer(*cached_connection)
+            except (RequestException, PlexApiException):
+                logging.info('Cached connection to Plex server {} is stale, resolving it again.'.format(plex_server))
+                self.__cache.delete_connection(plex_server)
+
         account = MyPlexAccount(plex_username, plex_password)
-        self.plex: PlexServer = account.resource(plex_server).connect()
+        server = account.resource(plex_server).connect()
+        self.__cache.put_connection(plex_server, server._baseurl, server._token)
+        return server
 
     def __load_variables_from(self, config):
         self.tv_library_name = config.get_plex_tv_library()
+        self.connection_ttl, self.episodes_ttl, self.full_refresh_ttl = config.get_plex_cache_ttls()
+        self.__cache = PlexCache(config.get_cache_dir() / PLEX_CACHE_FILE_NAME)
 
-    def get_existing_episodes_of(self, tv_show_name: str) -> [PlexEpisode]:
+    def get_episode_index(self) -> PlexEpisodeIndex:
         """
-        Get existing episodes of a tv show.
-        :param tv_show_name: Name of the tv show.
-        :return: List of existing episodes.
+        Get the existing episodes of all tv shows of the tv library. The index is served from the on-disk cache for
+        episodes_ttl seconds. After that, only episodes added or updated since the last refresh are fetched, and
+        every full_refresh_ttl seconds the index is rebuilt from scratch to drop deleted episodes.
+        :return: Index of show title -> set of (season number, episode number).
         """
-        tv_library = self.plex.library.section(self.tv_library_name)
-        tv_show = tv_library.search(title=tv_show_name, libtype='show').pop()
-        return tv_show.episodes()
+        now = time.time()
+        snapshot_info = self.__cache.get_snapshot_info(self.tv_library_name)
+        if snapshot_info is None or snapshot_info[1] < now - self.full_refresh_ttl:
+            return self.__refresh_episode_index(now)
+
+        section_key, _, refreshed_at = snapshot_info
+        episode_index = self.__cache.get_episode_index(self.tv_library_name)
+        if refreshed_at >= now - self.episodes_ttl:
+            return episode_index
+
+        new_episodes = PlexEpisodeIndex()
+        refresh_since = int(refreshed_at - REFRESH_OVERLAP)
+        self.__fetch_episodes_into(new_episodes, section_key, 'addedAt>>={}'.format(refresh_since))
+        self.__fetch_episodes_into(new_episodes, section_key, 'updatedAt>>={}'.format(refresh_since))
+        self.__cache.add_episodes(self.tv_library_name, new_episodes, now)
+
+        episode_index.update(new_episodes)
+        return episode_index
+
+    def __refresh_episode_index(self, refreshed_at: float) -> PlexEpisodeIndex:
+        section_key = str(self.plex.library.section(self.tv_library_name).key)
+        episode_index = PlexEpisodeIndex()
+        self.__fetch_episodes_into(episode_index, section_key)
+        self.__cache.put_episode_index(self.tv_library_name, section_key, episode_index, refreshed_at)
+        return episode_index
+
+    def __fetch_episodes_into(self, episode_index: PlexEpisodeIndex, section_key: str, episode_filter: str = None):
+        """
+        Fetch the episodes of a library section in pages of EPISODE_PAGE_SIZE episodes.
+        :param episode_index: Index the fetched episodes are added to.
+        :param section_key: Key of the library section.
+        :param episode_filter: Optional plex filter expression, e.g. addedAt>>=1556000000
+        """
+        key = '/library/sections/{}/all?type={}'.format(section_key, EPISODE_TYPE)
+        if episode_filter:
+            key = '{}&{}'.format(key, episode_filter)
+
+        container_start = 0
+        while True:
+            container = self.plex.query(key, headers={'X-Plex-Container-Start': str(container_start),
+                                                      'X-Plex-Container-Size': str(EPISODE_PAGE_SIZE)})
+            if container is None:
+                break
+
+            for video in container:
+                self.__add_video_to(episode_index, video)
+
+            container_start += EPISODE_PAGE_SIZE
+            total_size = int(container.attrib.get('totalSize', container.attrib.get('size', 0)))
+            if len(container) < EPISODE_PAGE_SIZE or container_start >= total_size:
+                break
+
+    @staticmethod
+    def __add_video_to(episode_index: PlexEpisodeIndex, video) -> None:
+        show_title = video.attrib.get('grandparentTitle')
+        season_number = video.attrib.get('parentIndex')
+        episode_number = video.attrib.get('index')
+        if show_title is None or season_number is None or episode_number is None:
+            return  # not yet matched episodes have no season/episode index
+
+        episode_index.add(show_title, int(season_number), int(episode_number))
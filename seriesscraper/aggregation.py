@@ -0,0 +1,96 @@
+from seriesscraper.episode_index import EpisodeKey
+from seriesscraper.ranking import ReleaseCandidate, ReleaseRanking
+
+
+class ShowAggregation:
+    """
+    Release candidates of the episodes of one tv show, collected across its season pages, so that an episode listed on
+    several pages, e.g. in another resolution or as a repack, is emitted once with the best release of all pages. One
+    aggregation is passed along the requests of the season pages of a tv show, from its first page to its last.
+
+    Memory is bounded per tv show: only the max_releases best ranked candidates of an episode are kept, and once
+    max_episodes episodes are collected they are emitted early. Episodes emitted early are not emitted again, and
+    neither are the complete season and the single episodes of a season: whichever is emitted first wins.
+    """
+    __slots__ = ('__ranking', '__max_episodes', '__max_releases', '__episodes', '__emitted_episodes',
+                 '__seasons_with_episodes', '__seasons_with_pack', '__visited_urls', '__page_count', 'merged_count')
+
+    def __init__(self, ranking: ReleaseRanking, max_episodes: int = 500, max_releases: int = 10) -> None:
+        self.__ranking = ranking
+        self.__max_episodes = max_episodes
+        self.__max_releases = max_releases
+        self.__episodes = {}  # EpisodeKey -> [ReleaseCandidate]
+        self.__emitted_episodes = set()
+        self.__seasons_with_episodes = set()  # seasons of which single episodes were emitted
+        self.__seasons_with_pack = set()  # seasons that were emitted as complete season
+        self.__visited_urls = set()
+        self.__page_count = 0
+        self.merged_count = 0  # releases of an episode found on a further page
+
+    def visit(self, url: str, redirect_urls: [str] = ()) -> None:
+        """
+        Record a season page under its URL and the URLs that redirected to it.
+        """
+        self.__visited_urls.add(url)
+        self.__visited_urls.update(redirect_urls)
+        self.__page_count += 1
+
+    @property
+    def page_count(self) -> int:
+        return self.__page_count
+
+    @property
+    def episode_count(self) -> int:
+        """
+        Episodes collected so far, including the ones emitted early.
+        """
+        return len(self.__episodes) + len(self.__emitted_episodes)
+
+    def has_visited(self, url: str) -> bool:
+        """
+        Whether the season page was already aggregated, e.g. when pages link to each other in a loop.
+        """
+        return url in self.__visited_urls
+
+    def add(self, episodes: {EpisodeKey: [ReleaseCandidate]}) -> None:
+        for episode_key, release_candidates in episodes.items():
+            if episode_key in self.__emitted_episodes:
+                continue
+
+            collected = self.__episodes.get(episode_key)
+            if collected is None:
+                collected = []
+            else:
+                self.merged_count += 1
+            collected = collected + release_candidates
+            if len(collected) > self.__max_releases:
+                collected = self.__ranking.ranked(collected)[:self.__max_releases]
+            self.__episodes[episode_key] = collected
+
+    @property
+    def is_full(self) -> bool:
+        return len(self.__episodes) >= self.__max_episodes
+
+    def drain(self) -> [(EpisodeKey, [ReleaseCandidate])]:
+        """
+        The collected episodes with their best ranked release candidates, best first. Complete seasons are only
+        returned if no single episode of the season was collected, single episodes only if the complete season was not
+        returned before. The aggregation is empty afterwards.
+        """
+        seasons_with_episodes = self.__seasons_with_episodes | {
+            episode_key.season_number for episode_key in self.__episodes if not episode_key.is_season_pack}
+        drained = []
+        for episode_key, release_candidates in self.__episodes.items():
+            if episode_key.is_season_pack:
+                if episode_key.season_number in seasons_with_episodes:
+                    continue
+                self.__seasons_with_pack.add(episode_key.season_number)
+            elif episode_key.season_number in self.__seasons_with_pack:
+                continue
+            else:
+                self.__seasons_with_episodes.add(episode_key.season_number)
+            drained.append((episode_key, self.__ranking.ranked(release_candidates)))
+
+        self.__emitted_episodes.update(self.__episodes)
+        self.__episodes = {}
+        return drained
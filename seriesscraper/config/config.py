@@ -1,17 +1,42 @@
 import logging
+import os
 import sys
+import time
 from pathlib import Path
 
 from common.singleton import Singleton
-from seriesscraper.config.model import TvShowConfig, LanguageConfig
+from seriesscraper.config.model import TvShowConfig, LanguageConfig, ConfigSnapshot
+
+LANGUAGES = {'english': LanguageConfig.ENGLISH, 'german': LanguageConfig.GERMAN}
+_REQUIRED = object()
+
+
+class ConfigError(ValueError):
+    """
+    The configuration file does not match the expected structure, lists every problem found.
+    """
+
+    def __init__(self, config_file: Path, problems: [str]) -> None:
+        super().__init__('Invalid configuration file {}:\n{}'.format(
+            config_file, '\n'.join('- {}'.format(problem) for problem in problems)))
+        self.problems = problems
 
 
 @Singleton
 class Config:
-    __config_file = Path(__file__).parents[2] / 'config.yaml'  # root dir of project
+    __config_file = Path(os.environ.get('SERIESSCRAPER_CONFIG',
+                                        Path(__file__).parents[2] / 'config.yaml'))  # root dir of project
 
     def __init__(self) -> None:
-        self.__config = self.__load_config()
+        start = time.perf_counter()
+        self.__modified_at = self.__modification_time()
+        try:
+            self.__snapshot = snapshot_of(self.__load_config(), Path(self.__config_file))
+        except ConfigError as error:
+            logging.error(error)
+            sys.exit(1)
+        # seconds it took to read and validate the configuration file, last reload included
+        self.load_seconds = time.perf_counter() - start
 
     def __load_config(self) -> dict:
         import yaml
@@ -22,37 +47,211 @@ class Config:
             sys.exit(0)
 
         with open(self.__config_file, 'r') as file_handle:
-            content = yaml.load(file_handle)  # throws YAMLError
+            content = yaml.safe_load(file_handle)  # throws YAMLError
             return content
 
+    def __modification_time(self) -> float:
+        try:
+            return Path(self.__config_file).stat().st_mtime
+        except OSError:
+            return 0
+
+    def reload_if_modified(self) -> bool:
+        """
+        Read the configuration file again if it was modified since it was read, and swap in its snapshot. An invalid
+        file is logged and the current snapshot is kept, until the file is modified again.
+        :return: Whether a new snapshot was swapped in.
+        """
+        import yaml
+
+        start = time.perf_counter()
+        modified_at = self.__modification_time()
+        if modified_at == self.__modified_at:
+            return False
+
+        self.__modified_at = modified_at
+        try:
+            with open(self.__config_file, 'r') as file_handle:
+                content = yaml.safe_load(file_handle)
+            snapshot = snapshot_of(content, Path(self.__config_file))
+        except (OSError, yaml.YAMLError, ConfigError) as error:
+            logging.error('Keeping the current configuration, the modified file is invalid: {}'.format(error))
+            return False
+
+        if snapshot == self.__snapshot:
+            return False
+        # getters called after this see the new snapshot, get_snapshot gives a consistent view across several settings
+        self.__snapshot = snapshot
+        self.load_seconds = time.perf_counter() - start
+        return True
+
+    def get_snapshot(self) -> ConfigSnapshot:
+        return self.__snapshot
+
     def get_language(self) -> LanguageConfig:
-        language_setting = self.__config['general']['language']
-        return LanguageConfig.ENGLISH if language_setting == 'english' else LanguageConfig.GERMAN
+        return self.__snapshot.languages[0]
+
+    def get_languages(self) -> [LanguageConfig]:
+        return self.__snapshot.languages
 
     def get_only_latest_episodes(self) -> bool:
-        return self.__config['general']['only_latest_episodes']
+        return self.__snapshot.only_latest_episodes
 
     def get_tv_shows(self) -> [TvShowConfig]:
-        return [TvShowConfig(name=tv_show['name'])
-                for tv_show in self.__config['tv_shows']]
+        return self.__snapshot.tv_shows
 
     def get_plex_credentials(self) -> (str, str, str):
-        return self.__config['plex']['username'], self.__config['plex']['password'], self.__config['plex'][
-            'server_name']
+        return self.__snapshot.plex_credentials
+
+    def get_plex_server_url_and_token(self) -> (str, str):
+        return self.__snapshot.plex_server_url, self.__snapshot.plex_server_token
 
     def get_plex_tv_library(self) -> str:
-        return self.__config['plex']['tv_library_name']
+        return self.__snapshot.plex_tv_library_name
 
-    def get_serienjunkies_hoster(self) -> str:
-        return self.__config['serienjunkies']['hoster']
+    def get_plex_cache_ttls(self) -> (int, int, int):
+        return self.__snapshot.plex_cache_ttls
+
+    def get_cache_dir(self) -> Path:
+        return self.__snapshot.cache_dir
+
+    def get_serienjunkies_hosters(self) -> [str]:
+        return self.__snapshot.serienjunkies_hosters
+
+    def get_release_ranking(self) -> ([str], bool):
+        return self.__snapshot.release_resolutions, self.__snapshot.prefer_web_dl
 
     def get_jd_credentials(self) -> (str, str, str):
-        return self.__config['item_pipelines']['myjdownloader']['email'], \
-               self.__config['item_pipelines']['myjdownloader']['password'], \
-               self.__config['item_pipelines']['myjdownloader']['device_name']
+        return self.__snapshot.jd_credentials
+
+    def get_jd_enabled(self) -> bool:
+        return self.__snapshot.jd_enabled
+
+    def get_jd_api_url(self) -> str:
+        return self.__snapshot.jd_api_url
+
+    def get_jd_sent_link_ttl(self) -> int:
+        return self.__snapshot.jd_sent_link_ttl
 
     def get_jd_autostart_downloads(self) -> bool:
-        return self.__config['item_pipelines']['myjdownloader']['autostart_downloads']
+        return self.__snapshot.jd_autostart_downloads
 
     def get_jd_tv_show_dir(self) -> str:
-        return self.__config['item_pipelines']['myjdownloader']['tv_shows_dir']
+        return self.__snapshot.jd_tv_shows_dir
+
+
+def snapshot_of(content: dict, config_file: Path) -> ConfigSnapshot:
+    """
+    Validate the content of a configuration file and convert it into a ConfigSnapshot. Optional settings get their
+    defaults, settings with several values may also be given as a single value.
+    :raises ConfigError: With every problem of the content, not just the first one.
+    """
+    if not isinstance(content, dict):
+        raise ConfigError(config_file, ['the file must contain the sections general, tv_shows, plex, serienjunkies and '
+                                        'item_pipelines'])
+
+    problems = []
+    sections = {}  # dotted path -> settings of the section
+
+    def section(path: str) -> dict:
+        if path not in sections:
+            values = content
+            for key in path.split('.'):
+                values = values.get(key) if isinstance(values, dict) else None
+            if values is not None and not isinstance(values, dict):
+                problems.append('{} must be a section'.format(path))
+            sections[path] = values if isinstance(values, dict) else {}
+        return sections[path]
+
+    def setting(path: str, name: str, types, default=_REQUIRED):
+        value = section(path).get(name)
+        if value is None:
+            if default is _REQUIRED:
+                problems.append('missing setting {}.{}'.format(path, name))
+                return None
+            return default
+        # bool is an int, but a number of seconds given as True is a typo
+        if not isinstance(value, types) or (isinstance(value, bool) and bool not in _as_tuple(types)):
+            problems.append('{}.{} must be {}, not {!r}'.format(path, name, _type_names(types), value))
+            return None if default is _REQUIRED else default
+        return value
+
+    def text_setting(path: str, name: str) -> str:
+        # YAML reads unquoted passwords like 123456 as numbers
+        value = setting(path, name, (str, int, float), None)
+        return None if value is None else str(value)
+
+    def list_setting(path: str, name: str, item_type, default=_REQUIRED) -> tuple:
+        value = setting(path, name, (item_type, list), default)
+        if value is None:
+            return ()
+        items = tuple(value) if isinstance(value, list) else (value,)
+        if not items or not all(isinstance(item, item_type) for item in items):
+            problems.append('{}.{} must be {} or a non-empty list of them, not {!r}'.format(
+                path, name, _type_names(item_type), value))
+            return ()
+        return items
+
+    languages = list_setting('general', 'language', str)
+    for language in languages:
+        if language not in LANGUAGES:
+            problems.append('general.language must be one of {}, not {!r}'.format(', '.join(LANGUAGES), language))
+
+    tv_shows = []
+    for tv_show in content.get('tv_shows') or []:
+        if isinstance(tv_show, dict) and isinstance(tv_show.get('name'), str) and tv_show['name'].strip():
+            tv_shows.append(TvShowConfig(name=tv_show['name']))
+        else:
+            problems.append('every entry of tv_shows needs a name, not {!r}'.format(tv_show))
+
+    snapshot = ConfigSnapshot(
+        cache_dir=config_file.parent,
+        languages=tuple(LANGUAGES.get(language, LanguageConfig.ENGLISH) for language in languages),
+        only_latest_episodes=setting('general', 'only_latest_episodes', bool),
+        tv_shows=tuple(tv_shows),
+        plex_credentials=(text_setting('plex', 'username'),
+                          text_setting('plex', 'password'),
+                          text_setting('plex', 'server_name')),
+        plex_server_url=setting('plex', 'server_url', str, None),
+        plex_server_token=setting('plex', 'server_token', str, None),
+        plex_tv_library_name=setting('plex', 'tv_library_name', str),
+        plex_cache_ttls=(setting('plex.cache', 'connection_ttl', int, 86400),
+                         setting('plex.cache', 'episodes_ttl', int, 600),
+                         setting('plex.cache', 'full_refresh_ttl', int, 86400)),
+        serienjunkies_hosters=list_setting('serienjunkies', 'hoster', str),
+        release_resolutions=list_setting('serienjunkies.ranking', 'resolutions', str, ['1080p', '720p']),
+        prefer_web_dl=setting('serienjunkies.ranking', 'prefer_web_dl', bool, True),
+        jd_credentials=(text_setting('item_pipelines.myjdownloader', 'email'),
+                        text_setting('item_pipelines.myjdownloader', 'password'),
+                        text_setting('item_pipelines.myjdownloader', 'device_name')),
+        jd_enabled=setting('item_pipelines.myjdownloader', 'enabled', bool, True),
+        jd_api_url=setting('item_pipelines.myjdownloader', 'api_url', str, None),
+        jd_sent_link_ttl=setting('item_pipelines.myjdownloader', 'sent_link_ttl', int, 172800),
+        jd_autostart_downloads=setting('item_pipelines.myjdownloader', 'autostart_downloads', bool),
+        jd_tv_shows_dir=setting('item_pipelines.myjdownloader', 'tv_shows_dir', str),
+    )
+
+    plex_username, plex_password, plex_server_name = snapshot.plex_credentials
+    if snapshot.plex_server_url is not None:
+        if snapshot.plex_server_token is None:
+            problems.append('plex.server_url needs plex.server_token')
+    elif plex_server_name is None:
+        problems.append('plex needs either server_url and server_token or server_name')
+    elif plex_username is None or plex_password is None:
+        problems.append('plex.server_name needs plex.username and plex.password')
+    if snapshot.jd_enabled:
+        for name, value in zip(('email', 'password', 'device_name'), snapshot.jd_credentials):
+            if value is None:
+                problems.append('missing setting item_pipelines.myjdownloader.{}'.format(name))
+    if problems:
+        raise ConfigError(config_file, problems)
+    return snapshot
+
+
+def _as_tuple(types) -> tuple:
+    return types if isinstance(types, tuple) else (types,)
+
+
+def _type_names(types) -> str:
+    names = {bool: 'True or False', int: 'a number', float: 'a number', str: 'a text', list: 'a list'}
+    return ' or '.join(dict.fromkeys(names[type_] for type_ in _as_tuple(types)))
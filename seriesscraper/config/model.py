@@ -1,11 +1,37 @@
 from enum import Enum
+from pathlib import Path
+from typing import NamedTuple, Optional, Tuple
 
 
-class TvShowConfig:
-    def __init__(self, name: str) -> None:
-        self.name = name
+class TvShowConfig(NamedTuple):
+    name: str
 
 
 class LanguageConfig(Enum):
     ENGLISH = 1
     GERMAN = 2
+
+
+class ConfigSnapshot(NamedTuple):
+    """
+    Validated configuration, read once from the configuration file. Immutable and picklable, so it can be shared with
+    other threads and worker processes.
+    """
+    cache_dir: Path
+    languages: Tuple[LanguageConfig, ...]
+    only_latest_episodes: bool
+    tv_shows: Tuple[TvShowConfig, ...]
+    plex_credentials: Tuple[Optional[str], Optional[str], Optional[str]]
+    plex_server_url: Optional[str]
+    plex_server_token: Optional[str]
+    plex_tv_library_name: str
+    plex_cache_ttls: Tuple[int, int, int]
+    serienjunkies_hosters: Tuple[str, ...]
+    release_resolutions: Tuple[str, ...]
+    prefer_web_dl: bool
+    jd_credentials: Tuple[Optional[str], Optional[str], Optional[str]]
+    jd_enabled: bool
+    jd_api_url: Optional[str]
+    jd_sent_link_ttl: int
+    jd_autostart_downloads: bool
+    jd_tv_shows_dir: str
@@ -0,0 +1,160 @@
+"""
+Long running alternative to starting `scrapy crawl serienjunkies_spider` from cron. A single crawler is started whose
+spider never closes, so the configuration and the connections to Plex and JDownloader are set up once. Every tv show is
+polled on its own interval, as decided by the ShowScheduler. Changes of the configuration file are picked up while the
+daemon runs, e.g. added tv shows are polled right away.
+
+    $ python -m seriesscraper.daemon
+
+which is the same as `scrapy crawl serienjunkies_spider -s DAEMON_ENABLED=True`.
+"""
+import logging
+import os
+import time
+
+from scrapy import signals
+from scrapy.crawler import CrawlerProcess
+from scrapy.exceptions import DontCloseSpider, NotConfigured
+from scrapy.utils.log import failure_to_exc_info
+from scrapy.utils.project import get_project_settings
+from twisted.internet import defer, task
+
+from seriesscraper.config.model import TvShowConfig
+from seriesscraper.scheduler import ShowScheduler
+from seriesscraper.spiders.serienjunkies_spider import SerienjunkiesSpider, show_directory_parsed, \
+    show_directory_failed
+
+logger = logging.getLogger(__name__)
+
+
+class ShowPollingDaemon:
+    """
+    Extension that keeps the spider open and feeds the requests of due tv shows into the engine, enabled by the
+    DAEMON_ENABLED setting. Once the show directory is parsed, the due tv shows are requested every
+    DAEMON_TICK_INTERVAL seconds, and the show directory every DAEMON_SHOW_DIRECTORY_INTERVAL seconds. The polls are
+    scheduled by the ShowScheduler of the spider, which counts scraped episodes newer than the latest episode in Plex
+    as new releases of their tv show. Tv shows that are not in the show directory are requested again once the show
+    directory was parsed again.
+    """
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        if not crawler.settings.getbool('DAEMON_ENABLED'):
+            raise NotConfigured
+        return cls(crawler)
+
+    def __init__(self, crawler) -> None:
+        super().__init__()
+        self.__crawler = crawler
+        self.__spider = None
+        self.__show_directory_requested_at = time.time()  # requested by the start requests of the spider
+        self.__unlisted_tv_shows = set()
+        self.__tick_loop = task.LoopingCall(self.__tick)
+        crawler.signals.connect(self.spider_opened, signal=signals.spider_opened)
+        crawler.signals.connect(self.spider_idle, signal=signals.spider_idle)
+        crawler.signals.connect(self.spider_closed, signal=signals.spider_closed)
+        crawler.signals.connect(self.show_directory_parsed, signal=show_directory_parsed)
+        crawler.signals.connect(self.show_directory_failed, signal=show_directory_failed)
+
+    def spider_opened(self, spider):
+        self.__spider = spider
+
+    def show_directory_parsed(self, spider):
+        self.__unlisted_tv_shows.clear()
+        self.__start_polling()
+
+    def show_directory_failed(self, spider):
+        # requested again by the next tick, meanwhile the tv shows of the cached show directory are polled
+        self.__show_directory_requested_at = 0
+        self.__start_polling()
+
+    def spider_idle(self, spider):
+        raise DontCloseSpider
+
+    def spider_closed(self, spider):
+        if self.__tick_loop.running:
+            self.__tick_loop.stop()
+
+    @property
+    def __scheduler(self) -> ShowScheduler:
+        return self.__spider.show_scheduler
+
+    def __start_polling(self) -> None:
+        if not self.__tick_loop.running:
+            self.__tick_loop.start(self.__crawler.settings.getfloat('DAEMON_TICK_INTERVAL'))
+
+    def __tick(self) -> defer.Deferred:
+        # the next tick waits for the Deferred, so the polls never overlap
+        tick = defer.maybeDeferred(self.__poll)
+        # new releases found since the previous tick
+        tick.addCallback(lambda _: self.__scheduler.save())
+        tick.addErrback(self.__on_tick_failed)
+        return tick
+
+    def __poll(self):
+        if self.__crawler.settings.getbool('DAEMON_RELOAD_CONFIG'):
+            self.__reload_config_if_modified()
+        self.__request_show_directory_if_due()
+        return self.__request_due_tv_shows()
+
+    @staticmethod
+    def __on_tick_failed(failure) -> None:
+        # a failing poll, e.g. while Plex is unreachable, must not end the daemon
+        logger.error('Polling the tv shows failed', exc_info=failure_to_exc_info(failure))
+
+    def __reload_config_if_modified(self) -> None:
+        config = self.__spider.config
+        previous = config.get_snapshot()
+        if not config.reload_if_modified():
+            return
+
+        self.__spider.config_reloaded(previous)
+        # added tv shows were never polled, so they are due right away
+        self.__scheduler.forget({tv_show.name for tv_show in previous.tv_shows} -
+                                {tv_show.name for tv_show in config.get_tv_shows()})
+        self.__scheduler.save()
+
+    def __request_show_directory_if_due(self) -> None:
+        now = time.time()
+        if now - self.__show_directory_requested_at < self.__crawler.settings.getfloat('DAEMON_SHOW_DIRECTORY_INTERVAL'):
+            return
+
+        self.__show_directory_requested_at = now
+        for request in self.__spider.start_requests():
+            self.__crawl(request)
+
+    def __request_due_tv_shows(self) -> defer.Deferred:
+        due_tv_shows = [tv_show for tv_show in self.__scheduler.due_tv_shows(self.__spider.config.get_tv_shows())
+                        if tv_show.name not in self.__unlisted_tv_shows]
+        if not due_tv_shows:
+            return defer.succeed(None)
+
+        refresh = self.__spider.refresh_plex_episode_index()
+        refresh.addCallback(lambda _: self.__request_tv_shows(due_tv_shows))
+        return refresh
+
+    def __request_tv_shows(self, tv_shows: [TvShowConfig]) -> None:
+        for tv_show in tv_shows:
+            tv_show_request = self.__spider.tv_show_request(tv_show)
+            if tv_show_request is None:
+                self.__unlisted_tv_shows.add(tv_show.name)
+                continue
+            self.__crawl(tv_show_request)
+            interval = self.__scheduler.polled(tv_show.name)
+            logger.debug('Polled {}, next poll in {:.0f}s'.format(tv_show.name, interval))
+
+    def __crawl(self, request) -> None:
+        self.__crawler.engine.crawl(request, self.__spider)
+
+
+def main():
+    os.environ.setdefault('SCRAPY_SETTINGS_MODULE', 'seriesscraper.settings')
+    settings = get_project_settings()
+    settings.set('DAEMON_ENABLED', True, priority='cmdline')
+    process = CrawlerProcess(settings)
+    process.crawl(SerienjunkiesSpider)
+    process.start()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,158 @@
+import codecs
+import json
+import re
+import unicodedata
+from html.parser import HTMLParser
+from pathlib import Path
+from typing import Iterator, Tuple
+
+WHITESPACE_PATTERN = re.compile(r'\s+')
+STREAMING_CHUNK_SIZE = 64 * 1024
+
+
+def normalize_title(title: str) -> str:
+    """
+    Fold case, whitespace and punctuation of a tv show title, e.g. "Marvel's Agents of S.H.I.E.L.D. " and
+    "marvels agents of shield" are both normalized to "marvels agents of shield".
+    """
+    without_punctuation = ''.join(character for character in unicodedata.normalize('NFKC', title).casefold()
+                                  if not unicodedata.category(character).startswith('P'))
+    return WHITESPACE_PATTERN.sub(' ', without_punctuation).strip()
+
+
+class ShowDirectory:
+    """
+    Index of the show directory page (serien/?cat=0&showall): normalized tv show title -> link of the tv show. The
+    index is cached on disk together with the ETag and Last-Modified header of the page, so the page only has to be
+    downloaded and parsed again when it changed.
+    """
+
+    def __init__(self, cache_file: Path) -> None:
+        super().__init__()
+        self.__cache_file = cache_file
+        self.etag = None
+        self.last_modified = None
+        self.__links = {}
+        self.__load()
+
+    def __load(self) -> None:
+        if not self.__cache_file.is_file():
+            return
+
+        with open(str(self.__cache_file), 'r') as file_handle:
+            try:
+                content = json.load(file_handle)
+            except ValueError:
+                return  # a broken cache just means the directory page is downloaded again
+        self.etag = content.get('etag')
+        self.last_modified = content.get('last_modified')
+        self.__links = content.get('links', {})
+
+    def save(self) -> None:
+        with open(str(self.__cache_file), 'w') as file_handle:
+            json.dump({'etag': self.etag, 'last_modified': self.last_modified, 'links': self.__links},
+                      file_handle, separators=(',', ':'))
+
+    def update(self, title_link_tuples: [(str, str)], etag: str = None, last_modified: str = None) -> None:
+        """
+        Replace the index with the tv shows of a freshly downloaded directory page.
+        :param title_link_tuples: (title, link) of every tv show on the page.
+        :param etag: ETag header of the page.
+        :param last_modified: Last-Modified header of the page.
+        """
+        links = {}
+        for title, link in title_link_tuples:
+            if title and link:
+                links.setdefault(normalize_title(title), link)
+        self.__links = links
+        self.etag = etag
+        self.last_modified = last_modified
+
+    def conditional_request_headers(self) -> dict:
+        """
+        Headers for revalidating the cached index, empty if nothing is cached.
+        """
+        if not self.__links:
+            return {}
+
+        headers = {}
+        if self.etag:
+            headers['If-None-Match'] = self.etag
+        if self.last_modified:
+            headers['If-Modified-Since'] = self.last_modified
+        return headers
+
+    def link_of(self, tv_show_name: str) -> str:
+        return self.__links.get(normalize_title(tv_show_name))
+
+    def __len__(self) -> int:
+        return len(self.__links)
+
+
+class ShowDirectoryParser(HTMLParser):
+    """
+    Event based parser that collects (title, link) of every anchor inside a <li class="cat-item"> element, i.e. the
+    result of the XPath query //li[contains(@class, "cat-item")]//a, without building a tree of the page.
+    """
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.title_link_tuples = []
+        self.__open_lists = []  # open ul, ol and li elements as (tag, is cat-item)
+        self.__cat_item_depth = 0
+        self.__link = None
+        self.__title_parts = []
+
+    def handle_starttag(self, tag, attrs):
+        if tag == 'li':
+            if self.__open_lists and self.__open_lists[-1][0] == 'li':
+                self.__close_until('li')  # li elements may be implicitly closed by the next li
+            is_cat_item = 'cat-item' in (dict(attrs).get('class') or '')
+            self.__open_lists.append((tag, is_cat_item))
+            self.__cat_item_depth += is_cat_item
+        elif tag in ('ul', 'ol'):
+            self.__open_lists.append((tag, False))
+        elif tag == 'a' and self.__cat_item_depth:
+            self.__link = dict(attrs).get('href') or ''
+            self.__title_parts = []
+
+    def handle_endtag(self, tag):
+        if tag in ('li', 'ul', 'ol'):
+            self.__close_until(tag)
+        elif tag == 'a' and self.__link is not None:
+            self.title_link_tuples.append((''.join(self.__title_parts), self.__link))
+            self.__link = None
+
+    def handle_data(self, data):
+        if self.__link is not None:
+            self.__title_parts.append(data)
+
+    def __close_until(self, tag: str) -> None:
+        if not any(open_tag == tag for open_tag, _ in self.__open_lists):
+            return
+
+        while self.__open_lists:
+            open_tag, is_cat_item = self.__open_lists.pop()
+            self.__cat_item_depth -= is_cat_item
+            if open_tag == tag:
+                return
+
+
+def stream_title_link_tuples(body: bytes, encoding: str = 'utf-8') -> Iterator[Tuple[str, str]]:
+    """
+    Extract the (title, link) tuples of the show directory page chunk by chunk.
+    :param body: Raw body of the page.
+    :param encoding: Encoding of the body.
+    :return: Iterator over (title, link) of every tv show, in document order.
+    """
+    decoder = codecs.getincrementaldecoder(encoding)(errors='replace')
+    parser = ShowDirectoryParser()
+    body_view = memoryview(body)
+    for chunk_start in range(0, len(body_view), STREAMING_CHUNK_SIZE):
+        parser.feed(decoder.decode(body_view[chunk_start:chunk_start + STREAMING_CHUNK_SIZE]))
+        yield from parser.title_link_tuples
+        parser.title_link_tuples.clear()
+
+    parser.feed(decoder.decode(b'', final=True))
+    parser.close()
+    yield from parser.title_link_tuples
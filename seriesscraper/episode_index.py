@@ -0,0 +1,90 @@
+from typing import Iterable, Optional
+
+EPISODE_BITS = 16  # episode numbers are packed into the lower 16 bits, season numbers into the bits above
+EPISODE_MASK = (1 << EPISODE_BITS) - 1
+# episode number of the key of a complete season, episode 0 is a real episode, e.g. a pilot or a special
+SEASON_PACK_EPISODE = EPISODE_MASK
+
+
+def pack_episode(season_number: int, episode_number: int) -> int:
+    """
+    Pack season and episode number into a single int. Packed episodes are ordered like (season, episode) tuples.
+    """
+    return season_number << EPISODE_BITS | episode_number
+
+
+def unpack_episode(packed_episode: int) -> (int, int):
+    return packed_episode >> EPISODE_BITS, packed_episode & EPISODE_MASK
+
+
+class EpisodeKey(int):
+    """
+    Immutable key of an episode: the packed (season, episode) int. Hashing and ordering are the ones of int, so keys
+    can be looked up in sets of packed episodes and compared without unpacking them.
+    """
+    __slots__ = ()
+
+    @classmethod
+    def of(cls, season_number: int, episode_number: int) -> 'EpisodeKey':
+        return cls(pack_episode(season_number, episode_number))
+
+    @classmethod
+    def season_pack_of(cls, season_number: int) -> 'EpisodeKey':
+        """
+        Key of a release of a complete season, episode number SEASON_PACK_EPISODE. It is ordered after the episodes of
+        its season.
+        """
+        return cls(pack_episode(season_number, SEASON_PACK_EPISODE))
+
+    @property
+    def is_season_pack(self) -> bool:
+        return self & EPISODE_MASK == SEASON_PACK_EPISODE
+
+    @property
+    def season_number(self) -> int:
+        return self >> EPISODE_BITS
+
+    @property
+    def episode_number(self) -> int:
+        return self & EPISODE_MASK
+
+    def __repr__(self) -> str:
+        if self.is_season_pack:
+            return 'S{:02d}'.format(self.season_number)
+        return 'S{:02d}E{:02d}'.format(self.season_number, self.episode_number)
+
+
+class EpisodeIndex:
+    """
+    Existing episodes of a tv show as a set of packed (season, episode) ints plus the latest existing episode. Built
+    once per tv show and shared by the requests of all season pages of that show.
+    """
+    __slots__ = ('__episodes', '__seasons', 'latest_episode')
+
+    def __init__(self, episodes: Iterable[Iterable[int]]) -> None:
+        self.__episodes = frozenset(pack_episode(season_number, episode_number)
+                                    for season_number, episode_number in episodes)
+        self.__seasons = frozenset(episode >> EPISODE_BITS for episode in self.__episodes)
+        self.latest_episode: Optional[int] = max(self.__episodes) if self.__episodes else None
+
+    def has_season(self, season_number: int) -> bool:
+        """
+        Whether any episode of the season exists.
+        """
+        return season_number in self.__seasons
+
+    def is_newer_than_latest(self, episode_key: EpisodeKey) -> bool:
+        """
+        Whether the episode follows the latest existing one, a complete season whether it follows the latest season.
+        """
+        if self.latest_episode is None:
+            return True
+        if episode_key.is_season_pack:
+            return episode_key.season_number > self.latest_episode >> EPISODE_BITS
+        return episode_key > self.latest_episode
+
+    def __contains__(self, episode_key: EpisodeKey) -> bool:
+        return episode_key in self.__episodes
+
+    def __len__(self) -> int:
+        return len(self.__episodes)
@@ -0,0 +1,138 @@
+import json
+import sqlite3
+from pathlib import Path
+
+from lxml import etree
+
+from seriesscraper.config.model import LanguageConfig
+
+RELEASE_RESOLUTIONS = ('1080p', '720p')
+DOWNLOAD_LABEL = 'Download:'
+
+
+def _compile_episode_p_tags_xpath(language: LanguageConfig) -> etree.XPath:
+    # paragraphs with a release title in the wanted resolution and language, the first two paragraphs of a season page
+    # describe the tv show
+    release_text_condition = '({})'.format(
+        ' or '.join('contains(., \'{}\')'.format(resolution) for resolution in RELEASE_RESOLUTIONS))
+    if language == LanguageConfig.GERMAN:
+        release_text_condition += ' and contains(translate(., \'GERMAN\', \'german\'), \'german\')'
+
+    return etree.XPath('//p[position()>2 and not(@class) and not(contains(., \'Dauer\')) and '
+                       './strong/text()[{}]]'.format(release_text_condition))
+
+
+EPISODE_P_TAGS_XPATHS = {language: _compile_episode_p_tags_xpath(language) for language in LanguageConfig}
+NEXT_PAGE_LINK_XPATH = etree.XPath('//a[@class="next"]/@href')
+
+
+class ReleaseExtractor:
+    """
+    Extracts the (release title, hoster, download link) triples of a season page for all given languages and hosters.
+    The release paragraphs are selected by a precompiled XPath query, titles and links are extracted in a single linear
+    walk over the children of each paragraph.
+    """
+
+    def __init__(self, languages: [LanguageConfig], hosters: [str]) -> None:
+        super().__init__()
+        # the english query does not filter by language, so it also selects the german releases
+        query_language = LanguageConfig.ENGLISH if LanguageConfig.ENGLISH in languages else LanguageConfig.GERMAN
+        self.__episode_p_tags_xpath = EPISODE_P_TAGS_XPATHS[query_language]
+        self.__hosters = tuple(hosters)
+        # identifies the extraction results of this configuration, e.g. in the ExtractionCache
+        self.key = '{}:{}'.format(query_language.name, ','.join(self.__hosters))
+
+    def extract(self, root) -> [(str, str, str)]:
+        """
+        Extract the releases of a season page.
+        :param root: Root element of the page, e.g. response.selector.root
+        :return: (release title, hoster, download link) of every download link, in reverse document order.
+        """
+        release_title_hoster_download_links = []
+        for p_tag in self.__episode_p_tags_xpath(root):
+            release_title_hoster_download_links.extend(self.__extract_download_links_of(p_tag))
+
+        release_title_hoster_download_links.reverse()
+        return release_title_hoster_download_links
+
+    def __extract_download_links_of(self, p_tag) -> [(str, str, str)]:
+        release_title = None
+        pending_a_tags = []  # links waiting for the text following them, which names their hoster
+        for child in p_tag.iterchildren():
+            if child.tag == 'strong' and release_title is None:
+                texts = direct_texts_of(child)
+                if DOWNLOAD_LABEL not in texts:
+                    release_title = texts[0] if texts else None
+            elif child.tag == 'a':
+                pending_a_tags.append((release_title, child.get('href')))
+
+            if child.tail is not None and pending_a_tags:
+                hoster = self.__hoster_named_in(child.tail)
+                if hoster is not None:
+                    for a_tag_release_title, download_link in pending_a_tags:
+                        yield a_tag_release_title, hoster, download_link
+                pending_a_tags = []
+
+    def __hoster_named_in(self, text: str) -> str:
+        for hoster in self.__hosters:
+            if hoster in text:
+                return hoster
+        return None
+
+
+class ExtractionCache:
+    """
+    SQLite backed cache of the releases and the next page link extracted from a season page, so that a season page
+    whose body did not change since the previous run does not have to be parsed again.
+    """
+
+    def __init__(self, cache_file: Path) -> None:
+        super().__init__()
+        self.__db = sqlite3.connect(str(cache_file))
+        self.__create_tables()
+
+    def __create_tables(self) -> None:
+        with self.__db:
+            self.__db.executescript('''
+                CREATE TABLE IF NOT EXISTS season_page (
+                    url TEXT PRIMARY KEY,
+                    body_hash TEXT NOT NULL,
+                    extractor_key TEXT NOT NULL,
+                    releases TEXT NOT NULL,
+                    next_page_link TEXT
+                );
+            ''')
+
+    def get(self, url: str, body_hash: str, extractor_key: str) -> ([(str, str, str)], str):
+        """
+        Get the extraction result of a season page.
+        :param url: URL of the season page.
+        :param body_hash: Hash of the current body of the page.
+        :param extractor_key: ReleaseExtractor.key of the extractor.
+        :return: (releases as returned by ReleaseExtractor.extract, next page link) or None if the page was not
+                 extracted with this body and extractor before.
+        """
+        row = self.__db.execute('SELECT releases, next_page_link FROM season_page '
+                                'WHERE url = ? AND body_hash = ? AND extractor_key = ?',
+                                (url, body_hash, extractor_key)).fetchone()
+        if row is None:
+            return None
+
+        releases, next_page_link = row
+        return [tuple(release) for release in json.loads(releases)], next_page_link
+
+    def put(self, url: str, body_hash: str, extractor_key: str,
+            releases: [(str, str, str)], next_page_link: str) -> None:
+        with self.__db:
+            self.__db.execute('INSERT OR REPLACE INTO season_page VALUES (?, ?, ?, ?, ?)',
+                              (url, body_hash, extractor_key, json.dumps(releases, separators=(',', ':')),
+                               next_page_link))
+
+
+def direct_texts_of(element) -> [str]:
+    """
+    Text nodes that are direct children of an element, like the XPath query text().
+    """
+    texts = [element.text] if element.text is not None else []
+    texts.extend(child.tail for child in element if child.tail is not None)
+    return texts
@@ -0,0 +1,19 @@
+from scrapy.extensions.httpcache import RFC2616Policy
+
+
+class RevalidatingCachePolicy(RFC2616Policy):
+    """
+    Cache policy for pages that change whenever a release is posted. A cached page is never used without asking the
+    server first: every request is revalidated with If-None-Match/If-Modified-Since, and the cached page is only used
+    when the server answers 304 Not Modified. Pages without ETag or Last-Modified header are not cached, as they
+    cannot be revalidated.
+    """
+
+    def should_cache_response(self, response, request):
+        return response.status == 200 and \
+               (b'ETag' in response.headers or b'Last-Modified' in response.headers) and \
+               super().should_cache_response(response, request)
+
+    def is_cached_response_fresh(self, cachedresponse, request):
+        self._set_conditional_validators(request, cachedresponse)
+        return False
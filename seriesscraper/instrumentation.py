@@ -0,0 +1,33 @@
+import time
+from contextlib import contextmanager
+
+STAGE_STATS_KEY_PREFIX = 'seriesscraper/stage'
+# stages of a crawl, in the order of a run
+CONFIG_LOAD = 'config_load'
+PLEX_FETCH = 'plex_fetch'
+DIRECTORY_PARSE = 'directory_parse'
+EXTRACTION = 'extraction'
+MAPPING = 'mapping'
+FILTERING = 'filtering'
+JD_SUBMIT = 'jd_submit'
+
+
+@contextmanager
+def timed(stats, stage: str):
+    """
+    Add the duration of the with block to the stats of a stage, see record.
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(stats, stage, time.perf_counter() - start)
+
+
+def record(stats, stage: str, seconds: float) -> None:
+    """
+    Count a run of a stage and add its duration to the Scrapy stats, as seriesscraper/stage/<stage>/count and
+    seriesscraper/stage/<stage>/seconds.
+    """
+    stats.inc_value('{}/{}/count'.format(STAGE_STATS_KEY_PREFIX, stage))
+    stats.inc_value('{}/{}/seconds'.format(STAGE_STATS_KEY_PREFIX, stage), seconds)
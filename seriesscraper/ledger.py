@@ -0,0 +1,83 @@
+import hashlib
+import sqlite3
+import time
+from pathlib import Path
+
+from plex.model import PlexEpisodeIndex
+from seriesscraper.episode_index import EpisodeKey
+
+SENT_LINK_LEDGER_FILE_NAME = 'sent_links.sqlite'
+
+
+class SentLinkLedger:
+    """
+    SQLite backed record of the links sent to JDownloader, so that consecutive runs do not send an episode again while
+    it is still downloading. An entry is forgotten when its episode shows up in the Plex library or when it is older
+    than the ttl, then the episode is sent again if it is still missing.
+    """
+
+    def __init__(self, ledger_file: Path, ttl: float) -> None:
+        super().__init__()
+        self.__db = sqlite3.connect(str(ledger_file))
+        self.__ttl = ttl
+        self.__create_tables()
+
+    def __create_tables(self) -> None:
+        with self.__db:
+            self.__db.executescript('''
+                CREATE TABLE IF NOT EXISTS sent_link (
+                    tv_show_name TEXT NOT NULL,
+                    season_number INTEGER NOT NULL,
+                    episode_number INTEGER NOT NULL,
+                    link_hash TEXT NOT NULL,
+                    release_title TEXT,
+                    sent_at REAL NOT NULL,
+                    PRIMARY KEY (tv_show_name, season_number, episode_number, link_hash)
+                ) WITHOUT ROWID;
+            ''')
+
+    def sent_episodes_of(self, tv_show_name: str) -> {EpisodeKey}:
+        """
+        Episodes of a tv show with at least one link sent within the ttl.
+        """
+        return {EpisodeKey.of(season_number, episode_number)
+                for season_number, episode_number in self.__db.execute(
+                    'SELECT DISTINCT season_number, episode_number FROM sent_link '
+                    'WHERE tv_show_name = ? AND sent_at >= ?', (tv_show_name, time.time() - self.__ttl))}
+
+    def record(self, sent_links: [(str, int, int, str, str)]) -> None:
+        """
+        Record links that were sent to JDownloader.
+        :param sent_links: (tv show name, season number, episode number, release title, download link) of every link.
+        """
+        sent_at = time.time()
+        with self.__db:
+            self.__db.executemany('INSERT OR REPLACE INTO sent_link VALUES (?, ?, ?, ?, ?, ?)',
+                                  ((tv_show_name, season_number, episode_number, hash_of(download_link),
+                                    release_title, sent_at)
+                                   for tv_show_name, season_number, episode_number, release_title, download_link
+                                   in sent_links))
+
+    def expire(self, plex_episode_index: PlexEpisodeIndex) -> int:
+        """
+        Forget the links older than the ttl and the links of episodes that are in the Plex library.
+        :return: Number of forgotten links.
+        """
+        with self.__db:
+            forgotten_links = self.__db.execute('DELETE FROM sent_link WHERE sent_at < ?',
+                                                (time.time() - self.__ttl,)).rowcount
+            tv_show_names = [tv_show_name for tv_show_name, in self.__db.execute(
+                'SELECT DISTINCT tv_show_name FROM sent_link')]
+            for tv_show_name in tv_show_names:
+                forgotten_links += self.__db.executemany(
+                    'DELETE FROM sent_link WHERE tv_show_name = ? AND season_number = ? AND episode_number = ?',
+                    ((tv_show_name, season_number, episode_number)
+                     for season_number, episode_number in plex_episode_index.episodes_of(tv_show_name))).rowcount
+        return forgotten_links
+
+    def close(self) -> None:
+        self.__db.close()
+
+
+def hash_of(download_link: str) -> str:
+    return hashlib.sha1(download_link.encode('utf-8')).hexdigest()
@@ -0,0 +1,133 @@
+import logging
+import sqlite3
+import time
+from pathlib import Path
+
+from twisted.internet import defer
+from twisted.web.client import Agent, HTTPConnectionPool
+from twisted.web.http_headers import Headers
+
+from seriesscraper.ledger import hash_of
+
+logger = logging.getLogger(__name__)
+
+LINK_LIVENESS_CACHE_FILE_NAME = 'link_liveness.sqlite'
+# the file is gone for good
+DEAD_HTTP_CODES = (404, 410, 451)
+
+
+class LinkLivenessCache:
+    """
+    SQLite backed results of link checks, so a link is checked at most once per ttl, also across runs. Dead links are
+    rechecked after the ttl as well, hosters restore files now and then.
+    """
+
+    def __init__(self, cache_file: Path, ttl: float) -> None:
+        super().__init__()
+        self.__db = sqlite3.connect(str(cache_file))
+        self.__ttl = ttl
+        with self.__db:
+            self.__db.execute('CREATE TABLE IF NOT EXISTS link_liveness ('
+                              'link_hash TEXT PRIMARY KEY, alive INTEGER NOT NULL, checked_at REAL NOT NULL'
+                              ') WITHOUT ROWID')
+            self.__db.execute('DELETE FROM link_liveness WHERE checked_at < ?', (time.time() - ttl,))
+
+    def get(self, download_link: str):
+        """
+        :return: Whether the link was alive when it was checked within the ttl, None if it was not.
+        """
+        row = self.__db.execute('SELECT alive FROM link_liveness WHERE link_hash = ? AND checked_at >= ?',
+                                (hash_of(download_link), time.time() - self.__ttl)).fetchone()
+        return None if row is None else bool(row[0])
+
+    def put(self, download_link: str, alive: bool) -> None:
+        with self.__db:
+            self.__db.execute('INSERT OR REPLACE INTO link_liveness VALUES (?, ?, ?)',
+                              (hash_of(download_link), int(alive), time.time()))
+
+    def close(self) -> None:
+        self.__db.close()
+
+
+class LinkChecker:
+    """
+    Checks whether download links are alive with HEAD requests, at most `concurrency` at a time, over persistent
+    connections of a shared pool. A link is dead if the hoster answers 404, 410 or 451, any other answer counts as
+    alive, e.g. of hosters that do not support HEAD. These results are cached in the LinkLivenessCache. The liveness of
+    a link whose hoster does not answer within `timeout` seconds, or cannot be connected to, is unknown: such a link
+    may be alive once the network recovers, so it is neither cached nor counted as dead, and checked again next time.
+    """
+
+    def __init__(self, cache: LinkLivenessCache, timeout: float = 5, concurrency: int = 16) -> None:
+        from twisted.internet import reactor  # the reactor is chosen by the crawler, not installed on import
+
+        super().__init__()
+        self.__reactor = reactor
+        self.__cache = cache
+        self.__timeout = timeout
+        self.__semaphore = defer.DeferredSemaphore(concurrency)
+        self.__pool = HTTPConnectionPool(reactor, persistent=True)
+        self.__pool.maxPersistentPerHost = concurrency
+        self.__agent = Agent(reactor, connectTimeout=timeout, pool=self.__pool)
+        self.check_count = 0  # links checked over the network, i.e. not cached
+
+    def is_alive(self, download_link: str) -> defer.Deferred:
+        """
+        :return: Deferred firing with whether the link is alive, None if that is unknown, never with a failure.
+        """
+        alive = self.__cache.get(download_link)
+        if alive is not None:
+            return defer.succeed(alive)
+
+        checked = self.__semaphore.run(self.__check, download_link)
+        checked.addCallback(self.__cache_result, download_link)
+        return checked
+
+    def first_alive(self, download_links: [str], candidates: int):
+        """
+        Check the links in batches of `candidates` concurrent checks, until a batch contains a link that is alive or
+        whose liveness is unknown.
+        :return: Deferred firing with the liveness of the checked links, link -> bool or None if unknown, in the order
+        of the links.
+        """
+        results = {}
+
+        def check_batch(start: int):
+            batch = download_links[start:start + candidates]
+            if not batch:
+                return defer.succeed(results)
+            checks = defer.gatherResults([self.is_alive(download_link) for download_link in batch])
+            checks.addCallback(next_batch, batch, start)
+            return checks
+
+        def next_batch(alive: [bool], batch: [str], start: int):
+            results.update(zip(batch, alive))
+            return results if any(is_alive is not False for is_alive in alive) else check_batch(start + candidates)
+
+        return check_batch(0)
+
+    def close(self) -> defer.Deferred:
+        return self.__pool.closeCachedConnections()
+
+    def __check(self, download_link: str) -> defer.Deferred:
+        self.check_count += 1
+        request = self.__agent.request(b'HEAD', download_link.encode('utf-8'),
+                                       Headers({b'User-Agent': [b'seriesscraper']}))
+        request.addTimeout(self.__timeout, self.__reactor)
+        request.addCallbacks(self.__is_alive_response, self.__on_check_failed, errbackArgs=(download_link,))
+        return request
+
+    @staticmethod
+    def __is_alive_response(response) -> bool:
+        return response.code not in DEAD_HTTP_CODES
+
+    @staticmethod
+    def __on_check_failed(failure, download_link: str) -> None:
+        logger.debug('Link {} is not reachable: {}'.format(download_link, failure.getErrorMessage()))
+        return None
+
+    def __cache_result(self, alive: bool, download_link: str) -> bool:
+        if alive is None:
+            return None
+        self.__cache.put(download_link, alive)
+        return alive
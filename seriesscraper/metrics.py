@@ -0,0 +1,90 @@
+import json
+import logging
+import re
+
+from scrapy import signals
+from scrapy.exceptions import NotConfigured
+from twisted.internet import reactor
+from twisted.web import resource, server
+
+from seriesscraper.instrumentation import STAGE_STATS_KEY_PREFIX
+
+logger = logging.getLogger(__name__)
+
+STAGE_STATS_KEY_PATTERN = re.compile(r'{}/(\w+)/(count|seconds)'.format(STAGE_STATS_KEY_PREFIX))
+
+
+class MetricsEndpoint:
+    """
+    Extension that serves the Scrapy stats of the running crawl over HTTP, enabled by the METRICS_PORT setting. Meant
+    for daemon runs (seriesscraper.daemon), whose stats are only dumped when the daemon stops otherwise.
+
+        GET /metrics        numeric stats in the Prometheus text format
+        GET /metrics.json   all stats as JSON
+    """
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        port = crawler.settings.getint('METRICS_PORT')
+        if not port:
+            raise NotConfigured
+        return cls(crawler.stats, port, crawler.settings.get('METRICS_HOST', '127.0.0.1'), crawler)
+
+    def __init__(self, stats, port: int, host: str, crawler) -> None:
+        super().__init__()
+        self.__stats = stats
+        self.__port = port
+        self.__host = host
+        self.__listening_port = None
+        crawler.signals.connect(self.spider_opened, signal=signals.spider_opened)
+        crawler.signals.connect(self.spider_closed, signal=signals.spider_closed)
+
+    def spider_opened(self, spider):
+        root = resource.Resource()
+        root.putChild(b'metrics', _StatsResource(self.__stats, to_prometheus_text, b'text/plain; version=0.0.4'))
+        root.putChild(b'metrics.json', _StatsResource(self.__stats, to_json, b'application/json'))
+        self.__listening_port = reactor.listenTCP(self.__port, server.Site(root), interface=self.__host)
+        logger.info('Serving metrics on http://{}:{}/metrics'.format(self.__host, self.__port))
+
+    def spider_closed(self, spider):
+        if self.__listening_port is not None:
+            return self.__listening_port.stopListening()
+
+
+class _StatsResource(resource.Resource):
+    isLeaf = True
+
+    def __init__(self, stats, render_stats, content_type: bytes) -> None:
+        super().__init__()
+        self.__stats = stats
+        self.__render_stats = render_stats
+        self.__content_type = content_type
+
+    def render_GET(self, request):
+        request.setHeader(b'Content-Type', self.__content_type)
+        return self.__render_stats(self.__stats.get_stats()).encode('utf-8')
+
+
+def to_prometheus_text(stats: dict) -> str:
+    """
+    Numeric stats as Prometheus metrics. The stage timers become seriesscraper_stage_count and
+    seriesscraper_stage_seconds with a stage label, every other stat e.g. downloader/request_count becomes
+    scrapy_downloader_request_count.
+    """
+    lines = []
+    for key, value in sorted(stats.items()):
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            continue
+
+        stage_match = STAGE_STATS_KEY_PATTERN.fullmatch(key)
+        if stage_match:
+            lines.append('seriesscraper_stage_{}{{stage="{}"}} {}'.format(stage_match.group(2), stage_match.group(1),
+                                                                          value))
+        else:
+            lines.append('scrapy_{} {}'.format(re.sub(r'\W', '_', key), value))
+    return '\n'.join(lines) + '\n'
+
+
+def to_json(stats: dict) -> str:
+    # start_time and finish_time are datetimes
+    return json.dumps(stats, default=str, sort_keys=True)
@@ -1,4 +1,12 @@
 # -*- coding: utf-8 -*-
+import logging
+import time
+from pathlib import Path
+from typing import Callable
+
+from scrapy.exceptions import NotConfigured, DropItem
+from scrapy.settings import Settings
+from twisted.internet import defer, task, threads
 
 from jdownloader.jd import Jd
 from jdownloader.jdlink import JdLink
@@ -7,29 +15,331 @@ from jdownloader.jdlink import JdLink
 # Don't forget to add your pipeline to the ITEM_PIPELINES setting
 # See: https://doc.scrapy.org/en/latest/topics/item-pipeline.html
 from seriesscraper.config.config import Config
+from seriesscraper.episode_index import EpisodeKey
+from seriesscraper.instrumentation import record, JD_SUBMIT
 from seriesscraper.items import EpisodeItem
+from seriesscraper.ledger import SentLinkLedger, SENT_LINK_LEDGER_FILE_NAME
+from seriesscraper.liveness import LinkChecker, LinkLivenessCache, LINK_LIVENESS_CACHE_FILE_NAME
+from seriesscraper.profiling import profiled
+from seriesscraper.sinks import Sink, NdjsonSink, SqliteSink, WebhookSink, record_of
+
+logger = logging.getLogger(__name__)
+
+
+class LinkLivenessPipeline(object):
+    """
+    Checks the download links of every episode before it is sent to JDownloader, enabled by LINK_CHECK_ENABLED. The
+    LINK_CHECK_CANDIDATES best ranked links of an episode are checked concurrently, the following ones only if none of
+    them is alive. Dead links are removed from the item, so the JDownloaderPipeline sends the best live link. Links
+    whose hoster did not answer are kept, so a network outage does not drop every episode. Episodes whose checked
+    links are all dead are dropped, a later run finds them again.
+    """
+
+    def __init__(self, stats, timeout: float = 5, concurrency: int = 16, candidates: int = 3, ttl: float = 3600):
+        self.__config: Config = Config.instance()
+        self.__stats = stats
+        self.__timeout = timeout
+        self.__concurrency = concurrency
+        self.__candidates = candidates
+        self.__ttl = ttl
+        self.__cache = None
+        self.__checker = None
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        if not crawler.settings.getbool('LINK_CHECK_ENABLED'):
+            raise NotConfigured
+        return cls(crawler.stats,
+                   timeout=crawler.settings.getfloat('LINK_CHECK_TIMEOUT', 5),
+                   concurrency=crawler.settings.getint('LINK_CHECK_CONCURRENCY', 16),
+                   candidates=crawler.settings.getint('LINK_CHECK_CANDIDATES', 3),
+                   ttl=crawler.settings.getfloat('LINK_CHECK_TTL', 3600))
+
+    def open_spider(self, spider):
+        self.__cache = LinkLivenessCache(self.__config.get_cache_dir() / LINK_LIVENESS_CACHE_FILE_NAME, self.__ttl)
+        self.__checker = LinkChecker(self.__cache, timeout=self.__timeout, concurrency=self.__concurrency)
+
+    def process_item(self, item, spider):
+        download_links = [download_link for _, download_link in item['release_downloadlink_tuples']]
+        checks = self.__checker.first_alive(download_links, self.__candidates)
+        checks.addCallback(self.__without_dead_links, item)
+        return checks
+
+    def close_spider(self, spider):
+        self.__stats.set_value('seriesscraper/link_check/checked', self.__checker.check_count)
+        closed = self.__checker.close()
+        closed.addBoth(lambda _: self.__cache.close())
+        return closed
+
+    def __without_dead_links(self, alive: {str: bool}, item: EpisodeItem) -> EpisodeItem:
+        dead_count = sum(1 for is_alive in alive.values() if is_alive is False)
+        self.__stats.inc_value('seriesscraper/link_check/dead', dead_count)
+        self.__stats.inc_value('seriesscraper/link_check/unknown',
+                               sum(1 for is_alive in alive.values() if is_alive is None))
+        # links after the first live one were not checked and keep their rank, like links of unknown liveness
+        item['release_downloadlink_tuples'] = [(release_title, download_link)
+                                               for release_title, download_link in item['release_downloadlink_tuples']
+                                               if alive.get(download_link) is not False]
+        if dead_count == len(alive):
+            self.__stats.inc_value('seriesscraper/link_check/episodes_dropped')
+            raise DropItem('No live link of {} {}'.format(
+                item['tv_show_name'], repr(EpisodeKey.of(item['season_number'], item['episode_number']))))
+        return item
 
 
 class JDownloaderPipeline(object):
-    def __init__(self):
+    """
+    Buffers the links of the scraped episodes and sends them to JDownloader in batches, when JD_BATCH_SIZE links are
+    buffered, every JD_FLUSH_INTERVAL seconds and when the spider is closed. The API calls run in the reactor's thread
+    pool, so crawling continues while a batch is sent. Sent links are recorded in the SentLinkLedger.
+    """
+
+    def __init__(self, stats, batch_size: int = 20, flush_interval: float = 10):
         self.__config: Config = Config.instance()
         self.__jd = Jd()
+        self.__stats = stats
+        self.__batch_size = batch_size
+        self.__flush_interval = flush_interval
+        self.__sent_link_ledger = None
+        self.__jd_links = []
+        self.__sent_links = []  # (tv show name, season number, episode number, release title, download link)
+        self.__pending_flushes = set()
+        self.__flush_loop = task.LoopingCall(self.__flush)
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        if (crawler.settings.getbool('DRY_RUN') or not crawler.settings.getbool('JD_ENABLED', True)
+                or not Config.instance().get_jd_enabled()):
+            raise NotConfigured
+        return cls(crawler.stats,
+                   batch_size=crawler.settings.getint('JD_BATCH_SIZE', 20),
+                   flush_interval=crawler.settings.getfloat('JD_FLUSH_INTERVAL', 10))
 
+    def open_spider(self, spider):
+        self.__sent_link_ledger = SentLinkLedger(self.__config.get_cache_dir() / SENT_LINK_LEDGER_FILE_NAME,
+                                                 self.__config.get_jd_sent_link_ttl())
+        self.__flush_loop.start(self.__flush_interval, now=False)
+
+    @profiled(lambda item, spider: (item['tv_show_name'], None))
     def process_item(self, item, spider):
         assert isinstance(item, EpisodeItem)
 
-        tv_show_name = item['tv_show_name']
+        self.__jd_links.append(to_jd_link(item, self.__config))
+        self.__sent_links.append(to_sent_link(item))
+        if len(self.__jd_links) >= self.__batch_size:
+            self.__flush()
+        return item
+
+    def close_spider(self, spider):
+        if self.__flush_loop.running:
+            self.__flush_loop.stop()
+        self.__flush()
+        flushes = defer.DeferredList(list(self.__pending_flushes))
+        flushes.addBoth(lambda _: self.__sent_link_ledger.close())
+        return flushes
+
+    def __flush(self) -> None:
+        if not self.__jd_links:
+            return
+
+        jd_links, self.__jd_links = self.__jd_links, []
+        sent_links, self.__sent_links = self.__sent_links, []
+        flush = threads.deferToThread(self.__jd.add_links, jd_links)
+        flush.addBoth(self.__record_flush_time, time.perf_counter())
+        flush.addCallbacks(self.__on_flushed, self.__on_flush_failed,
+                           callbackArgs=(jd_links, sent_links), errbackArgs=(jd_links,))
+        flush.addBoth(self.__forget_flush, flush)
+        self.__pending_flushes.add(flush)
+
+    def __record_flush_time(self, result, start: float):
+        # includes the time the batch waited for a thread of the pool
+        record(self.__stats, JD_SUBMIT, time.perf_counter() - start)
+        return result
+
+    def __on_flushed(self, api_calls: int, jd_links: [JdLink], sent_links: [(str, int, int, str, str)]) -> None:
+        self.__sent_link_ledger.record(sent_links)
+        self.__stats.inc_value('seriesscraper/jd_links_sent', len(jd_links))
+        self.__stats.inc_value('seriesscraper/jd_api_calls', api_calls)
+
+    def __on_flush_failed(self, failure, jd_links: [JdLink]) -> None:
+        self.__stats.inc_value('seriesscraper/jd_links_failed', len(jd_links))
+        logger.error('Could not send {} links to JDownloader ({}): {}'.format(
+            len(jd_links), ', '.join(jd_link.packageName for jd_link in jd_links), failure.getErrorMessage()))
+
+    def __forget_flush(self, result, flush) -> None:
+        self.__pending_flushes.discard(flush)
+
+
+class DryRunReportPipeline(object):
+    """
+    Reports the scraped episodes instead of sending them to JDownloader, enabled by the DRY_RUN setting. Every episode
+    is logged with the release that would be sent and the number of alternatives, and a summary per tv show is logged
+    when the spider is closed. Nothing is recorded in the SentLinkLedger, so a later run sends the same episodes.
+    """
+
+    def __init__(self):
+        self.__episodes = {}  # tv show name -> ['S01E02', ...]
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        if not crawler.settings.getbool('DRY_RUN'):
+            raise NotConfigured
+        return cls()
+
+    def process_item(self, item, spider):
         release_title, download_link = item['release_downloadlink_tuples'][0]
+        episode = repr(EpisodeKey.of(item['season_number'], item['episode_number']))  # S01 for complete seasons
+        self.__episodes.setdefault(item['tv_show_name'], []).append(episode)
+        logger.info('Dry run: {} {} would be sent as {} ({}), {} alternatives'.format(
+            item['tv_show_name'], episode, release_title, download_link, len(item['release_downloadlink_tuples']) - 1))
+        return item
+
+    def close_spider(self, spider):
+        logger.info('Dry run: {} episodes of {} tv shows would be sent to JDownloader{}'.format(
+            sum(len(episodes) for episodes in self.__episodes.values()), len(self.__episodes),
+            ''.join('\n  {}: {}'.format(tv_show_name, ', '.join(sorted(episodes)))
+                    for tv_show_name, episodes in sorted(self.__episodes.items()))))
+
+
+class SinkPipeline(object):
+    """
+    Base of the pipelines that write the scraped episodes to a Sink, each enabled by the setting of its target
+    (of_target). Records are buffered and written in batches of SINK_BATCH_SIZE, at the latest every
+    SINK_FLUSH_INTERVAL seconds and when the spider is closed. Batches are written one after the other in the reactor's
+    thread pool. While SINK_MAX_PENDING_BATCHES batches wait to be written, process_item waits as well, which holds back
+    the crawl until the sink caught up.
+    """
+
+    def __init__(self, sink: Sink, stats, batch_size: int = 500, flush_interval: float = 5,
+                 max_pending_batches: int = 4):
+        self.__sink = sink
+        self.__stats = stats
+        self.__batch_size = batch_size
+        self.__flush_interval = flush_interval
+        self.__max_pending_batches = max_pending_batches
+        self.__records = []
+        self.__write_lock = defer.DeferredLock()
+        self.__pending_writes = set()
+        self.__waiting_items = []  # Deferreds of the items that wait for a pending batch to be written
+        self.__flush_loop = task.LoopingCall(self.__flush)
+
+    @classmethod
+    def of_target(cls, crawler, target_setting: str, sink_factory: Callable[[str, Settings], Sink]) -> 'SinkPipeline':
+        """
+        Pipeline of the sink that sink_factory creates from the target, e.g. a file or URL, and the settings.
+        :raises NotConfigured: If the setting target_setting is not set.
+        """
+        target = crawler.settings.get(target_setting)
+        if not target:
+            raise NotConfigured
+        return cls(sink_factory(target, crawler.settings), crawler.stats,
+                   batch_size=crawler.settings.getint('SINK_BATCH_SIZE', 500),
+                   flush_interval=crawler.settings.getfloat('SINK_FLUSH_INTERVAL', 5),
+                   max_pending_batches=crawler.settings.getint('SINK_MAX_PENDING_BATCHES', 4))
+
+    def open_spider(self, spider):
+        self.__sink.open()
+        self.__flush_loop.start(self.__flush_interval, now=False)
+
+    def process_item(self, item, spider):
+        self.__records.append(record_of(item))
+        if len(self.__records) >= self.__batch_size:
+            self.__flush()
+        if len(self.__pending_writes) < self.__max_pending_batches:
+            return item
+
+        self.__stats.inc_value(self.__stats_key('waits'))
+        waiting_item = defer.Deferred()
+        waiting_item.addCallback(lambda _: item)
+        self.__waiting_items.append(waiting_item)
+        return waiting_item
+
+    def close_spider(self, spider):
+        if self.__flush_loop.running:
+            self.__flush_loop.stop()
+        self.__flush()
+        writes = defer.DeferredList(list(self.__pending_writes))
+        writes.addBoth(lambda _: self.__write_lock.run(threads.deferToThread, self.__sink.close))
+        return writes
+
+    def __flush(self) -> None:
+        if not self.__records:
+            return
+
+        records, self.__records = self.__records, []
+        write = self.__write_lock.run(threads.deferToThread, self.__sink.write, records)
+        write.addCallbacks(self.__on_written, self.__on_write_failed, callbackArgs=(records,), errbackArgs=(records,))
+        write.addBoth(self.__forget_write, write)
+        self.__pending_writes.add(write)
+
+    def __on_written(self, _, records: [dict]) -> None:
+        self.__stats.inc_value(self.__stats_key('items'), len(records))
+        self.__stats.inc_value(self.__stats_key('batches'))
+
+    def __on_write_failed(self, failure, records: [dict]) -> None:
+        self.__stats.inc_value(self.__stats_key('items_failed'), len(records))
+        logger.error('Could not write {} episodes to the {} sink: {}'.format(
+            len(records), self.__sink.name, failure.getErrorMessage()))
+
+    def __forget_write(self, _, write) -> None:
+        self.__pending_writes.discard(write)
+        while self.__waiting_items and len(self.__pending_writes) < self.__max_pending_batches:
+            self.__waiting_items.pop(0).callback(None)
+
+    def __stats_key(self, name: str) -> str:
+        return 'seriesscraper/sink/{}/{}'.format(self.__sink.name, name)
+
+
+class NdjsonSinkPipeline(SinkPipeline):
+    """
+    Appends the scraped episodes to the NDJSON file NDJSON_SINK_FILE.
+    """
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        return cls.of_target(crawler, 'NDJSON_SINK_FILE', lambda target, settings: NdjsonSink(Path(target)))
+
+
+class SqliteSinkPipeline(SinkPipeline):
+    """
+    Inserts the scraped episodes into the SQLite database SQLITE_SINK_FILE.
+    """
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        return cls.of_target(crawler, 'SQLITE_SINK_FILE', lambda target, settings: SqliteSink(Path(target)))
+
+
+class WebhookSinkPipeline(SinkPipeline):
+    """
+    POSTs the scraped episodes to WEBHOOK_SINK_URL.
+    """
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        return cls.of_target(crawler, 'WEBHOOK_SINK_URL', lambda target, settings: WebhookSink(
+            target, timeout=settings.getfloat('WEBHOOK_SINK_TIMEOUT', 10)))
+
+
+def to_jd_link(item: EpisodeItem, config: Config) -> JdLink:
+    # releases are ranked by the spider, only the best one is sent
+    release_title, download_link = item['release_downloadlink_tuples'][0]
+
+    return JdLink(
+        autostart=config.get_jd_autostart_downloads(),
+        links=download_link,
+        packageName='{}'.format(release_title),
+        destinationFolder='{}/{}'.format(
+            config.get_jd_tv_show_dir(),
+            item['tv_show_name']
+        ),
+        extractPassword='serienjunkies.org'
+    )
+
 
-        jd_link = JdLink(
-            autostart=self.__config.get_jd_autostart_downloads(),
-            links=download_link,
-            packageName='{}'.format(release_title),
-            destinationFolder='{}/{}'.format(
-                self.__config.get_jd_tv_show_dir(),
-                tv_show_name
-            ),
-            extractPassword='serienjunkies.org'
-        )
-
-        self.__jd.add_link(jd_link)
+def to_sent_link(item: EpisodeItem) -> (str, int, int, str, str):
+    """
+    Entry of the item in the SentLinkLedger.
+    """
+    release_title, download_link = item['release_downloadlink_tuples'][0]
+    return item['tv_show_name'], item['season_number'], item['episode_number'], release_title, download_link
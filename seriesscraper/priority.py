@@ -0,0 +1,40 @@
+import time
+
+from seriesscraper.scheduler import ShowScheduler
+
+FIRST_PAGE_PRIORITY = 100
+AIRING_PRIORITY = 200
+MAX_GAP_PRIORITY = 50
+
+
+class RequestPrioritizer:
+    """
+    Priority of the season page requests, so that the pages most likely to list a missing episode are downloaded first:
+    - pages of airing tv shows, i.e. tv shows with a new release in the last airing_window seconds (ShowScheduler),
+    - first season pages, which list the latest episodes, before any following page,
+    - following pages of tv shows with many missing episodes on their previous pages before those with few, and
+      shallow pages before deep ones.
+    The back catalogue of an ended tv show therefore cannot delay the first page of an airing one.
+    """
+
+    def __init__(self, scheduler: ShowScheduler, airing_window: float) -> None:
+        super().__init__()
+        self.__scheduler = scheduler
+        self.__airing_window = airing_window
+
+    def priority_of(self, tv_show_name: str, page_number: int, missing_episode_count: int = 0,
+                    now: float = None) -> int:
+        """
+        :param page_number: Number of the season page, starting at 1.
+        :param missing_episode_count: Missing episodes found on the previous pages of the tv show.
+        """
+        priority = FIRST_PAGE_PRIORITY if page_number == 1 \
+            else min(missing_episode_count, MAX_GAP_PRIORITY) - page_number
+        if self.is_airing(tv_show_name, now):
+            priority += AIRING_PRIORITY
+        return priority
+
+    def is_airing(self, tv_show_name: str, now: float = None) -> bool:
+        now = time.time() if now is None else now
+        last_new_release_at = self.__scheduler.last_new_release_at(tv_show_name)
+        return last_new_release_at is not None and now - last_new_release_at <= self.__airing_window
@@ -0,0 +1,159 @@
+import cProfile
+import functools
+import inspect
+import io
+import json
+import logging
+import pstats
+import re
+import time
+from pathlib import Path
+
+from scrapy import signals, Spider
+from scrapy.exceptions import NotConfigured
+
+from seriesscraper.config.config import Config
+
+logger = logging.getLogger(__name__)
+
+PROFILE_INDEX_FILE_NAME = 'index.jsonl'
+PROFILE_REPORT_FILE_NAME = 'report.txt'
+
+
+class CallbackProfiler:
+    """
+    Extension that profiles every PROFILE_EVERY_NTH_CALL call of the methods decorated with @profiled, i.e. the spider
+    callbacks and the process_item of the JDownloaderPipeline, with cProfile. Every profile is written to PROFILE_DIR,
+    listed with its tv show and page URL in index.jsonl. When the spider is closed, the PROFILE_TOP_N slowest calls and
+    hottest functions of all profiles are logged and written to report.txt.
+    """
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        every_nth_call = crawler.settings.getint('PROFILE_EVERY_NTH_CALL')
+        if every_nth_call < 1:
+            raise NotConfigured
+        profile_dir = crawler.settings.get('PROFILE_DIR')
+        profiler = cls(Path(profile_dir) if profile_dir else Config.instance().get_cache_dir() / 'profiles',
+                       every_nth_call,
+                       crawler.settings.getint('PROFILE_TOP_N', 25))
+        crawler.signals.connect(profiler.spider_opened, signal=signals.spider_opened)
+        crawler.signals.connect(profiler.spider_closed, signal=signals.spider_closed)
+        return profiler
+
+    def __init__(self, profile_dir: Path, every_nth_call: int, top_n: int) -> None:
+        super().__init__()
+        self.__profile_dir = profile_dir / time.strftime('%Y%m%d-%H%M%S')
+        self.__every_nth_call = every_nth_call
+        self.__top_n = top_n
+        self.__call_counts = {}  # method name -> number of calls
+        self.__profiles = []  # {'file', 'method', 'tv_show', 'url', 'seconds'}
+        self.__profiling = False
+
+    def spider_opened(self, spider):
+        self.__profile_dir.mkdir(parents=True, exist_ok=True)
+        spider.callback_profiler = self
+        logger.info('Profiling every {}. call into {}'.format(self.__every_nth_call, self.__profile_dir))
+
+    def spider_closed(self, spider):
+        if not self.__profiles:
+            return
+
+        report = self.report()
+        with open(str(self.__profile_dir / PROFILE_REPORT_FILE_NAME), 'w') as file_handle:
+            file_handle.write(report)
+        logger.info('Profiled {} calls\n{}'.format(len(self.__profiles), report))
+
+    def call(self, method, args: tuple, tag: (str, str)):
+        """
+        Call a decorated method, profiled if it is the nth call of the method. Generators, e.g. spider callbacks, are
+        profiled while they are iterated.
+        :param tag: Tv show name and page URL of the call, either may be None.
+        """
+        name = method.__qualname__
+        call_count = self.__call_counts.get(name, 0) + 1
+        self.__call_counts[name] = call_count
+        # cProfile cannot profile nested calls, the outer one wins
+        if call_count % self.__every_nth_call != 0 or self.__profiling:
+            return method(*args)
+
+        profile = cProfile.Profile()
+        if inspect.isgeneratorfunction(method):
+            return self.__profiled_generator(profile, method(*args), name, tag)
+
+        self.__enable(profile)
+        try:
+            return method(*args)
+        finally:
+            self.__disable(profile)
+            self.__save(profile, name, tag)
+
+    def __profiled_generator(self, profile: cProfile.Profile, generator, name: str, tag: (str, str)):
+        try:
+            while True:
+                self.__enable(profile)
+                try:
+                    value = next(generator)
+                except StopIteration:
+                    return
+                finally:
+                    self.__disable(profile)
+                yield value
+        finally:
+            self.__save(profile, name, tag)
+
+    def __enable(self, profile: cProfile.Profile) -> None:
+        self.__profiling = True
+        profile.enable()
+
+    def __disable(self, profile: cProfile.Profile) -> None:
+        profile.disable()
+        self.__profiling = False
+
+    def __save(self, profile: cProfile.Profile, name: str, tag: (str, str)) -> None:
+        tv_show, url = tag
+        file_name = '{:05}-{}-{}.prof'.format(len(self.__profiles) + 1, name.rsplit('.', 1)[-1],
+                                              re.sub(r'\W+', '_', tv_show or 'none'))
+        profile.dump_stats(str(self.__profile_dir / file_name))
+
+        entry = {'file': file_name, 'method': name, 'tv_show': tv_show, 'url': url,
+                 'seconds': pstats.Stats(profile).total_tt}
+        self.__profiles.append(entry)
+        with open(str(self.__profile_dir / PROFILE_INDEX_FILE_NAME), 'a') as file_handle:
+            file_handle.write(json.dumps(entry) + '\n')
+
+    def report(self) -> str:
+        """
+        The slowest profiled calls, with their tv show and page URL, and the hottest functions of all profiles.
+        """
+        slowest = sorted(self.__profiles, key=lambda entry: entry['seconds'], reverse=True)[:self.__top_n]
+        lines = ['{:>9.4f}s  {}  {}  {}  {}'.format(entry['seconds'], entry['method'], entry['tv_show'], entry['url'],
+                                                   entry['file'])
+                 for entry in slowest]
+
+        stream = io.StringIO()
+        stats = pstats.Stats(*[str(self.__profile_dir / entry['file']) for entry in self.__profiles], stream=stream)
+        stats.sort_stats('tottime').print_stats(self.__top_n)
+        return 'Slowest calls:\n{}\n\nHottest functions:\n{}'.format('\n'.join(lines), stream.getvalue())
+
+
+def profiled(tag_of):
+    """
+    Profile the decorated spider callback or item pipeline method with the CallbackProfiler of the spider, if it is
+    enabled.
+    :param tag_of: Called with the arguments of the method, returns the tv show name and page URL of the call.
+    """
+
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, *args):
+            # spider callbacks are methods of the spider, item pipeline methods get it as last argument
+            spider = self if isinstance(self, Spider) else args[-1]
+            profiler = getattr(spider, 'callback_profiler', None)
+            if profiler is None:
+                return method(self, *args)
+            return profiler.call(method, (self,) + args, tag_of(*args))
+
+        return wrapper
+
+    return decorator
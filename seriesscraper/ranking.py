@@ -0,0 +1,59 @@
+from seriesscraper.config.model import LanguageConfig
+
+WEB_DL_LABEL = 'WEB-DL'
+
+
+class ReleaseCandidate:
+    """
+    A download link of an episode release, as found on a season page.
+    """
+    __slots__ = ('release_title', 'hoster', 'download_link', 'language')
+
+    def __init__(self, release_title: str, hoster: str, download_link: str, language: LanguageConfig) -> None:
+        self.release_title = release_title
+        self.hoster = hoster
+        self.download_link = download_link
+        self.language = language
+
+    def __repr__(self) -> str:
+        return 'ReleaseCandidate({!r}, {!r}, {!r})'.format(self.release_title, self.hoster, self.download_link)
+
+
+class ReleaseRanking:
+    """
+    Orders the release candidates of an episode by language preference, resolution preference, WEB-DL and hoster
+    preference, in this order of significance. Languages, resolutions and hosters that are not configured rank behind
+    the configured ones.
+    """
+
+    def __init__(self, languages: [LanguageConfig], hosters: [str], resolutions: [str], prefer_web_dl: bool) -> None:
+        super().__init__()
+        self.__language_ranks = {language: rank for rank, language in enumerate(languages)}
+        self.__hoster_ranks = {hoster: rank for rank, hoster in enumerate(hosters)}
+        self.__resolutions = tuple(resolutions)
+        self.__prefer_web_dl = prefer_web_dl
+
+    def candidate_of(self, release_title: str, hoster: str, download_link: str) -> ReleaseCandidate:
+        language = LanguageConfig.GERMAN if 'german' in release_title.lower() else LanguageConfig.ENGLISH
+        return ReleaseCandidate(release_title, hoster, download_link, language)
+
+    def rank_of(self, candidate: ReleaseCandidate) -> (int, int, int, int):
+        """
+        Sort key of a candidate, lower is better.
+        """
+        return self.__language_ranks.get(candidate.language, len(self.__language_ranks)), \
+               self.__resolution_rank_of(candidate.release_title), \
+               0 if self.__prefer_web_dl and WEB_DL_LABEL in candidate.release_title.upper() else 1, \
+               self.__hoster_ranks.get(candidate.hoster, len(self.__hoster_ranks))
+
+    def ranked(self, candidates: [ReleaseCandidate]) -> [ReleaseCandidate]:
+        """
+        Candidates ordered from best to worst, candidates of equal rank keep their order.
+        """
+        return sorted(candidates, key=self.rank_of)
+
+    def __resolution_rank_of(self, release_title: str) -> int:
+        for rank, resolution in enumerate(self.__resolutions):
+            if resolution in release_title:
+                return rank
+        return len(self.__resolutions)
@@ -0,0 +1,62 @@
+import functools
+import re
+
+from seriesscraper.episode_index import EpisodeKey
+
+MAX_EPISODE_RANGE = 50  # longer ranges are rather typos, only their first episode is used
+# a single pass classifies a release title, the first match wins. The rarer formats must follow a separator, which lets
+# the search skip most positions of a title quickly.
+RELEASE_TITLE_PATTERN = re.compile(r'''
+    [Ss](\d{1,2})[._ -]?[Ee](\d{1,3})             # S01E02, S01.E02, S01 E02
+        (?:-?[Ee](\d{1,3})                        # S01E01E02, S01E01-E03
+          |-(\d{1,3})(?![\dp]))?                  # S01E01-03, but not S01E01-720p
+  | [._ -](?:
+        (\d{1,2})[Xx](?!26[45](?!\d))(\d{2,3})(?!\d)  # 1x02, but not 1920x1080 or 2x264
+            (?:-(?:\d{1,2}[Xx])?(\d{2,3})(?!\d))?   # 1x01-03, 1x01-1x03
+      | [Ss](\d{1,2})(?![^\W_])(?![._ -]?[Ee]\d))  # S01, a complete season, but not S01 E02
+''', re.VERBOSE)
+
+
+def episode_keys_of(release_title: str) -> (EpisodeKey, ...):
+    """
+    Episodes of a release title: a single episode, every episode of an episode range, or the season pack key
+    (EpisodeKey.season_pack_of) of a complete season. Empty if the title names neither.
+    """
+    match = RELEASE_TITLE_PATTERN.search(release_title)
+    if match is None:
+        return ()
+
+    season, episode, last_episode, last_number, cross_season, cross_episode, cross_last_episode, pack_season = \
+        match.groups()
+    if pack_season is not None:
+        return EpisodeKey.season_pack_of(int(pack_season)),
+
+    if season is not None:
+        season_number, first_episode = int(season), int(episode)
+        last_episode = last_episode or last_number
+    else:
+        season_number, first_episode = int(cross_season), int(cross_episode)
+        last_episode = cross_last_episode
+
+    if last_episode is None:
+        return EpisodeKey.of(season_number, first_episode),
+
+    last_episode = int(last_episode)
+    if not first_episode <= last_episode <= first_episode + MAX_EPISODE_RANGE:
+        last_episode = first_episode
+    return tuple(EpisodeKey.of(season_number, episode_number)
+                 for episode_number in range(first_episode, last_episode + 1))
+
+
+class ReleaseTitleMatcher:
+    """
+    Matches release titles against RELEASE_TITLE_PATTERN, memoized in an LRU cache of cache_size titles. Every season
+    page of a tv show repeats the titles of several hosters, and following crawls see the same titles again.
+    """
+
+    def __init__(self, cache_size: int = 16384) -> None:
+        super().__init__()
+        self.episode_keys_of = functools.lru_cache(maxsize=cache_size)(episode_keys_of)
+
+    def cache_info(self):
+        return self.episode_keys_of.cache_info()
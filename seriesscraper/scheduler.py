@@ -0,0 +1,114 @@
+import json
+import logging
+import os
+import tempfile
+import time
+from pathlib import Path
+
+from seriesscraper.config.model import TvShowConfig
+
+logger = logging.getLogger(__name__)
+
+SHOW_SCHEDULE_FILE_NAME = 'show_schedule.json'
+
+
+class ShowScheduler:
+    """
+    Decides when the season pages of a tv show are polled next. The poll interval of a tv show grows with the time
+    since a new release of it was found, or since its first poll if none was found yet: interval = interval_ratio *
+    time since the last new release, bounded by min_interval and max_interval. Airing tv shows are therefore polled
+    every few minutes, ended tv shows about once a week. The schedule is saved to disk, so it survives restarts of the
+    daemon.
+    """
+
+    def __init__(self, schedule_file: Path, min_interval: float, max_interval: float, interval_ratio: float) -> None:
+        super().__init__()
+        self.__schedule_file = schedule_file
+        self.__min_interval = min_interval
+        self.__max_interval = max_interval
+        self.__interval_ratio = interval_ratio
+        # tv show name -> {'first_polled_at': float, 'last_new_release_at': float, 'next_poll_at': float}
+        self.__schedule = {}
+        self.__load()
+
+    def __load(self) -> None:
+        if not self.__schedule_file.is_file():
+            return
+
+        with open(str(self.__schedule_file), 'r') as file_handle:
+            try:
+                self.__schedule = json.load(file_handle)
+            except ValueError:
+                # a broken schedule just means every tv show is polled right away
+                logger.warning('Ignoring the broken show schedule {}'.format(self.__schedule_file))
+
+    def save(self) -> None:
+        # replaces the file at once, so a process reading it meanwhile sees either the old or the new schedule
+        file_descriptor, temporary_file = tempfile.mkstemp(dir=str(self.__schedule_file.parent),
+                                                           prefix=self.__schedule_file.name, suffix='.tmp')
+        try:
+            with open(file_descriptor, 'w') as file_handle:
+                json.dump(self.__schedule, file_handle, separators=(',', ':'))
+            os.replace(temporary_file, str(self.__schedule_file))
+        except BaseException:
+            os.unlink(temporary_file)
+            raise
+
+    def due_tv_shows(self, tv_shows: [TvShowConfig], now: float = None) -> [TvShowConfig]:
+        """
+        Tv shows whose next poll is due, tv shows that were never polled are due right away.
+        """
+        now = time.time() if now is None else now
+        return [tv_show for tv_show in tv_shows
+                if self.__schedule.get(tv_show.name, {}).get('next_poll_at', 0) <= now]
+
+    def polled(self, tv_show_name: str, now: float = None) -> float:
+        """
+        Schedule the next poll of a tv show whose first season page was just requested.
+        :return: Seconds until the next poll.
+        """
+        now = time.time() if now is None else now
+        entry = self.__schedule.setdefault(tv_show_name, {})
+        entry.setdefault('first_polled_at', now)
+        interval = self.interval_of(tv_show_name, now)
+        entry['next_poll_at'] = now + interval
+        return interval
+
+    def new_release_found(self, tv_show_name: str, now: float = None) -> None:
+        """
+        Poll a tv show with the minimum interval again, as a new release of it was found.
+        """
+        now = time.time() if now is None else now
+        entry = self.__schedule.setdefault(tv_show_name, {})
+        entry['last_new_release_at'] = now
+        entry['next_poll_at'] = min(entry.get('next_poll_at', now), now + self.__min_interval)
+
+    def forget(self, tv_show_names: {str}) -> None:
+        """
+        Drop the schedule of tv shows that are no longer configured.
+        """
+        for tv_show_name in tv_show_names:
+            self.__schedule.pop(tv_show_name, None)
+
+    def last_new_release_at(self, tv_show_name: str) -> float:
+        """
+        Time of the last new release found of a tv show, None if none was found yet.
+        """
+        return self.__schedule.get(tv_show_name, {}).get('last_new_release_at')
+
+    def interval_of(self, tv_show_name: str, now: float = None) -> float:
+        now = time.time() if now is None else now
+        entry = self.__schedule.get(tv_show_name, {})
+        last_new_release_at = entry.get('last_new_release_at', entry.get('first_polled_at', now))
+        interval = self.__interval_ratio * max(now - last_new_release_at, 0)
+        return min(max(interval, self.__min_interval), self.__max_interval)
+
+
+def show_scheduler_of(settings, cache_dir: Path) -> ShowScheduler:
+    """
+    ShowScheduler of the schedule in the cache directory, with the poll intervals of the DAEMON_* settings.
+    """
+    return ShowScheduler(cache_dir / SHOW_SCHEDULE_FILE_NAME,
+                         min_interval=settings.getfloat('DAEMON_MIN_POLL_INTERVAL'),
+                         max_interval=settings.getfloat('DAEMON_MAX_POLL_INTERVAL'),
+                         interval_ratio=settings.getfloat('DAEMON_POLL_INTERVAL_RATIO'))
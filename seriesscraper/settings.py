@@ -28,8 +28,9 @@ ROBOTSTXT_OBEY = True
 # See also autothrottle settings and docs
 # DOWNLOAD_DELAY = 3
 # The download delay setting will honor only one of:
-# CONCURRENT_REQUESTS_PER_DOMAIN = 16
 # CONCURRENT_REQUESTS_PER_IP = 16
+# The concurrency per domain a crawl starts with, tuned by seriesscraper.throttle.AdaptiveConcurrencyMiddleware
+CONCURRENT_REQUESTS_PER_DOMAIN = 4
 
 # Disable cookies (enabled by default)
 # COOKIES_ENABLED = False
@@ -51,22 +52,78 @@ ROBOTSTXT_OBEY = True
 
 # Enable or disable downloader middlewares
 # See https://doc.scrapy.org/en/latest/topics/downloader-middleware.html
-# DOWNLOADER_MIDDLEWARES = {
-#    'seriesscraper.middlewares.SeriesscraperDownloaderMiddleware': 543,
-# }
+DOWNLOADER_MIDDLEWARES = {
+    # 'seriesscraper.middlewares.SeriesscraperDownloaderMiddleware': 543,
+    'seriesscraper.throttle.AdaptiveConcurrencyMiddleware': 950,
+}
+
+# The concurrency per domain grows by one per round of responses arriving within ADAPTIVE_CONCURRENCY_TARGET_LATENCY
+# seconds, up to ADAPTIVE_CONCURRENCY_MAX. Slower responses and timeouts halve it, 429 and 503 answers lower it by one
+# and a Retry-After header of at most ADAPTIVE_CONCURRENCY_MAX_DELAY seconds is honoured.
+ADAPTIVE_CONCURRENCY_ENABLED = True
+ADAPTIVE_CONCURRENCY_TARGET_LATENCY = 2.0
+ADAPTIVE_CONCURRENCY_MIN = 1
+ADAPTIVE_CONCURRENCY_MAX = 16
+ADAPTIVE_CONCURRENCY_MAX_DELAY = 60
+# rate limited requests are retried as well
+RETRY_HTTP_CODES = [500, 502, 503, 504, 522, 524, 408, 429]
+
+# Season pages of tv shows with a new release in the last REQUEST_PRIORITY_AIRING_WINDOW seconds are requested first,
+# then the first pages of the other tv shows, then their following pages (seriesscraper.priority)
+REQUEST_PRIORITY_ENABLED = True
+REQUEST_PRIORITY_AIRING_WINDOW = 14 * 24 * 3600
 
 # Enable or disable extensions
 # See https://doc.scrapy.org/en/latest/topics/extensions.html
-# EXTENSIONS = {
-#    'scrapy.extensions.telnet.TelnetConsole': None,
-# }
+EXTENSIONS = {
+    'seriesscraper.daemon.ShowPollingDaemon': 500,
+    'seriesscraper.metrics.MetricsEndpoint': 510,
+    'seriesscraper.profiling.CallbackProfiler': 520,
+}
 
 # Configure item pipelines
 # See https://doc.scrapy.org/en/latest/topics/item-pipeline.html
 ITEM_PIPELINES = {
+    'seriesscraper.pipelines.LinkLivenessPipeline': 290,
     'seriesscraper.pipelines.JDownloaderPipeline': 300,
+    'seriesscraper.pipelines.DryRunReportPipeline': 310,
+    'seriesscraper.pipelines.NdjsonSinkPipeline': 320,
+    'seriesscraper.pipelines.SqliteSinkPipeline': 330,
+    'seriesscraper.pipelines.WebhookSinkPipeline': 340,
 }
 
+# Crawl and report the episodes that would be sent, without connecting to JDownloader, e.g.
+# scrapy crawl serienjunkies_spider -s DRY_RUN=True
+DRY_RUN = False
+
+# Links are sent to JDownloader in batches of JD_BATCH_SIZE items, or after JD_FLUSH_INTERVAL seconds at the latest
+JD_BATCH_SIZE = 20
+JD_FLUSH_INTERVAL = 10
+# Disable to crawl without JDownloader, e.g. to only write the episodes to the sinks below
+JD_ENABLED = True
+
+# Write the scraped episodes to further sinks, each enabled by its target, e.g. -s NDJSON_SINK_FILE=episodes.ndjson.
+# Episodes are written in batches of SINK_BATCH_SIZE, at the latest every SINK_FLUSH_INTERVAL seconds. While
+# SINK_MAX_PENDING_BATCHES batches of a sink wait to be written, the crawl waits for the sink.
+# Sharded crawls (seriesscraper.sharding) write the items of all workers from the coordinating process.
+NDJSON_SINK_FILE = None
+SQLITE_SINK_FILE = None
+WEBHOOK_SINK_URL = None
+WEBHOOK_SINK_TIMEOUT = 10
+SINK_BATCH_SIZE = 500
+SINK_FLUSH_INTERVAL = 5
+SINK_MAX_PENDING_BATCHES = 4
+
+# Check the download links of an episode with HEAD requests before it is sent to JDownloader and send the best live one.
+# LINK_CHECK_CANDIDATES links of an episode are checked at once, LINK_CHECK_CONCURRENCY links in total, each within
+# LINK_CHECK_TIMEOUT seconds. Results are cached for LINK_CHECK_TTL seconds (link_liveness.sqlite next to the config).
+# Sharded crawls (seriesscraper.sharding) check the links in the coordinating process, for the items of all workers.
+LINK_CHECK_ENABLED = False
+LINK_CHECK_CANDIDATES = 3
+LINK_CHECK_CONCURRENCY = 16
+LINK_CHECK_TIMEOUT = 5
+LINK_CHECK_TTL = 3600
+
 # Enable and configure the AutoThrottle extension (disabled by default)
 # See https://doc.scrapy.org/en/latest/topics/autothrottle.html
 # AUTOTHROTTLE_ENABLED = True
@@ -82,10 +139,53 @@ ITEM_PIPELINES = {
 
 # Enable and configure HTTP caching (disabled by default)
 # See https://doc.scrapy.org/en/latest/topics/downloader-middleware.html#httpcache-middleware-settings
-# HTTPCACHE_ENABLED = True
-# HTTPCACHE_EXPIRATION_SECS = 0
-# HTTPCACHE_DIR = 'httpcache'
-# HTTPCACHE_IGNORE_HTTP_CODES = []
-# HTTPCACHE_STORAGE = 'scrapy.extensions.httpcache.FilesystemCacheStorage'
+# Season pages are stored gzipped in .scrapy/httpcache and revalidated with If-None-Match/If-Modified-Since, the
+# stored page is used when the server answers 304 Not Modified
+HTTPCACHE_ENABLED = True
+HTTPCACHE_POLICY = 'seriesscraper.httpcache.RevalidatingCachePolicy'
+HTTPCACHE_EXPIRATION_SECS = 0
+HTTPCACHE_DIR = 'httpcache'
+HTTPCACHE_GZIP = True
+HTTPCACHE_IGNORE_HTTP_CODES = []
+HTTPCACHE_STORAGE = 'scrapy.extensions.httpcache.FilesystemCacheStorage'
+
+# Daemon mode (python -m seriesscraper.daemon): every DAEMON_TICK_INTERVAL seconds the due tv shows are requested. A tv
+# show is polled every DAEMON_POLL_INTERVAL_RATIO * seconds since its last new release, bounded by
+# DAEMON_MIN_POLL_INTERVAL and DAEMON_MAX_POLL_INTERVAL. The show directory is revalidated daily.
+DAEMON_ENABLED = False
+DAEMON_TICK_INTERVAL = 30
+DAEMON_MIN_POLL_INTERVAL = 600
+DAEMON_MAX_POLL_INTERVAL = 7 * 24 * 3600
+DAEMON_POLL_INTERVAL_RATIO = 0.02
+DAEMON_SHOW_DIRECTORY_INTERVAL = 24 * 3600
+# Check config.yaml for changes on every tick and apply them without restarting, invalid changes are logged and ignored
+DAEMON_RELOAD_CONFIG = True
+
+# Serve the stats of the running crawl, including the time spent per stage (seriesscraper/stage/*), on
+# http://METRICS_HOST:METRICS_PORT/metrics (Prometheus) and /metrics.json, e.g. for daemon runs. Disabled without a port.
+METRICS_PORT = None
+METRICS_HOST = '127.0.0.1'
+
+# Profile every PROFILE_EVERY_NTH_CALL call of the spider callbacks and the JDownloaderPipeline with cProfile, disabled
+# with 0. The profiles are written to PROFILE_DIR (profiles next to the config file by default), the PROFILE_TOP_N
+# slowest calls and hottest functions are reported when the spider is closed.
+PROFILE_EVERY_NTH_CALL = 0
+PROFILE_DIR = None
+PROFILE_TOP_N = 25
+
+# Extract the tv shows of the show directory page with an event based parser instead of building its DOM tree
+SHOW_DIRECTORY_STREAMING_PARSER = True
+
+# Number of release titles whose episodes are memoized by the ReleaseTitleMatcher
+RELEASE_TITLE_CACHE_SIZE = 16384
+
+# Episodes are collected across the season pages of a tv show and emitted once, with the best release of all pages. At
+# most AGGREGATION_MAX_RELEASES_PER_EPISODE releases are kept per episode, and the episodes are emitted early once
+# AGGREGATION_MAX_EPISODES_PER_SHOW are collected.
+AGGREGATION_MAX_EPISODES_PER_SHOW = 500
+AGGREGATION_MAX_RELEASES_PER_EPISODE = 10
+
+# Reuse the extracted releases of season pages whose body did not change since the previous run, instead of parsing them
+SEASON_PAGE_EXTRACTION_CACHE = True
 
 LOG_LEVEL = 'INFO'
@@ -0,0 +1,242 @@
+"""
+Crawls the configured tv shows with several worker processes, each running its own crawler for a share of the tv
+shows, so parsing the season pages is spread over several cores. The coordinating process fetches the Plex episodes
+and revalidates the show directory once for all workers, and passes the items of all workers through the configured
+item pipelines, e.g. to JDownloader or the sinks.
+
+    $ python -m seriesscraper.sharding --workers 4 -s DRY_RUN=True
+"""
+import argparse
+import logging
+import multiprocessing
+import os
+import queue
+import urllib.error
+import urllib.request
+
+import scrapy
+from scrapy import signals
+from scrapy.crawler import CrawlerProcess
+from scrapy.utils.project import get_project_settings
+
+from plex.model import PlexEpisodeIndex
+from plex.plex import Plex
+from seriesscraper.config.config import Config
+from seriesscraper.config.model import TvShowConfig
+from seriesscraper.directory import ShowDirectory, stream_title_link_tuples
+from seriesscraper.episode_index import EpisodeIndex
+from seriesscraper.items import EpisodeItem
+from seriesscraper.scheduler import ShowScheduler, show_scheduler_of
+from seriesscraper.spiders.serienjunkies_spider import SerienjunkiesSpider, SHOW_DIRECTORY_CACHE_FILE_NAME, \
+    is_new_release
+
+logger = logging.getLogger(__name__)
+
+WORKER_DONE = 'worker done'  # sent by a worker after its crawl
+# the relay requests of the coordinator download nothing, their callbacks yield the items received since the last one
+RELAY_URL = 'data:,'
+RELAY_INTERVAL = 0.1
+RELAY_BATCH_SIZE = 1000
+RECEIVED_ITEMS_STATS_KEY = 'seriesscraper/sharding/items_received'
+DUPLICATE_ITEMS_STATS_KEY = 'seriesscraper/sharding/duplicates_dropped'
+
+
+class ItemQueuePipeline(object):
+    """
+    Item pipeline of the workers, hands the items over to the coordinating process.
+    """
+
+    def process_item(self, item, spider):
+        spider.item_queue.put(dict(item))
+        return item
+
+
+class WorkerItemSpider(scrapy.Spider):
+    """
+    Spider of the coordinating process, passes the items of the workers through the configured item pipelines like the
+    items of a crawl in a single process, so they are checked, sent to JDownloader or reported by a dry run, and written
+    to the sinks. Items only enter the pipelines from spider callbacks, so the received items are yielded by the
+    callbacks of a chain of data: requests, one every RELAY_INTERVAL seconds, until every worker is done. Items of an
+    episode that was already received are dropped. The items that passed the pipelines and are newer than the latest
+    episode in Plex are recorded as new releases in the ShowScheduler, which the workers only read.
+    """
+    name = 'worker_items'
+    custom_settings = {'DOWNLOAD_DELAY': RELAY_INTERVAL, 'RANDOMIZE_DOWNLOAD_DELAY': False, 'ROBOTSTXT_OBEY': False}
+
+    def __init__(self, workers: [multiprocessing.Process] = None, item_queue=None,
+                 plex_episode_index: PlexEpisodeIndex = None, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.workers = workers
+        self.item_queue = item_queue
+        self.plex_episode_index = plex_episode_index
+        self.__episode_indexes = {}  # tv show name -> EpisodeIndex
+        self.__done_workers = 0
+        self.__received_episodes = set()
+        self.show_scheduler: ShowScheduler = None
+
+    @classmethod
+    def from_crawler(cls, crawler, *args, **kwargs):
+        spider = super(WorkerItemSpider, cls).from_crawler(crawler, *args, **kwargs)
+        spider.show_scheduler = show_scheduler_of(crawler.settings, Config.instance().get_cache_dir())
+        crawler.signals.connect(spider.item_scraped, signal=signals.item_scraped)
+        crawler.signals.connect(spider.spider_closed, signal=signals.spider_closed)
+        return spider
+
+    def item_scraped(self, item, response, spider):
+        if is_new_release(item, self.__episode_index_of(item['tv_show_name'])):
+            self.show_scheduler.new_release_found(item['tv_show_name'])
+
+    def __episode_index_of(self, tv_show_name: str) -> EpisodeIndex:
+        if tv_show_name not in self.__episode_indexes:
+            self.__episode_indexes[tv_show_name] = EpisodeIndex(self.plex_episode_index.episodes_of(tv_show_name))
+        return self.__episode_indexes[tv_show_name]
+
+    def spider_closed(self, spider):
+        self.show_scheduler.save()
+
+    def start_requests(self):
+        yield self.__relay_request()
+
+    def relay(self, response):
+        # items a worker put before it ended are in the queue once it is no longer alive
+        workers_alive = any(worker.is_alive() for worker in self.workers)
+        items, drained = self.__received_items()
+        yield from items
+        if self.__done_workers >= len(self.workers):
+            return
+        if drained and not workers_alive:
+            self.logger.error('{} workers ended without finishing their crawl'.format(
+                len(self.workers) - self.__done_workers))
+            return
+        yield self.__relay_request()
+
+    def __relay_request(self) -> scrapy.Request:
+        return scrapy.Request(RELAY_URL, callback=self.relay, meta={'dont_cache': True}, dont_filter=True)
+
+    def __received_items(self) -> ([EpisodeItem], bool):
+        """
+        :return: Items received since the last call, at most RELAY_BATCH_SIZE, and whether the queue is drained.
+        """
+        items = []
+        while len(items) < RELAY_BATCH_SIZE:
+            try:
+                item = self.item_queue.get_nowait()
+            except queue.Empty:
+                return items, True
+
+            if item == WORKER_DONE:
+                self.__done_workers += 1
+                continue
+
+            self.crawler.stats.inc_value(RECEIVED_ITEMS_STATS_KEY)
+            episode = (item['tv_show_name'], item['season_number'], item['episode_number'])
+            if episode in self.__received_episodes:
+                self.crawler.stats.inc_value(DUPLICATE_ITEMS_STATS_KEY)
+                continue
+            self.__received_episodes.add(episode)
+            items.append(EpisodeItem(item))
+        return items, False
+
+
+def crawl_sharded(worker_count: int, spider_class=SerienjunkiesSpider, settings: dict = None) -> dict:
+    """
+    Crawl the configured tv shows with worker processes and pass the scraped episodes through the item pipelines.
+    :param worker_count: Number of worker processes.
+    :param spider_class: Spider of the workers.
+    :param settings: Settings that override the project settings, in the workers and the coordinating process.
+    :return: Counts of the received items, the dropped duplicates and the items that passed the pipelines.
+    """
+    os.environ.setdefault('SCRAPY_SETTINGS_MODULE', 'seriesscraper.settings')
+    coordinator_settings = get_project_settings()
+    coordinator_settings.setdict(settings or {}, priority='cmdline')
+    process = CrawlerProcess(coordinator_settings)  # sets up the logging as well
+    config = Config.instance()
+    plex_episode_index = Plex().get_episode_index()
+    refresh_show_directory(ShowDirectory(config.get_cache_dir() / SHOW_DIRECTORY_CACHE_FILE_NAME),
+                           spider_class.start_urls[0])
+
+    # spawned workers start with a fresh interpreter, the reactor of a crawler cannot be shared with a forked process
+    context = multiprocessing.get_context('spawn')
+    item_queue = context.Queue()
+    workers = [context.Process(target=crawl_shard,
+                               args=(spider_class, tv_shows, episode_index_of(plex_episode_index, tv_shows),
+                                     item_queue, settings))
+               for tv_shows in partition(config.get_tv_shows(), worker_count)]
+    for worker in workers:
+        worker.start()
+
+    crawler = process.create_crawler(WorkerItemSpider)
+    process.crawl(crawler, workers=workers, item_queue=item_queue, plex_episode_index=plex_episode_index)
+    process.start()
+    for worker in workers:
+        worker.join()
+
+    stats = crawler.stats
+    counts = {'received': stats.get_value(RECEIVED_ITEMS_STATS_KEY, 0),
+              'duplicates': stats.get_value(DUPLICATE_ITEMS_STATS_KEY, 0),
+              'scraped': stats.get_value('item_scraped_count', 0)}
+    logger.info('{received} items received from {} workers, {duplicates} duplicates dropped, {scraped} items passed '
+                'the pipelines'.format(len(workers), **counts))
+    return counts
+
+
+def crawl_shard(spider_class, tv_shows: [TvShowConfig], plex_episode_index: PlexEpisodeIndex, item_queue,
+                settings: dict = None) -> None:
+    """
+    Entry point of a worker process. Its items are passed to the coordinating process instead of the item pipelines.
+    """
+    worker_settings = get_project_settings()
+    worker_settings.setdict(settings or {}, priority='cmdline')
+    worker_settings.set('ITEM_PIPELINES', {'seriesscraper.sharding.ItemQueuePipeline': 300}, priority='cmdline')
+    process = CrawlerProcess(worker_settings)
+    process.crawl(spider_class, tv_shows=tv_shows, plex_episode_index=plex_episode_index, item_queue=item_queue)
+    process.start()
+    item_queue.put(WORKER_DONE)
+
+
+def partition(tv_shows: [TvShowConfig], worker_count: int) -> [[TvShowConfig]]:
+    """
+    Deal the tv shows round robin to at most worker_count non-empty shares.
+    """
+    return [tv_shows[worker::worker_count] for worker in range(min(worker_count, len(tv_shows)))]
+
+
+def episode_index_of(plex_episode_index: PlexEpisodeIndex, tv_shows: [TvShowConfig]) -> PlexEpisodeIndex:
+    """
+    Episode index restricted to some tv shows, keyed by the names of the tv shows in the configuration.
+    """
+    tv_shows_episode_index = PlexEpisodeIndex()
+    for tv_show in tv_shows:
+        for season_number, episode_number in plex_episode_index.episodes_of(tv_show.name):
+            tv_shows_episode_index.add(tv_show.name, season_number, episode_number)
+    return tv_shows_episode_index
+
+
+def refresh_show_directory(show_directory: ShowDirectory, url: str) -> None:
+    request = urllib.request.Request(url, headers=show_directory.conditional_request_headers())
+    try:
+        with urllib.request.urlopen(request, timeout=180) as response:
+            body = response.read()
+            encoding = response.headers.get_content_charset() or 'utf-8'
+            etag, last_modified = response.headers.get('ETag'), response.headers.get('Last-Modified')
+    except urllib.error.HTTPError as error:
+        if error.code == 304:
+            return  # the cached show directory is up to date
+        raise
+
+    show_directory.update(stream_title_link_tuples(body, encoding), etag=etag, last_modified=last_modified)
+    show_directory.save()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Crawl the configured tv shows with several worker processes.')
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help='number of worker processes')
+    parser.add_argument('-s', '--set', action='append', default=[], metavar='NAME=VALUE',
+                        help='set a Scrapy setting, like scrapy crawl -s, e.g. -s DRY_RUN=True')
+    arguments = parser.parse_args()
+
+    crawl_sharded(arguments.workers, settings=dict(setting.split('=', 1) for setting in arguments.set))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,134 @@
+import json
+import sqlite3
+import time
+from abc import ABC, abstractmethod
+from pathlib import Path
+
+from seriesscraper.items import EpisodeItem
+
+
+class Sink(ABC):
+    """
+    Destination of the scraped episodes besides JDownloader, written in batches by a SinkPipeline. The methods are
+    called in threads of the reactor's thread pool, but never concurrently.
+    """
+    name = None  # used in the stats keys
+
+    def open(self) -> None:
+        pass
+
+    @abstractmethod
+    def write(self, records: [dict]) -> None:
+        """
+        Write a batch of records (record_of). Raising fails the whole batch.
+        """
+
+    def close(self) -> None:
+        pass
+
+
+class NdjsonSink(Sink):
+    """
+    Appends every episode as a line of JSON to a file.
+    """
+    name = 'ndjson'
+
+    def __init__(self, ndjson_file: Path) -> None:
+        super().__init__()
+        self.__ndjson_file = ndjson_file
+        self.__file_handle = None
+
+    def open(self) -> None:
+        self.__file_handle = open(str(self.__ndjson_file), 'a', encoding='utf-8')
+
+    def write(self, records: [dict]) -> None:
+        self.__file_handle.write(''.join(json.dumps(record, ensure_ascii=False) + '\n' for record in records))
+        self.__file_handle.flush()
+
+    def close(self) -> None:
+        self.__file_handle.close()
+
+
+class SqliteSink(Sink):
+    """
+    Inserts the episodes into the table episode of an SQLite database, a batch per transaction. An episode scraped
+    again replaces its row, so the table holds the latest releases of every episode.
+    """
+    name = 'sqlite'
+
+    def __init__(self, database_file: Path) -> None:
+        super().__init__()
+        self.__database_file = database_file
+        self.__db = None
+
+    def open(self) -> None:
+        # opened in the reactor thread, written in the thread pool, one batch at a time
+        self.__db = sqlite3.connect(str(self.__database_file), check_same_thread=False)
+        with self.__db:
+            self.__db.executescript('''
+                CREATE TABLE IF NOT EXISTS episode (
+                    tv_show_name TEXT NOT NULL,
+                    season_number INTEGER NOT NULL,
+                    episode_number INTEGER NOT NULL,
+                    release_title TEXT NOT NULL,
+                    download_link TEXT NOT NULL,
+                    alternatives TEXT NOT NULL,
+                    scraped_at REAL NOT NULL,
+                    PRIMARY KEY (tv_show_name, season_number, episode_number)
+                ) WITHOUT ROWID;
+            ''')
+
+    def write(self, records: [dict]) -> None:
+        with self.__db:
+            self.__db.executemany('INSERT OR REPLACE INTO episode VALUES (?, ?, ?, ?, ?, ?, ?)',
+                                  ((record['tv_show_name'], record['season_number'], record['episode_number'],
+                                    record['release_title'], record['download_link'],
+                                    json.dumps(record['alternatives']), record['scraped_at'])
+                                   for record in records))
+
+    def close(self) -> None:
+        self.__db.close()
+
+
+class WebhookSink(Sink):
+    """
+    POSTs every batch as a JSON array to an HTTP endpoint, e.g. a local service, over a kept-alive connection. A batch
+    fails unless the endpoint answers with a 2xx status within the timeout.
+    """
+    name = 'webhook'
+
+    def __init__(self, url: str, timeout: float = 10) -> None:
+        super().__init__()
+        self.__url = url
+        self.__timeout = timeout
+        self.__session = None
+
+    def open(self) -> None:
+        import requests
+
+        self.__session = requests.Session()
+        self.__session.headers['Content-Type'] = 'application/json'
+
+    def write(self, records: [dict]) -> None:
+        response = self.__session.post(self.__url, data=json.dumps(records, ensure_ascii=False).encode('utf-8'),
+                                       timeout=self.__timeout)
+        response.raise_for_status()
+
+    def close(self) -> None:
+        self.__session.close()
+
+
+def record_of(item: EpisodeItem) -> dict:
+    """
+    Record of a scraped episode, as written by the sinks: the best ranked release and its alternatives.
+    """
+    (release_title, download_link), *alternatives = item['release_downloadlink_tuples']
+    return {
+        'tv_show_name': item['tv_show_name'],
+        'season_number': item['season_number'],
+        'episode_number': item['episode_number'],
+        'release_title': release_title,
+        'download_link': download_link,
+        'alternatives': [list(alternative) for alternative in alternatives],
+        'scraped_at': time.time(),
+    }
@@ -1,233 +1,430 @@
-import re
+import hashlib
+import time
 from enum import Enum
-from typing import Match
 
 import scrapy
 from scrapy import signals, Request
 from scrapy.http.response import Response
+from twisted.internet import defer, threads
 
-from plex.model import PlexEpisode
 # TODO: Refactor code to use Scrapy Item Loaders
 #       See https://docs.scrapy.org/en/latest/topics/loaders.html for further details.
 from plex.plex import Plex
+from seriesscraper.aggregation import ShowAggregation
 from seriesscraper.config.config import Config
-from seriesscraper.config.model import TvShowConfig, LanguageConfig
+from seriesscraper.config.model import TvShowConfig, ConfigSnapshot
+from seriesscraper.directory import ShowDirectory, stream_title_link_tuples
+from seriesscraper.episode_index import EpisodeIndex, EpisodeKey
+from seriesscraper.extraction import ReleaseExtractor, ExtractionCache, NEXT_PAGE_LINK_XPATH
+from seriesscraper.instrumentation import timed, record, CONFIG_LOAD, PLEX_FETCH, DIRECTORY_PARSE, EXTRACTION, \
+    MAPPING, FILTERING
 from seriesscraper.items import EpisodeItem
+from seriesscraper.ledger import SentLinkLedger, SENT_LINK_LEDGER_FILE_NAME
+from seriesscraper.priority import RequestPrioritizer
+from seriesscraper.profiling import profiled
+from seriesscraper.release_title import ReleaseTitleMatcher
+from seriesscraper.ranking import ReleaseCandidate, ReleaseRanking
+from seriesscraper.scheduler import show_scheduler_of
 
 
 class MetaItem(Enum):
     TV_SHOW = 1
-    EXISTING_EPISODES = 2
+    EPISODE_INDEX = 2
+    AGGREGATION = 3
 
 
-SEASON_EPISODE_PATTERN = 'S(\\d{2})E(\\d{2})'
+SHOW_DIRECTORY_CACHE_FILE_NAME = 'show_directory.json'
+EXTRACTION_CACHE_FILE_NAME = 'season_pages.sqlite'
+# next season pages that were not requested, because the library already contains every episode of the current page
+SKIPPED_SEASON_PAGES_STATS_KEY = 'seriesscraper/season_pages_skipped'
+# episodes that were not scraped, because their links were already sent to JDownloader by a previous run
+ALREADY_SENT_EPISODES_STATS_KEY = 'seriesscraper/episodes_already_sent'
+# releases of episodes that were already found on a previous season page of their tv show
+MERGED_EPISODES_STATS_KEY = 'seriesscraper/episodes_merged_across_pages'
+
+# signals of the show directory request, sent when its response was parsed (or the cached show directory is up to date)
+# and when it failed
+show_directory_parsed = object()
+show_directory_failed = object()
 
 
 class SerienjunkiesSpider(scrapy.Spider):
     name = 'serienjunkies_spider'
     allowed_domains = ['serienjunkies.org']
     start_urls = ['http://serienjunkies.org/serien/?cat=0&showall']  # crawler entry point
+    # spider arguments of the workers of a sharded crawl (seriesscraper.sharding): the tv shows of the worker and the
+    # Plex episodes fetched by the coordinator, which also refreshed the cached show directory
+    tv_shows = None
+    plex_episode_index = None
 
     # region spider initialization
     @classmethod
     def from_crawler(cls, crawler, *args, **kwargs):
         spider = super(SerienjunkiesSpider, cls).from_crawler(crawler, *args, **kwargs)
         crawler.signals.connect(spider.spider_opened, signal=signals.spider_opened)
+        crawler.signals.connect(spider.spider_closed, signal=signals.spider_closed)
+        crawler.signals.connect(spider.item_scraped, signal=signals.item_scraped)
+        # in daemon mode (seriesscraper.daemon) the tv shows are requested by the daemon when they are due
+        spider.scheduled = crawler.settings.getbool('DAEMON_ENABLED')
         return spider
 
     def spider_opened(self, spider):
         self.__load_config_into_context(spider)
-        self.__load_plex_into_context(spider)
-        self.__load_internationalization_into_context(spider)
+        # the configuration was loaded by whatever used it first, e.g. a pipeline, before the spider was opened
+        record(spider.crawler.stats, CONFIG_LOAD, spider.config.load_seconds)
+        with timed(spider.crawler.stats, PLEX_FETCH):
+            self.__load_plex_into_context(spider)
+        self.__load_sent_link_ledger_into_context(spider)
+        self.__load_show_schedule_into_context(spider)
+        self.__load_show_directory_into_context(spider)
+        self.__load_release_extractor_into_context(spider)
 
     def __load_config_into_context(self, spider) -> None:
         spider.config = Config.instance()
 
+    def __load_show_schedule_into_context(self, spider) -> None:
+        settings = spider.settings
+        spider.show_scheduler = show_scheduler_of(settings, spider.config.get_cache_dir())
+        spider.request_prioritizer = RequestPrioritizer(spider.show_scheduler,
+                                                        settings.getfloat('REQUEST_PRIORITY_AIRING_WINDOW')) \
+            if settings.getbool('REQUEST_PRIORITY_ENABLED') \
+            else None
+
+    def __load_show_directory_into_context(self, spider) -> None:
+        spider.show_directory = ShowDirectory(spider.config.get_cache_dir() / SHOW_DIRECTORY_CACHE_FILE_NAME)
+
+    def __load_release_extractor_into_context(self, spider) -> None:
+        languages = spider.config.get_languages()
+        hosters = spider.config.get_serienjunkies_hosters()
+        resolutions, prefer_web_dl = spider.config.get_release_ranking()
+        spider.release_extractor = ReleaseExtractor(languages, hosters)
+        spider.release_ranking = ReleaseRanking(languages, hosters, resolutions, prefer_web_dl)
+        spider.release_title_matcher = ReleaseTitleMatcher(spider.settings.getint('RELEASE_TITLE_CACHE_SIZE', 16384))
+        spider.extraction_cache = ExtractionCache(spider.config.get_cache_dir() / EXTRACTION_CACHE_FILE_NAME) \
+            if spider.settings.getbool('SEASON_PAGE_EXTRACTION_CACHE') \
+            else None
+
     def __load_plex_into_context(self, spider) -> None:
         spider.plex = Plex()
-
-    def __load_internationalization_into_context(self, spider) -> None:
-        # load i18 TODO: Refactor internationalization
-        crawl_language = Config.instance().get_language()
-        spider.season_regex_i18 = 'Season (\\d+)' if crawl_language == 'english' else 'Staffel (\\d+)'
+        if spider.plex_episode_index is None:
+            spider.plex_episode_index = spider.plex.get_episode_index()
+
+    def __load_sent_link_ledger_into_context(self, spider) -> None:
+        spider.sent_link_ledger = SentLinkLedger(spider.config.get_cache_dir() / SENT_LINK_LEDGER_FILE_NAME,
+                                                 spider.config.get_jd_sent_link_ttl())
+        spider.sent_link_ledger.expire(spider.plex_episode_index)
+
+    def spider_closed(self, spider):
+        # the new releases found by the workers of a sharded crawl are saved by the coordinating process, which receives
+        # the items of all workers
+        if self.tv_shows is None:
+            spider.show_scheduler.save()
+
+    def item_scraped(self, item, response, spider):
+        # items newer than the latest episode in Plex count as new releases of their tv show, for the poll intervals and
+        # request priorities. Items of the errback come with the failure of the request, which has the request as well
+        if is_new_release(item, response.request.meta[MetaItem.EPISODE_INDEX]):
+            self.show_scheduler.new_release_found(item['tv_show_name'])
 
     # endregion
 
     # region initial parse
+    def start_requests(self):
+        if self.tv_shows is not None:
+            yield from self.__tv_show_requests()
+            return
+
+        # revalidate the cached show directory, the server answers with 304 Not Modified if it did not change. The show
+        # directory has its own cache, so the page is kept out of the HTTP cache.
+        for url in self.start_urls:
+            yield scrapy.Request(url,
+                                 headers=self.show_directory.conditional_request_headers(),
+                                 meta={'handle_httpstatus_list': [304], 'dont_cache': True},
+                                 errback=self.show_directory_request_failed,
+                                 dont_filter=True)
+
+    @profiled(lambda response: (None, response.url))
     def parse(self, response: Response):
-        for tv_show in self.config.get_tv_shows():
-            tv_show_link = self.__crawl_tv_show_link_of(tv_show, response)
-            existing_episodes = self.__get_existing_episodes_as_episode_items_of(tv_show)
-            yield self.__next_request(link=tv_show_link,
-                                      callback=self.parse_tv_show_season,
-                                      tv_show=tv_show,
-                                      existing_episodes=existing_episodes)
-
-    def __crawl_tv_show_link_of(self, tv_show: TvShowConfig, response: Response):
-        xpath_selector = '//li[contains(@class, "cat-item")]//a[text()="{}"]/@href'.format(tv_show.name)
-        return response.xpath(xpath_selector).get()
-
-    def __get_existing_episodes_as_episode_items_of(self, tv_show: TvShowConfig):
-        return self.__map_plex_episodes_to_episode_item(
-            self.plex.get_existing_episodes_of(tv_show.name)
-        )
-
-    def __map_plex_episodes_to_episode_item(self, plex_episodes: [PlexEpisode]) -> [EpisodeItem]:
-        def extract_season_number(season_episode: str) -> int:
-            return int(season_episode[1:-3])
-
-        def extract_episode_number(season_episode: str) -> int:
-            return int(season_episode[4:])
-
-        return [
-            EpisodeItem(
-                tv_show_name=plex_episode.grandparentTitle,
-                season_number=extract_season_number(plex_episode.seasonEpisode),
-                episode_number=extract_episode_number(plex_episode.seasonEpisode),
-                release_downloadlink_tuples=[]
-            ) for plex_episode in plex_episodes
-        ]
+        if response.status != 304:
+            with timed(self.crawler.stats, DIRECTORY_PARSE):
+                self.__update_show_directory_from(response)
+        self.crawler.signals.send_catch_log(show_directory_parsed, spider=self)
+
+        if self.scheduled:
+            return
+
+        yield from self.__tv_show_requests()
+
+    def show_directory_request_failed(self, failure):
+        self.logger.error('Show directory {} failed: {}'.format(failure.request.url, failure.value))
+        self.crawler.signals.send_catch_log(show_directory_failed, spider=self)
+
+    def __tv_show_requests(self):
+        for tv_show in self.tv_shows if self.tv_shows is not None else self.config.get_tv_shows():
+            tv_show_request = self.tv_show_request(tv_show)
+            if tv_show_request is not None:
+                yield tv_show_request
+
+    def tv_show_request(self, tv_show: TvShowConfig) -> Request:
+        """
+        Request of the first season page of a tv show, None if the tv show is not in the show directory.
+        """
+        tv_show_link = self.show_directory.link_of(tv_show.name)
+        if tv_show_link is None:
+            self.logger.warning('TV show {} is not listed on {}'.format(tv_show.name, self.start_urls[0]))
+            return None
+
+        episode_index = self.__get_episode_index_of(tv_show)
+        aggregation = ShowAggregation(self.release_ranking,
+                                      max_episodes=self.settings.getint('AGGREGATION_MAX_EPISODES_PER_SHOW', 500),
+                                      max_releases=self.settings.getint('AGGREGATION_MAX_RELEASES_PER_EPISODE', 10))
+        return self.__next_request(link=tv_show_link,
+                                   callback=self.parse_tv_show_season,
+                                   tv_show=tv_show,
+                                   episode_index=episode_index,
+                                   aggregation=aggregation)
+
+    def config_reloaded(self, previous: ConfigSnapshot) -> None:
+        """
+        Apply a reloaded configuration (Config.reload_if_modified) to the running crawl. The tv shows, languages,
+        hosters and ranking take effect for the following requests; the connections to Plex and JDownloader and the
+        caches are kept, so their settings only take effect after a restart.
+        """
+        current = self.config.get_snapshot()
+        previous_names = {tv_show.name for tv_show in previous.tv_shows}
+        current_names = {tv_show.name for tv_show in current.tv_shows}
+        self.logger.info('Configuration reloaded, {} tv shows added, {} removed'.format(
+            len(current_names - previous_names), len(previous_names - current_names)))
+        record(self.crawler.stats, CONFIG_LOAD, self.config.load_seconds)
+
+        self.__load_release_extractor_into_context(self)
+
+        restart_settings = ('plex_credentials', 'plex_server_url', 'plex_server_token', 'plex_tv_library_name',
+                            'plex_cache_ttls', 'jd_credentials', 'jd_enabled', 'jd_api_url', 'jd_sent_link_ttl')
+        changed_settings = [name for name in restart_settings if getattr(previous, name) != getattr(current, name)]
+        if changed_settings:
+            self.logger.warning('Changes of {} take effect after a restart'.format(', '.join(changed_settings)))
+
+    def refresh_plex_episode_index(self) -> defer.Deferred:
+        """
+        Update the episodes of the Plex library, for long running crawls. Plex is only asked once the cached episodes
+        are older than plex.cache.episodes_ttl. The episodes are fetched in the reactor's thread pool, so downloads
+        continue meanwhile.
+        :return: Deferred firing once the episodes are updated.
+        """
+        refresh = threads.deferToThread(self.plex.get_episode_index)
+        refresh.addCallback(self.__plex_episode_index_refreshed, time.perf_counter())
+        return refresh
+
+    def __plex_episode_index_refreshed(self, plex_episode_index, start: float) -> None:
+        record(self.crawler.stats, PLEX_FETCH, time.perf_counter() - start)
+        self.plex_episode_index = plex_episode_index
+        self.sent_link_ledger.expire(plex_episode_index)
+
+    def __update_show_directory_from(self, response: Response) -> None:
+        def header(name: str):
+            value = response.headers.get(name)
+            return value.decode('latin-1') if value else None
+
+        self.show_directory.update(self.__crawl_tv_show_title_link_tuples(response),
+                                   etag=header('ETag'),
+                                   last_modified=header('Last-Modified'))
+        self.show_directory.save()
+
+    def __crawl_tv_show_title_link_tuples(self, response: Response) -> [(str, str)]:
+        if self.settings.getbool('SHOW_DIRECTORY_STREAMING_PARSER'):
+            # avoids building the DOM tree of the whole page, which is the peak memory moment of a run otherwise
+            return stream_title_link_tuples(response.body, response.encoding)
+
+        return [(a_tag.xpath('string()').get(), a_tag.xpath('@href').get())
+                for a_tag in response.xpath('//li[contains(@class, "cat-item")]//a')]
+
+    def __get_episode_index_of(self, tv_show: TvShowConfig) -> EpisodeIndex:
+        return EpisodeIndex(self.plex_episode_index.episodes_of(tv_show.name))
 
     # endregion
 
     # region tv show season parse
+    @profiled(lambda response: (response.meta[MetaItem.TV_SHOW].name, response.url))
     def parse_tv_show_season(self, response: Response):
-        tv_show, existing_episodes, latest_episode = self.__extract_meta_info_from(response)
-
-        crawl_results = self.__crawl_release_title_download_links(response)
-        downloadable_episode_items = self.__map_crawl_results_to_episode_items(tv_show, crawl_results)
-
-        # TODO: Match complete seasons from crawl results against season pattern (S\\d{2}) if results are empty when
-        #  matching against season episode pattern
+        tv_show, episode_index, aggregation = self.__extract_meta_info_from(response)
+        if aggregation.has_visited(response.request.url):
+            # redirected to a season page aggregated before, its releases and the pages after it are known already
+            yield from self.__episode_items_of(tv_show, aggregation)
+            return
+        aggregation.visit(response.request.url, response.meta.get('redirect_urls', []))
+
+        with timed(self.crawler.stats, EXTRACTION):
+            releases, next_page_link = self.__extract_season_page(response)
+        with timed(self.crawler.stats, MAPPING):
+            crawl_results = self.__to_release_candidates(releases)
+            downloadable_episodes = self.__map_crawl_results_to_episodes(crawl_results)
 
         only_latest_episodes = self.config.get_only_latest_episodes()
-        if only_latest_episodes:
-            for latest_episode in self.__latest_episodes_of(downloadable_episode_items, latest_episode):
-                yield latest_episode
+        with timed(self.crawler.stats, FILTERING):
+            if only_latest_episodes:
+                episode_keys = list(self.__latest_episodes_of(downloadable_episodes, episode_index))
+            else:
+                episode_keys = list(self.__not_yet_existing_episodes_of(downloadable_episodes, episode_index))
+        # episodes are emitted once the last season page of the tv show is aggregated
+        aggregation.add({episode_key: downloadable_episodes[episode_key] for episode_key in episode_keys})
+
+        # the following pages list older episodes, so they cannot contain anything newer than the current page
+        if only_latest_episodes and self.__are_all_existing(downloadable_episodes, episode_index):
+            self.__skip_next_page(next_page_link)
+            next_page_request = None
         else:
-            for not_yet_existing_episode in self.__not_yet_existing_episodes_of(downloadable_episode_items,
-                                                                                existing_episodes):
-                yield not_yet_existing_episode
-
-        yield self.__crawl_next_page(response, tv_show, existing_episodes)
-
-    def __crawl_release_title_download_links(self, response: Response) -> [(str, str)]:
-        language = self.config.get_language()
-        hoster = self.config.get_serienjunkies_hoster()
-
-        episode_p_tags = self.__crawl_episode_p_tags_by_language(response, language)
-        crawl_results = self.__crawl_download_links_of(episode_p_tags, hoster)
-
-        return crawl_results
-
-    def __crawl_episode_p_tags_by_language(self, response: Response, language: LanguageConfig):
-        episode_p_tag_xpath_query = '''
-        //p[position()>2 and not(@class) and not(contains(., \'Dauer\')) and 
-        (
-         ./strong/text()[contains(., \'1080p\') and contains(., \'WEB-DL\')] or
-         ./strong/text()[contains(., \'1080p\')] or
-         ./strong/text()[contains(., \'720p\') and contains(., \'WEB-DL\')] or
-         ./strong/text()[contains(., \'720p\')]
-        )] ''' \
-            if language == LanguageConfig.ENGLISH else \
-            '''
-        //p[position()>2 and not(@class) and not(contains(., \'Dauer\')) and 
-        (
-         ./strong/text()[contains(., \'1080p\') and contains(., \'WEB-DL\') and contains(translate(., 'GERMAN', 'german'), 'german')] or
-         ./strong/text()[contains(., \'1080p\') and contains(translate(., 'GERMAN', 'german'), 'german')] or
-         ./strong/text()[contains(., \'720p\') and contains(., \'WEB-DL\') and contains(translate(., 'GERMAN', 'german'), 'german')] or
-         ./strong/text()[contains(., \'720p\') and contains(translate(., 'GERMAN', 'german'), 'german')]
-        )]'''
-        return response.xpath(episode_p_tag_xpath_query)
-
-    def __crawl_download_links_of(self, episode_p_tags, hoster: str) -> [(str, str)]:
-        def extract_release_title(a_tag):
-            return a_tag.xpath('preceding-sibling::strong[not(text()=\'Download:\')]/text()').get()
-
-        def extract_download_link(a_tag):
-            return a_tag.css('::attr(href)').get()
-
-        def extract_a_tags(p_tags, hoster):
-            return p_tags.xpath('child::a[./following-sibling::text()[1][contains(., \'{0}\')]]'.format(hoster))
-
-        release_titles_and_download_links = \
-            [(extract_release_title(a_tag), extract_download_link(a_tag))
-             for a_tag in extract_a_tags(episode_p_tags, hoster)]
-
-        release_titles_and_download_links.reverse()
-        return release_titles_and_download_links
-
-    def __latest_episodes_of(self, episode_items: [EpisodeItem], latest_episode: EpisodeItem):
-        for episode_item in episode_items:
-            yield episode_item if episode_item > latest_episode else None
-
-    def __not_yet_existing_episodes_of(self, episode_items: [EpisodeItem], existing_episodes: [EpisodeItem]):
-        for episode_item in episode_items:
-            yield episode_item if episode_item not in existing_episodes else None
-
-    def __map_crawl_results_to_episode_items(self,
-                                             tv_show: TvShowConfig,
-                                             crawl_results: [(str, str)]) -> [EpisodeItem]:
-        def get_season_episode_match(release_title: str) -> Match:
-            return re.search(SEASON_EPISODE_PATTERN, release_title)
-
-        def extract_season_episode_info_from(season_episode_match: Match):
-            season_number = int(season_episode_match.group(1))
-            episode_number = int(season_episode_match.group(2))
-            season_episode_string = '{}{}'.format(season_number, episode_number)
-            return season_number, episode_number, season_episode_string
-
-        mapped_episode_items = {}
-        for release_title, download_link in crawl_results:
-            season_episode_match = get_season_episode_match(release_title)
-            if not season_episode_match:
+            next_page_request = self.__crawl_next_page(next_page_link, tv_show, episode_index, aggregation)
+
+        if next_page_request is None or aggregation.is_full:
+            yield from self.__episode_items_of(tv_show, aggregation)
+        if next_page_request is not None:
+            yield next_page_request
+
+    def season_page_failed(self, failure):
+        """
+        Errback of the season page requests: the episodes aggregated from the previous pages are still emitted.
+        """
+        self.logger.warning('Season page {} failed: {}'.format(failure.request.url, failure.value))
+        tv_show, _, aggregation = self.__extract_meta_info_from(failure.request)
+        yield from self.__episode_items_of(tv_show, aggregation)
+
+    def __episode_items_of(self, tv_show: TvShowConfig, aggregation: ShowAggregation):
+        self.crawler.stats.inc_value(MERGED_EPISODES_STATS_KEY, aggregation.merged_count)
+        aggregation.merged_count = 0
+
+        sent_episode_keys = self.sent_link_ledger.sent_episodes_of(tv_show.name)
+        for episode_key, release_candidates in aggregation.drain():
+            if episode_key in sent_episode_keys:
+                self.crawler.stats.inc_value(ALREADY_SENT_EPISODES_STATS_KEY)
                 continue
+            yield self.__to_episode_item(tv_show, episode_key, release_candidates)
+
+    def __extract_season_page(self, response: Response) -> ([(str, str, str)], str):
+        if self.extraction_cache is None:
+            return self.__parse_season_page(response)
+
+        body_hash = hashlib.sha1(response.body).hexdigest()
+        season_page = self.extraction_cache.get(response.url, body_hash, self.release_extractor.key)
+        if season_page is not None:
+            self.crawler.stats.inc_value('seriesscraper/extraction_cache/hit')
+            return season_page
+
+        self.crawler.stats.inc_value('seriesscraper/extraction_cache/miss')
+        season_page = self.__parse_season_page(response)
+        self.extraction_cache.put(response.url, body_hash, self.release_extractor.key, *season_page)
+        return season_page
+
+    def __parse_season_page(self, response: Response) -> ([(str, str, str)], str):
+        root = response.selector.root
+        return self.release_extractor.extract(root), self.__crawl_next_page_link(root)
+
+    def __to_release_candidates(self, releases: [(str, str, str)]) -> [ReleaseCandidate]:
+        return [self.release_ranking.candidate_of(release_title, hoster, download_link)
+                for release_title, hoster, download_link in releases]
+
+    def __latest_episodes_of(self, episodes: {EpisodeKey: [ReleaseCandidate]}, episode_index: EpisodeIndex):
+        for episode_key in episodes:
+            if episode_index.is_newer_than_latest(episode_key):
+                yield episode_key
+
+    def __not_yet_existing_episodes_of(self, episodes: {EpisodeKey: [ReleaseCandidate]}, episode_index: EpisodeIndex):
+        for episode_key in episodes:
+            exists = episode_index.has_season(episode_key.season_number) \
+                if episode_key.is_season_pack \
+                else episode_key in episode_index
+            if not exists:
+                yield episode_key
+
+    def __are_all_existing(self, episodes: {EpisodeKey: [ReleaseCandidate]}, episode_index: EpisodeIndex) -> bool:
+        return bool(episodes) and not any(episode_index.is_newer_than_latest(episode_key) for episode_key in episodes)
+
+    def __map_crawl_results_to_episodes(self, crawl_results: [ReleaseCandidate]) -> {EpisodeKey: [ReleaseCandidate]}:
+        mapped_episodes = {}
+        season_packs = {}
+        for release_candidate in crawl_results:
+            # a release of several episodes is a candidate of each of them
+            for episode_key in self.release_title_matcher.episode_keys_of(release_candidate.release_title):
+                releases = season_packs if episode_key.is_season_pack else mapped_episodes
+                releases.setdefault(episode_key, []).append(release_candidate)
+
+        # complete seasons are only downloaded if the page has no releases of single episodes of the season
+        seasons_with_episodes = {episode_key.season_number for episode_key in mapped_episodes}
+        for season_pack_key, release_candidates in season_packs.items():
+            if season_pack_key.season_number not in seasons_with_episodes:
+                mapped_episodes[season_pack_key] = release_candidates
+
+        return mapped_episodes
+
+    def __to_episode_item(self, tv_show: TvShowConfig,
+                          episode_key: EpisodeKey,
+                          ranked_release_candidates: [ReleaseCandidate]) -> EpisodeItem:
+        return EpisodeItem(
+            tv_show_name=tv_show.name,
+            season_number=episode_key.season_number,
+            episode_number=episode_key.episode_number,
+            release_downloadlink_tuples=[(release_candidate.release_title, release_candidate.download_link)
+                                         for release_candidate in ranked_release_candidates]
+        )
 
-            season_number, episode_number, season_episode_string = \
-                extract_season_episode_info_from(season_episode_match)
-
-            if season_episode_string not in mapped_episode_items:
-                new_episode_item = EpisodeItem(
-                    tv_show_name=tv_show.name,
-                    season_number=season_number,
-                    episode_number=episode_number,
-                    release_downloadlink_tuples=[]
-                )
-                mapped_episode_items[season_episode_string] = new_episode_item
-
-            # append crawl result to episode item
-            mapped_episode_items[season_episode_string]['release_downloadlink_tuples'].append(
-                (release_title, download_link))
-
-        return mapped_episode_items.values()
-
-    def __crawl_next_page(self, response: Response, tv_show: TvShowConfig, existing_episodes: [EpisodeItem]):
-        next_page_link = self.__crawl_next_page_link(response)
-        return self.__next_request(link=next_page_link,
-                                   callback=self.parse_tv_show_season,
-                                   tv_show=tv_show,
-                                   existing_episodes=existing_episodes) \
-            if next_page_link is not None \
-            else None
-
-    def __crawl_next_page_link(self, response: Response):
-        return response.xpath('//a[@class="next"]/@href').get()
+    def __crawl_next_page(self, next_page_link: str, tv_show: TvShowConfig, episode_index: EpisodeIndex,
+                          aggregation: ShowAggregation):
+        if next_page_link is None:
+            return None
+        # the pagination of a tv show is followed even if another request already visited a page of it, otherwise the
+        # aggregated episodes would never be emitted
+        request = self.__next_request(link=next_page_link,
+                                      callback=self.parse_tv_show_season,
+                                      tv_show=tv_show,
+                                      episode_index=episode_index,
+                                      aggregation=aggregation,
+                                      dont_filter=True)
+        # the request URL is normalized, e.g. its spaces are escaped, like the visited URLs
+        return None if aggregation.has_visited(request.url) else request
+
+    def __skip_next_page(self, next_page_link: str) -> None:
+        if next_page_link is not None:
+            self.crawler.stats.inc_value(SKIPPED_SEASON_PAGES_STATS_KEY)
+
+    def __crawl_next_page_link(self, root) -> str:
+        next_page_links = NEXT_PAGE_LINK_XPATH(root)
+        return str(next_page_links[0]) if next_page_links else None
     # endregion
 
     # region utility
     def __next_request(self, link: str,
                        callback,
                        tv_show: TvShowConfig,
-                       existing_episodes: [EpisodeItem] = None) -> Request:
-        request = scrapy.Request(link, callback=callback)
+                       episode_index: EpisodeIndex = None,
+                       aggregation: ShowAggregation = None,
+                       dont_filter: bool = False) -> Request:
+        # scheduled crawls request the same pages again on every poll
+        request = scrapy.Request(link, callback=callback, errback=self.season_page_failed,
+                                 priority=self.__priority_of(tv_show, aggregation),
+                                 dont_filter=dont_filter or self.scheduled)
         request.meta[MetaItem.TV_SHOW] = tv_show
-        request.meta[MetaItem.EXISTING_EPISODES] = existing_episodes
+        request.meta[MetaItem.EPISODE_INDEX] = episode_index
+        request.meta[MetaItem.AGGREGATION] = aggregation
         return request
 
-    def __extract_meta_info_from(self, response: Response) -> (TvShowConfig, [EpisodeItem], EpisodeItem):
+    def __priority_of(self, tv_show: TvShowConfig, aggregation: ShowAggregation) -> int:
+        if self.request_prioritizer is None:
+            return 0
+        # the aggregation has seen the previous pages of the tv show
+        return self.request_prioritizer.priority_of(tv_show.name, aggregation.page_count + 1, aggregation.episode_count)
+
+    def __extract_meta_info_from(self, response) -> (TvShowConfig, EpisodeIndex, ShowAggregation):
         tv_show = response.meta[MetaItem.TV_SHOW]
-        existing_episodes = response.meta[MetaItem.EXISTING_EPISODES]
-        latest_episode = existing_episodes[-1] if existing_episodes else None
+        episode_index = response.meta[MetaItem.EPISODE_INDEX]
+        aggregation = response.meta[MetaItem.AGGREGATION]
 
-        return tv_show, existing_episodes, latest_episode
+        return tv_show, episode_index, aggregation
     # endregion
+
+
+def is_new_release(item: EpisodeItem, episode_index: EpisodeIndex) -> bool:
+    """
+    Whether a scraped episode is newer than the latest episode of its tv show in Plex. Missing older episodes, e.g. of
+    crawls with only_latest_episodes disabled, are no new releases.
+    """
+    return episode_index.is_newer_than_latest(EpisodeKey.of(item['season_number'], item['episode_number']))
@@ -0,0 +1,120 @@
+import logging
+
+from scrapy.exceptions import NotConfigured
+from twisted.internet.error import TimeoutError, TCPTimedOutError, ConnectionRefusedError, ConnectionLost
+
+logger = logging.getLogger(__name__)
+
+# answers of a server that asks for fewer requests
+CONGESTION_HTTP_CODES = (429, 503)
+CONGESTION_EXCEPTIONS = (TimeoutError, TCPTimedOutError, ConnectionRefusedError, ConnectionLost)
+CONCURRENCY_STATS_KEY = 'seriesscraper/adaptive_concurrency/{}'
+# number of decreases of the concurrency when a request was sent
+DECREASES_META_KEY = 'adaptive_concurrency_decreases'
+# rounds of responses in time before the concurrency grows beyond the one that was congested last
+PROBE_ROUNDS = 10
+
+
+class AdaptiveConcurrencyMiddleware:
+    """
+    Downloader middleware that tunes the concurrency of every download slot (domain) from the observed latency and
+    errors, enabled by ADAPTIVE_CONCURRENCY_ENABLED. While responses arrive within
+    ADAPTIVE_CONCURRENCY_TARGET_LATENCY seconds, the concurrency of their slot grows by one per round of responses,
+    up to ADAPTIVE_CONCURRENCY_MAX. Slower responses and timeouts halve it, down to ADAPTIVE_CONCURRENCY_MIN. A 429 or
+    503 answer means the concurrency exceeds a rate limit of the server, so it is lowered by one, and a Retry-After
+    header delays the following requests of the slot until a response arrives in time again.
+
+    Only requests sent after the last decrease of their slot can decrease its concurrency again, the other answers of a
+    burst were caused by the old concurrency. The concurrency that was congested is only probed again after PROBE_ROUNDS rounds of
+    responses in time, so the rate limit of a server is hit rarely.
+
+    Placed next to the downloader, so that it sees the answers of the server before the HTTP cache and retry
+    middlewares handle them.
+    """
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        settings = crawler.settings
+        if not settings.getbool('ADAPTIVE_CONCURRENCY_ENABLED'):
+            raise NotConfigured
+        return cls(crawler,
+                   target_latency=settings.getfloat('ADAPTIVE_CONCURRENCY_TARGET_LATENCY', 2.0),
+                   min_concurrency=settings.getint('ADAPTIVE_CONCURRENCY_MIN', 1),
+                   max_concurrency=settings.getint('ADAPTIVE_CONCURRENCY_MAX', 16),
+                   max_delay=settings.getfloat('ADAPTIVE_CONCURRENCY_MAX_DELAY', 60))
+
+    def __init__(self, crawler, target_latency: float, min_concurrency: int, max_concurrency: int,
+                 max_delay: float) -> None:
+        super().__init__()
+        self.__crawler = crawler
+        self.__target_latency = target_latency
+        self.__min_concurrency = min_concurrency
+        self.__max_concurrency = max_concurrency
+        self.__max_delay = max_delay
+        self.__start_concurrency = min(max(crawler.settings.getint('CONCURRENT_REQUESTS_PER_DOMAIN'), min_concurrency),
+                                       max_concurrency)
+        self.__concurrencies = {}  # slot key -> concurrency, download slots are dropped when idle
+        self.__responses_in_time = {}  # slot key -> responses in time since the concurrency was changed
+        self.__congested_concurrencies = {}  # slot key -> concurrency of the last congestion
+        self.__delays = {}  # slot key -> delay of the slot before a Retry-After
+        self.__decrease_count = 0  # of all slots, the slot of a request is only known once it passed the middleware
+        self.__last_decreases = {}  # slot key -> decrease count after the last decrease of the slot
+
+    def process_request(self, request, spider):
+        request.meta[DECREASES_META_KEY] = self.__decrease_count
+
+    def process_response(self, request, response, spider):
+        if response.status in CONGESTION_HTTP_CODES:
+            self.__adapt(request, congested=True, rate_limited=True,
+                         retry_after=self.__seconds_of(response.headers.get('Retry-After')))
+        else:
+            self.__adapt(request, congested=request.meta.get('download_latency', 0) > self.__target_latency)
+        return response
+
+    def process_exception(self, request, exception, spider):
+        if isinstance(exception, CONGESTION_EXCEPTIONS):
+            self.__adapt(request, congested=True)
+
+    def __adapt(self, request, congested: bool, rate_limited: bool = False, retry_after: float = None) -> None:
+        key = request.meta.get('download_slot')
+        slot = self.__crawler.engine.downloader.slots.get(key)
+        if slot is None:
+            return
+
+        concurrency = self.__concurrencies.get(key, self.__start_concurrency)
+        if congested and request.meta.get(DECREASES_META_KEY, 0) < self.__last_decreases.get(key, 0):
+            return
+        if congested:
+            self.__decrease_count += 1
+            self.__last_decreases[key] = self.__decrease_count
+            self.__congested_concurrencies[key] = concurrency
+            concurrency = max(concurrency - 1 if rate_limited else concurrency // 2, self.__min_concurrency)
+            self.__responses_in_time[key] = 0
+            if retry_after:
+                self.__delays.setdefault(key, slot.delay)
+                slot.delay = min(retry_after, self.__max_delay)
+            self.__crawler.stats.inc_value(CONCURRENCY_STATS_KEY.format('congestions'))
+        else:
+            # one more request per round of responses that all arrived in time
+            responses_in_time = self.__responses_in_time.get(key, 0) + 1
+            rounds = PROBE_ROUNDS if concurrency + 1 >= self.__congested_concurrencies.get(key, float('inf')) else 1
+            if responses_in_time >= rounds * concurrency and concurrency < self.__max_concurrency:
+                concurrency += 1
+                responses_in_time = 0
+            self.__responses_in_time[key] = responses_in_time
+            if key in self.__delays:
+                slot.delay = self.__delays.pop(key)
+
+        if concurrency != self.__concurrencies.get(key):
+            logger.debug('Concurrency of {} is now {}'.format(key, concurrency))
+        self.__concurrencies[key] = concurrency
+        slot.concurrency = concurrency
+        self.__crawler.stats.max_value(CONCURRENCY_STATS_KEY.format('max'), concurrency)
+
+    @staticmethod
+    def __seconds_of(retry_after: bytes) -> float:
+        # Retry-After may also be an HTTP date, which is not worth parsing for a delay
+        try:
+            return float(retry_after) if retry_after else None
+        except ValueError:
+            return None